@@ -0,0 +1,417 @@
+"""
+Local stand-ins for everything a scan talks to, so benchmarks run offline and repeatably:
+
+- the reputation APIs (Safe Browsing, VirusTotal, AbuseIPDB, urlscan.io) on one HTTP port,
+- a scan target over HTTP and HTTPS, with a certificate from a throwaway local CA,
+- an FTP server that allows anonymous login, an SSH server, a WHOIS server and a DNS resolver.
+
+Every stand-in has a profile of latency_ms, jitter_ms, error_rate and payload_bytes.
+
+    python bench/fakes.py [--profile '{"*": {"error_rate": 0.01}, "whois": {"latency_ms": 400}}']
+
+prints the addresses as one JSON line, then serves until interrupted. bench/scan.py starts it
+on its own. Bench hostnames are t<n>.lgbench<m>.com; the DNS stand-in answers 127.0.0.1 for all of them.
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import os
+import random
+import re
+import socket
+import struct
+import sys
+import tempfile
+import uuid
+import zlib
+
+STAND_INS = ("abuseipdb", "google_safe_browsing", "virustotal", "urlscan", "target", "ftp", "ssh", "whois", "dns")
+PROVIDERS = ("abuseipdb", "google_safe_browsing", "virustotal", "urlscan")
+DEFAULT_PROFILE = {
+    "abuseipdb": {"latency_ms": 60, "jitter_ms": 20, "error_rate": 0.0, "payload_bytes": 400},
+    "google_safe_browsing": {"latency_ms": 40, "jitter_ms": 10, "error_rate": 0.0, "payload_bytes": 0},
+    "virustotal": {"latency_ms": 120, "jitter_ms": 40, "error_rate": 0.0, "payload_bytes": 4000},
+    "urlscan": {"latency_ms": 80, "jitter_ms": 20, "error_rate": 0.0, "payload_bytes": 200},
+    "target": {"latency_ms": 20, "jitter_ms": 10, "error_rate": 0.0, "payload_bytes": 50_000},
+    "ftp": {"latency_ms": 5, "jitter_ms": 2, "error_rate": 0.0, "payload_bytes": 2000},
+    "ssh": {"latency_ms": 5, "jitter_ms": 2, "error_rate": 0.0, "payload_bytes": 0},
+    "whois": {"latency_ms": 150, "jitter_ms": 50, "error_rate": 0.0, "payload_bytes": 1500},
+    "dns": {"latency_ms": 2, "jitter_ms": 1, "error_rate": 0.0, "payload_bytes": 0},
+}
+BENCH_HOST_PATTERN = r"(^|\.)lgbench\d+\.com\.?$"
+# Wildcard certificate names for lgbench0.com ... lgbench<n-1>.com
+CERT_DOMAINS = 256
+
+def merge_profile(*overrides: dict) -> dict:
+    """DEFAULT_PROFILE updated with each override; the "*" key applies to every stand-in."""
+    profile = {name: dict(values) for name, values in DEFAULT_PROFILE.items()}
+    for override in overrides:
+        for name, values in (override or {}).items():
+            for target in (STAND_INS if name == "*" else (name,)):
+                profile[target].update(values)
+    return profile
+
+def bench_host(index: int, domains: int) -> str:
+    return f"t{index}.lgbench{index % domains}.com"
+
+class StandIns:
+    def __init__(self, profile: dict, seed: int = 0):
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.addresses: dict = {}
+        self._tmp = tempfile.TemporaryDirectory(prefix="linkguard-bench-")
+
+    async def _delay(self, name: str) -> bool:
+        """Sleeps for the stand-in's latency; True when this call should fail."""
+        profile = self.profile[name]
+        delay = max(self.random.gauss(profile["latency_ms"], profile["jitter_ms"]), 0) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        return self.random.random() < profile["error_rate"]
+
+    def _padding(self, name: str) -> str:
+        return "x" * self.profile[name]["payload_bytes"]
+
+    # --- reputation APIs ----------------------------------------------------------------
+
+    def _providers_app(self):
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse, Response
+        from starlette.routing import Route
+
+        def provider(name, make_body):
+            async def endpoint(request):
+                if await self._delay(name):
+                    return Response(status_code=503)
+                return JSONResponse(await make_body(request))
+            return endpoint
+
+        async def abuseipdb(request):
+            ip = request.query_params.get("ipAddress", "")
+            return {"data": {"ipAddress": ip, "abuseConfidenceScore": zlib.crc32(ip.encode()) % 5,
+                             "totalReports": 0, "countryCode": "ZZ", "usageType": self._padding("abuseipdb")}}
+
+        async def safe_browsing(request):
+            entries = (await request.json())["threatInfo"]["threatEntries"]
+            return {"matches": [{"threatType": "MALWARE", "threat": {"url": entry["url"]}}
+                                for entry in entries if "/malware" in entry["url"]]}
+
+        async def virustotal_report(request):
+            stats = {"malicious": 0, "suspicious": 0, "harmless": 70, "undetected": 20}
+            return {"data": {"attributes": {"last_analysis_stats": stats, "status": "completed", "stats": stats,
+                                            "html_meta": self._padding("virustotal")}}}
+
+        async def virustotal_submit(request):
+            return {"data": {"id": f"u-{uuid.uuid4().hex}"}}
+
+        async def urlscan_submit(request):
+            scan_id = str(uuid.uuid4())
+            return {"uuid": scan_id, "result": f"http://urlscan.invalid/result/{scan_id}/", "message": self._padding("urlscan")}
+
+        async def urlscan_result(request):
+            return {"verdicts": {"overall": {"malicious": False, "score": 0}}}
+
+        return Starlette(routes=[
+            Route("/api/v2/check", provider("abuseipdb", abuseipdb)),
+            Route("/v4/threatMatches:find", provider("google_safe_browsing", safe_browsing), methods=["POST"]),
+            Route("/api/v3/urls/{url_id}", provider("virustotal", virustotal_report)),
+            Route("/api/v3/analyses/{analysis_id}", provider("virustotal", virustotal_report)),
+            Route("/api/v3/urls", provider("virustotal", virustotal_submit), methods=["POST"]),
+            Route("/api/v1/scan/", provider("urlscan", urlscan_submit), methods=["POST"]),
+            Route("/api/v1/result/{scan_id}/", provider("urlscan", urlscan_result)),
+        ])
+
+    # --- scan target ------------------------------------------------------------------------
+
+    def _target_app(self):
+        from starlette.applications import Starlette
+        from starlette.responses import HTMLResponse, RedirectResponse, Response
+        from starlette.routing import Route
+
+        async def page(request):
+            if await self._delay("target"):
+                return Response(status_code=503)
+            size = self.profile["target"]["payload_bytes"]
+            head = ("<html><head><title>LinkGuard bench</title><script src='/app.js'></script></head><body>"
+                    "<form action='/login' method='post'><input type='password' name='p'></form>")
+            links = "".join(f"<p><a href='https://example.org/{n}'>link {n}</a> some text here</p>"
+                            for n in range(max(size - len(head), 0) // 70))
+            return HTMLResponse(head + links + "</body></html>")
+
+        async def redirect(request):
+            hops = int(request.path_params["hops"])
+            return RedirectResponse("/page" if hops <= 1 else f"/redirect/{hops - 1}", status_code=302)
+
+        return Starlette(routes=[Route("/redirect/{hops:int}", redirect), Route("/{path:path}", page)])
+
+    def _certificates(self) -> tuple[str, str, str]:
+        """A local CA and a leaf for the bench hostnames; returns (ca, cert, key) paths."""
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.x509.oid import NameOID
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        ca_key, leaf_key = ec.generate_private_key(ec.SECP256R1()), ec.generate_private_key(ec.SECP256R1())
+        ca_name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "LinkGuard bench CA")])
+        ca = (x509.CertificateBuilder().subject_name(ca_name).issuer_name(ca_name)
+              .public_key(ca_key.public_key()).serial_number(x509.random_serial_number())
+              .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=30))
+              .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+              .add_extension(x509.KeyUsage(digital_signature=True, key_cert_sign=True, crl_sign=True, content_commitment=False,
+                                           key_encipherment=False, data_encipherment=False, key_agreement=False,
+                                           encipher_only=False, decipher_only=False), critical=True)
+              .add_extension(x509.SubjectKeyIdentifier.from_public_key(ca_key.public_key()), critical=False)
+              .sign(ca_key, hashes.SHA256()))
+        names = [x509.DNSName(f"*.lgbench{n}.com") for n in range(CERT_DOMAINS)]
+        names += [x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+        leaf = (x509.CertificateBuilder()
+                .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "lgbench0.com")]))
+                .issuer_name(ca_name).public_key(leaf_key.public_key()).serial_number(x509.random_serial_number())
+                .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=30))
+                .add_extension(x509.SubjectAlternativeName(names), critical=False)
+                .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_key.public_key()), critical=False)
+                .sign(ca_key, hashes.SHA256()))
+        paths = [os.path.join(self._tmp.name, name) for name in ("ca.pem", "cert.pem", "key.pem")]
+        for path, data in zip(paths, (ca.public_bytes(serialization.Encoding.PEM),
+                                      leaf.public_bytes(serialization.Encoding.PEM),
+                                      leaf_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                                             serialization.NoEncryption()))):
+            with open(path, "wb") as f:
+                f.write(data)
+        return tuple(paths)
+
+    # --- FTP --------------------------------------------------------------------------------
+
+    async def _ftp_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        data_server, data_connection = None, None
+        try:
+            if await self._delay("ftp"):
+                writer.write(b"421 Service not available\r\n")
+                return
+            writer.write(b"220-LinkGuard bench FTP\r\n220 Anonymous access allowed\r\n")
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+                if command == "USER":
+                    writer.write(b"331 Password required\r\n")
+                elif command == "PASS":
+                    writer.write(b"230 Logged in\r\n")
+                elif command in ("PASV", "EPSV"):
+                    data_connection = asyncio.get_running_loop().create_future()
+                    data_server = await asyncio.start_server(
+                        lambda r, w: data_connection.done() or data_connection.set_result(w), "127.0.0.1", 0)
+                    port = data_server.sockets[0].getsockname()[1]
+                    writer.write(f"227 Entering Passive Mode (127,0,0,1,{port // 256},{port % 256})\r\n".encode()
+                                 if command == "PASV" else f"229 Entering Extended Passive Mode (|||{port}|)\r\n".encode())
+                elif command in ("NLST", "LIST") and data_connection is not None:
+                    writer.write(b"150 Here comes the listing\r\n")
+                    data_writer = await asyncio.wait_for(data_connection, 5)
+                    entries = max(self.profile["ftp"]["payload_bytes"] // 16, 1)
+                    data_writer.write(b"".join(b"file-%08d\r\n" % n for n in range(entries)))
+                    try:
+                        await data_writer.drain()
+                    except ConnectionError:
+                        pass  # the scanner hangs up once it has counted enough entries
+                    data_writer.close()
+                    data_server.close()
+                    data_server, data_connection = None, None
+                    writer.write(b"226 Transfer complete\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    break
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            if data_server is not None:
+                data_server.close()
+            writer.close()
+
+    # --- SSH --------------------------------------------------------------------------------
+
+    async def _ssh_front(self, backend_port: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Adds the profile's latency and errors in front of the asyncssh server."""
+        try:
+            if await self._delay("ssh"):
+                return
+            backend_reader, backend_writer = await asyncio.open_connection("127.0.0.1", backend_port)
+            await asyncio.gather(_pipe(reader, backend_writer), _pipe(backend_reader, writer))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # --- WHOIS ------------------------------------------------------------------------------
+
+    async def _whois_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            domain = (await reader.readline()).decode(errors="replace").strip().upper()
+            if await self._delay("whois"):
+                return
+            # Stable per domain; about one in ten was registered within the last 90 days
+            age_days = 10 + zlib.crc32(domain.encode()) % (80 if zlib.crc32(domain.encode()) % 10 == 0 else 5000)
+            created = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=age_days)
+            record = (f"   Domain Name: {domain}\r\n"
+                      f"   Registry Domain ID: {zlib.crc32(domain.encode())}_DOMAIN_COM-VRSN\r\n"
+                      f"   Registrar WHOIS Server: whois.lgbench.invalid\r\n"
+                      f"   Updated Date: {created:%Y-%m-%dT%H:%M:%SZ}\r\n"
+                      f"   Creation Date: {created:%Y-%m-%dT%H:%M:%SZ}\r\n"
+                      f"   Registry Expiry Date: {created + datetime.timedelta(days=3650):%Y-%m-%dT%H:%M:%SZ}\r\n"
+                      f"   Registrar: LinkGuard Bench Registrar\r\n"
+                      f"   Name Server: NS1.{domain}\r\n"
+                      f"   DNSSEC: unsigned\r\n")
+            filler = self.profile["whois"]["payload_bytes"] - len(record)
+            if filler > 0:
+                record += "".join("% Terms of use: bench data only, not for any real purpose.\r\n"
+                                  for _ in range(filler // 62 + 1))
+            writer.write(record.encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # --- DNS --------------------------------------------------------------------------------
+
+    class _DNSProtocol(asyncio.DatagramProtocol):
+        def __init__(self, stand_ins: "StandIns"):
+            self.stand_ins = stand_ins
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def datagram_received(self, data: bytes, addr):
+            asyncio.ensure_future(self._answer(data, addr))
+
+        async def _answer(self, query: bytes, addr):
+            failed = await self.stand_ins._delay("dns")
+            try:
+                qname_end = query.index(b"\x00", 12) + 1
+            except ValueError:
+                return
+            qtype = struct.unpack("!H", query[qname_end:qname_end + 2])[0]
+            question = query[12:qname_end + 4]
+            answer_a = not failed and qtype == 1
+            header = query[:2] + struct.pack("!HHHHH", 0x8182 if failed else 0x8180, 1, int(answer_a), 0, 0)
+            answer = struct.pack("!HHHIH", 0xC00C, 1, 1, 60, 4) + socket.inet_aton("127.0.0.1") if answer_a else b""
+            self.transport.sendto(header + question + answer, addr)
+
+    # --- startup ----------------------------------------------------------------------------
+
+    async def start(self) -> dict:
+        import asyncssh
+        import uvicorn
+
+        ca_path, cert_path, key_path = self._certificates()
+
+        async def serve(app, **ssl_files) -> int:
+            sock = _listening_socket()
+            config = uvicorn.Config(app, log_level="warning", access_log=False, lifespan="off", **ssl_files)
+            server = uvicorn.Server(config)
+            server.install_signal_handlers = lambda: None  # older uvicorn versions
+            asyncio.ensure_future(server.serve(sockets=[sock]))
+            return sock.getsockname()[1]
+
+        providers_port = await serve(self._providers_app())
+        target = self._target_app()
+        http_port = await serve(target)
+        https_port = await serve(target, ssl_certfile=cert_path, ssl_keyfile=key_path)
+
+        ftp = await asyncio.start_server(self._ftp_session, "127.0.0.1", 0)
+        ssh_backend = await asyncssh.listen("127.0.0.1", 0, server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+                                            server_version="LinkGuardBench_1.0")
+        backend_port = ssh_backend.sockets[0].getsockname()[1]
+        ssh = await asyncio.start_server(lambda r, w: self._ssh_front(backend_port, r, w), "127.0.0.1", 0)
+        whois = await asyncio.start_server(self._whois_session, "127.0.0.1", 0)
+        dns_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: self._DNSProtocol(self), local_addr=("127.0.0.1", 0))
+
+        self.addresses = {
+            "providers": f"http://127.0.0.1:{providers_port}",
+            "http_port": http_port,
+            "https_port": https_port,
+            "ftp_port": ftp.sockets[0].getsockname()[1],
+            "ssh_port": ssh.sockets[0].getsockname()[1],
+            "whois": f"127.0.0.1:{whois.sockets[0].getsockname()[1]}",
+            "dns": f"127.0.0.1:{dns_transport.get_extra_info('sockname')[1]}",
+            "ca_file": ca_path,
+        }
+        return self.addresses
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+def _listening_socket() -> socket.socket:
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1024)
+    return sock
+
+# --- client side: route bench hostnames to the DNS stand-in ---------------------------------
+
+def resolve(hostname: str, server: str, timeout: float = 2.0) -> str:
+    """A minimal A-record lookup against the DNS stand-in."""
+    host, port = server.rsplit(":", 1)
+    query_id = random.getrandbits(16)
+    qname = b"".join(bytes([len(label)]) + label.encode() for label in hostname.rstrip(".").split(".")) + b"\x00"
+    query = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", 1, 1)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(query, (host, int(port)))
+        try:
+            reply = sock.recv(512)
+        except socket.timeout:
+            raise socket.gaierror(socket.EAI_AGAIN, "DNS stand-in timed out")
+    if struct.unpack("!H", reply[2:4])[0] & 0x000F or not struct.unpack("!H", reply[6:8])[0]:
+        raise socket.gaierror(socket.EAI_NONAME, f"{hostname} not resolved")
+    return socket.inet_ntoa(reply[-4:])
+
+def route_bench_hosts(server: str):
+    """
+    Sends lookups of bench hostnames in this process to the DNS stand-in; every other name
+    goes to the system resolver as usual. The app's own resolver is pointed at the stand-in
+    through DNS_NAMESERVERS; this covers httpx, which resolves through getaddrinfo.
+    """
+    pattern = re.compile(BENCH_HOST_PATTERN)
+    system_getaddrinfo, system_gethostbyname = socket.getaddrinfo, socket.gethostbyname
+
+    def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+        name = host.decode() if isinstance(host, bytes) else host
+        if name and pattern.search(name):
+            host = resolve(name, server)
+        return system_getaddrinfo(host, port, family, type, proto, flags)
+
+    def gethostbyname(host):
+        return resolve(host, server) if pattern.search(host) else system_gethostbyname(host)
+
+    socket.getaddrinfo, socket.gethostbyname = getaddrinfo, gethostbyname
+
+async def _serve_forever(profile: dict, seed: int):
+    stand_ins = StandIns(profile, seed)
+    print(json.dumps(await stand_ins.start()), flush=True)
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", default="{}", help="JSON overrides of DEFAULT_PROFILE")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_forever(merge_profile(json.loads(args.profile)), args.seed))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
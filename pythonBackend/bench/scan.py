@@ -0,0 +1,351 @@
+"""
+Offline throughput and latency benchmark. Every scenario gets fresh stand-ins (bench/fakes.py)
+and a fresh app process. Load comes either through /api/check on a uvicorn worker or
+straight from the analysis service classes. The report is JSON: requests per second,
+p50/p95/p99 latency, errors and peak RSS per scenario.
+
+    python bench/scan.py [--scenarios scenarios.json] [--only api_http,service_ftp]
+                         [--requests 500] [--concurrency 32] [--output report.json]
+                         [--compare previous_report.json]
+
+Runs from the pythonBackend directory. A scenario is a dict; anything missing comes from
+SCENARIO_DEFAULTS:
+    {"name": "api_https_slow_whois", "mode": "api", "scheme": "https",
+     "profile": {"whois": {"latency_ms": 800}}}
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+try:
+    import resource
+except ImportError:
+    # Windows; peak RSS then comes from psutil when it is installed
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from fakes import PROVIDERS, bench_host, merge_profile, route_bench_hosts  # noqa: E402
+
+SCENARIO_DEFAULTS = {
+    "mode": "api",            # "api" (HTTP requests to /api/check) or "service" (analysis classes in-process)
+    "scheme": "http",         # http, https, ftp or ssh
+    "concurrency": 32,
+    "requests": 500,
+    "warmup_requests": 10,
+    "distinct_targets": None, # None: every request scans a new hostname
+    "domains": 50,            # registrable domains the hostnames are spread over (WHOIS keys)
+    "fresh": True,            # bypass the signal cache, so every request runs every check
+    "ssh_host_key": False,
+    "history": True,
+    "profile": {},
+}
+DEFAULT_SCENARIOS = [
+    {"name": "api_http"},
+    {"name": "api_https", "scheme": "https"},
+    {"name": "api_http_cached", "fresh": False, "distinct_targets": 20},
+    {"name": "api_http_errors", "profile": {"*": {"error_rate": 0.05}}},
+    {"name": "service_http", "mode": "service"},
+    {"name": "service_ftp", "mode": "service", "scheme": "ftp"},
+    {"name": "service_ssh", "mode": "service", "scheme": "ssh", "ssh_host_key": True},
+]
+_PORTS = {"http": "http_port", "https": "https_port", "ftp": "ftp_port", "ssh": "ssh_port"}
+
+def target_urls(scenario: dict, addresses: dict) -> list[str]:
+    port = addresses[_PORTS[scenario["scheme"]]]
+    distinct = scenario["distinct_targets"] or scenario["requests"] + scenario["warmup_requests"]
+    path = "/page" if scenario["scheme"] in ("http", "https") else "/"
+    return [f"{scenario['scheme']}://{bench_host(n, scenario['domains'])}:{port}{path}" for n in range(distinct)]
+
+def app_environment(scenario: dict, addresses: dict, tmp_dir: str) -> dict:
+    """Settings for the scanned app: every provider, the WHOIS server and TLS trust point at the stand-ins."""
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_SAFE_BROWSING_API_KEY": "bench",
+        "VIRUSTOTAL_API_KEY": "bench",
+        "ABUSEIPDB_API_KEY": "bench",
+        "URLSCAN_API_KEY": "bench",
+        # Quotas would turn a benchmark into a rate limiter test
+        "PROVIDER_RATE_LIMITS": "{}",
+        "WHOIS_SERVER": addresses["whois"],
+        "DNS_NAMESERVERS": json.dumps([addresses["dns"]]),
+        "SSL_CERT_FILE": addresses["ca_file"],
+        "HISTORY_SQLITE_PATH": os.path.join(tmp_dir, "history.db") if scenario["history"] else "",
+        "CACHE_SQLITE_PATH": "",
+        "BLOCKLIST_INDEX_PATH": os.path.join(tmp_dir, "blocklist.idx"),
+        "PSL_FILE": os.path.join(tmp_dir, "public_suffix_list.dat"),
+        "BENCH_SCENARIO": json.dumps({"scenario": scenario, "addresses": addresses}),
+    })
+    return env
+
+def _prepare_app_process():
+    """Runs in the app process, before the app is imported."""
+    config = json.loads(os.environ["BENCH_SCENARIO"])
+    route_bench_hosts(config["addresses"]["dns"])
+    sys.path.insert(0, BACKEND_DIR)
+    from src.core.config import settings
+    for name in PROVIDERS:
+        settings.HTTP_POOLS[name] = {**settings.HTTP_POOLS[name], "base_url": config["addresses"]["providers"]}
+    return config
+
+def serve_app(port: int):
+    _prepare_app_process()
+    import uvicorn
+    uvicorn.run("src.main:app", host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+async def _drive(urls: list[str], scenario: dict, scan) -> dict:
+    """Runs warm-up scans, then scenario["requests"] scans at the scenario's concurrency."""
+    for url in urls[:scenario["warmup_requests"]]:
+        try:
+            await scan(url)
+        except Exception:
+            pass
+    urls = urls[scenario["warmup_requests"]:] or urls
+    latencies, errors = [], {}
+    semaphore = asyncio.Semaphore(scenario["concurrency"])
+
+    async def one(n: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await scan(urls[n % len(urls)])
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                kind = f"http_{e.response.status_code}" if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                errors[kind] = errors.get(kind, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(scenario["requests"])))
+    return {"duration": time.perf_counter() - started, "latencies": latencies, "errors": errors}
+
+def run_service_worker():
+    """Entry point of the child process for "service" scenarios; prints its raw results."""
+    config = _prepare_app_process()
+    scenario, addresses = config["scenario"], config["addresses"]
+    from src.main import warm_up
+    from src.core.http_clients import HTTPClientPool
+    from src.services.ftp_service import FTPAnalysisService
+    from src.services.http_service import URLAnalysisService
+    from src.services.ssh_service import SSHAnalysisService
+
+    async def main():
+        clients = HTTPClientPool()
+        await warm_up(clients)
+        if scenario["scheme"] in ("http", "https"):
+            service = URLAnalysisService(clients)
+            scan = lambda url: service.analyze_url(url, fresh=scenario["fresh"])
+        elif scenario["scheme"] == "ftp":
+            service = FTPAnalysisService(clients)
+            scan = lambda url: service.analyze(url, fresh=scenario["fresh"])
+        else:
+            service = SSHAnalysisService(clients)
+            scan = lambda url: service.analyze(url, fresh=scenario["fresh"], host_key=scenario["ssh_host_key"])
+        result = await _drive(target_urls(scenario, addresses), scenario, scan)
+        await clients.aclose()
+        return result
+
+    result = asyncio.run(main())
+    if resource is not None:
+        result["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    else:
+        result["peak_rss_bytes"] = _peak_rss(os.getpid())
+    print(json.dumps(result))
+
+def _peak_rss(pid: int) -> int | None:
+    """Peak resident set of a process: /proc on Linux, psutil elsewhere, None if neither is available."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        memory = psutil.Process(pid).memory_info()
+    except psutil.Error:
+        return None
+    # Only Windows reports a peak (working set); elsewhere the current RSS is the best available
+    return getattr(memory, "peak_wset", memory.rss)
+
+def _stage_means(metrics: str) -> dict:
+    """Mean milliseconds per scan step, from the app's linkguard_stage_seconds histogram."""
+    sums, counts = {}, {}
+    for line in metrics.splitlines():
+        for suffix, into in (("_sum{", sums), ("_count{", counts)):
+            if line.startswith("linkguard_stage_seconds" + suffix):
+                stage = line.split('stage="', 1)[1].split('"', 1)[0]
+                into[stage] = into.get(stage, 0) + float(line.rsplit(" ", 1)[1])
+    return {stage: round(sums[stage] / counts[stage] * 1000, 2) for stage in sorted(counts) if counts[stage]}
+
+def run_api_scenario(scenario: dict, addresses: dict, env: dict, tmp_dir: str) -> dict:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    log_path = os.path.join(tmp_dir, "app.log")
+    with open(log_path, "w") as log:
+        worker = subprocess.Popen([sys.executable, __file__, "--serve", str(port)], cwd=BACKEND_DIR, env=env,
+                                  stdout=log, stderr=subprocess.STDOUT)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            try:
+                httpx.get(f"{base}/", timeout=1).raise_for_status()
+                break
+            except httpx.TransportError:
+                if worker.poll() is not None:
+                    with open(log_path) as log:
+                        raise RuntimeError(f"App exited during startup: {log.read()[-2000:]}")
+                time.sleep(0.05)
+
+        async def main():
+            limits = httpx.Limits(max_connections=scenario["concurrency"], max_keepalive_connections=scenario["concurrency"])
+            async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+                async def scan(url):
+                    params = {"link": url, "fresh": str(scenario["fresh"]).lower(),
+                              "ssh_host_key": str(scenario["ssh_host_key"]).lower()}
+                    (await client.get("/api/check", params=params)).raise_for_status()
+                return await _drive(target_urls(scenario, addresses), scenario, scan)
+
+        result = asyncio.run(main())
+        result["peak_rss_bytes"] = _peak_rss(worker.pid)
+        result["stage_ms"] = _stage_means(httpx.get(f"{base}/metrics").text)
+        return result
+    finally:
+        worker.terminate()
+        worker.wait()
+
+def run_service_scenario(env: dict) -> dict:
+    output = subprocess.run([sys.executable, __file__, "--service-worker"], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    if output.returncode:
+        raise RuntimeError(f"Service worker failed: {output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def summarize(scenario: dict, raw: dict) -> dict:
+    ordered = sorted(raw["latencies"])
+    summary = {
+        "name": scenario["name"],
+        "mode": scenario["mode"],
+        "scheme": scenario["scheme"],
+        "concurrency": scenario["concurrency"],
+        "requests": scenario["requests"],
+        "ok": len(ordered),
+        "errors": raw["errors"],
+        "duration_s": round(raw["duration"], 3),
+        "requests_per_second": round(len(ordered) / raw["duration"], 1) if raw["duration"] else None,
+        "latency_ms": {
+            name: round(_percentile(ordered, fraction) * 1000, 2) for name, fraction in
+            (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        } if ordered else None,
+        "peak_rss_mb": round(raw["peak_rss_bytes"] / 2**20, 1) if raw.get("peak_rss_bytes") else None,
+    }
+    if raw.get("stage_ms"):
+        summary["stage_ms"] = raw["stage_ms"]
+    return summary
+
+def run_scenario(scenario: dict, profile: dict, seed: int) -> dict:
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fakes.py"), "--profile",
+         json.dumps(merge_profile(profile, scenario["profile"])), "--seed", str(seed)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        addresses = json.loads(fakes.stdout.readline())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = app_environment(scenario, addresses, tmp_dir)
+            if scenario["mode"] == "api":
+                raw = run_api_scenario(scenario, addresses, env, tmp_dir)
+            else:
+                raw = run_service_scenario(env)
+        return summarize(scenario, raw)
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Ratios of this run to a previous report, per scenario present in both (>1 means more)."""
+    previous = {scenario["name"]: scenario for scenario in baseline["scenarios"]}
+    changes = {}
+    for scenario in report["scenarios"]:
+        before = previous.get(scenario["name"])
+        if not before or not before.get("latency_ms") or not scenario.get("latency_ms"):
+            continue
+        changes[scenario["name"]] = {
+            "requests_per_second": round(scenario["requests_per_second"] / before["requests_per_second"], 3),
+            **{f"latency_{name}": round(scenario["latency_ms"][name] / before["latency_ms"][name], 3)
+               for name in ("p50", "p95", "p99") if before["latency_ms"][name]},
+        }
+    return changes
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", help="JSON file with a list of scenarios (default: DEFAULT_SCENARIOS)")
+    parser.add_argument("--only", help="Comma-separated scenario names to run")
+    parser.add_argument("--requests", type=int, help="Override the number of requests of every scenario")
+    parser.add_argument("--concurrency", type=int, help="Override the concurrency of every scenario")
+    parser.add_argument("--profile", default="{}", help="JSON stand-in profile overrides for every scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report here instead of stdout")
+    parser.add_argument("--compare", help="Previous report to compute ratios against")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--service-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve_app(args.serve)
+    if args.service_worker:
+        return run_service_worker()
+
+    scenarios = DEFAULT_SCENARIOS
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios = json.load(f)
+    if args.only:
+        wanted = set(args.only.split(","))
+        scenarios = [scenario for scenario in scenarios if scenario["name"] in wanted]
+    overrides = {key: value for key, value in (("requests", args.requests), ("concurrency", args.concurrency))
+                 if value is not None}
+
+    report = {"revision": _git_revision(), "python": sys.version.split()[0], "seed": args.seed, "scenarios": []}
+    for scenario in scenarios:
+        scenario = {**SCENARIO_DEFAULTS, **scenario, **overrides}
+        print(f"running {scenario['name']}", file=sys.stderr)
+        report["scenarios"].append(run_scenario(scenario, json.loads(args.profile), args.seed))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["compared_to"] = {"revision": baseline.get("revision"), "ratios": compare(report, baseline)}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Cold-start benchmark: import time of the app, time until a fresh uvicorn worker answers,
+and the latency of its first and second scan, with and without the warm-up hook.
+
+    python bench/startup.py [--runs 5]
+
+Runs from the pythonBackend directory. Provider API keys are cleared, so nothing leaves
+the machine: the scanned target is a local HTTP server.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IMPORT_PROBE = (
+    "import sys, time, json; t = time.perf_counter(); import src.main; "
+    "print(json.dumps({'seconds': time.perf_counter() - t, "
+    "'deferred': [m for m in ('asyncssh', 'aioftp', 'whois', 'tldextract') if m not in sys.modules]}))"
+)
+
+class _Page(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"<html><body><a href='https://example.org/'>x</a></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _env(tmp_dir: str, warm_up: bool) -> dict:
+    env = dict(os.environ)
+    for key in ("GOOGLE_SAFE_BROWSING_API_KEY", "VIRUSTOTAL_API_KEY", "ABUSEIPDB_API_KEY", "URLSCAN_API_KEY"):
+        env[key] = ""
+    env.update({
+        "WARM_UP": str(warm_up).lower(),
+        "HISTORY_SQLITE_PATH": os.path.join(tmp_dir, "history.db"),
+        "BLOCKLIST_INDEX_PATH": os.path.join(tmp_dir, "blocklist.idx"),
+        "PSL_FILE": os.path.join(tmp_dir, "public_suffix_list.dat"),
+    })
+    return env
+
+def measure_import(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure_worker(env: dict, target: str) -> dict:
+    port = _free_port()
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(timeout=30) as client:
+            while True:
+                try:
+                    client.get(f"{base}/").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    if worker.poll() is not None:
+                        raise RuntimeError("uvicorn exited during startup")
+                    time.sleep(0.005)
+            ready = time.perf_counter() - started
+            scans = []
+            for _ in range(2):
+                scan_started = time.perf_counter()
+                client.get(f"{base}/api/check", params={"link": target, "fresh": "true"}).raise_for_status()
+                scans.append(time.perf_counter() - scan_started)
+        return {"ready": ready, "first_scan": scans[0], "second_scan": scans[1]}
+    finally:
+        worker.terminate()
+        worker.wait()
+
+def _summary(samples: list[float]) -> dict:
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "max_ms": round(max(samples) * 1000, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    target = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    report = {"python": sys.version.split()[0], "runs": args.runs}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        imports = [measure_import(_env(tmp_dir, True)) for _ in range(args.runs)]
+        report["import"] = {**_summary([run["seconds"] for run in imports]), "deferred_modules": imports[-1]["deferred"]}
+        for warm_up in (True, False):
+            runs = [measure_worker(_env(tmp_dir, warm_up), target) for _ in range(args.runs)]
+            report["warm_up" if warm_up else "no_warm_up"] = {
+                name: _summary([run[name] for run in runs]) for name in ("ready", "first_scan", "second_scan")
+            }
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,102 @@
-from fastapi import APIRouter, Query, HTTPException
+import asyncio
+import json
+import re
+import time
+import zlib
+from collections import Counter
+import httpx
+import orjson
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional
 from urllib.parse import urlparse
-from ..models.scan import ScanResponse
+from ..models.scan import (
+    ScanResponse, ScanJobRequest, ScanJobStatus, RescoreRequest, RescoreResult, HistoryRescoreRequest,
+    HTTPAnalysisResult, FTPAnalysisResult, SSHAnalysisResult, RAW_PAYLOAD_FIELDS,
+)
 from ..services.http_service import URLAnalysisService as HTTPAnalysisService # Renamed for clarity
 from ..services.scoring_service import ScoringService
-from ..services.ftp_service import FTPAnalysisService
-from ..services.ssh_service import SSHAnalysisService
+from ..services.job_service import ScanJobService, ScanJob
+from ..services.crawl_service import Crawl
 from ..utils.parser import extract_url_from_curl
+from ..utils.urls import refresh_public_suffixes
+from ..utils.links import LinkExtractor, BodyTooLargeError
+from ..core.pools import pools, pool_stats, PoolSaturatedError
+from ..core.cache import signal_cache
+from ..core.resolver import dns_resolver
+from ..core.config import settings
+from ..core.batcher import batchers
+from ..core.ratelimit import rate_limiters
+from ..core.blocklist import local_blocklist
+from ..core.scoring import compile_rules
+from ..core.history import scan_history
+from ..core.probes import probe_engine
+from ..core.metrics import scan_seconds
+from ..core.timing import record_stage
 
 router = APIRouter()
 
+_RESPONSE_FIELDS = frozenset(ScanResponse.model_fields)
+_SIGNAL_FIELDS = frozenset().union(*(model.model_fields for model in (HTTPAnalysisResult, FTPAnalysisResult, SSHAnalysisResult)))
+
+FIELDS_QUERY = Query(None, description="Comma-separated response fields and/or detail signals to return, e.g. verdict,risk_score,ssl_valid")
+COMPACT_QUERY = Query(False, description="Leave raw provider payloads (abuseipdb, urlscan, whois_info, ...) out of the details")
+
+def _projection(fields: Optional[str], compact: bool) -> tuple[Optional[dict], Optional[dict]]:
+    """
+    The include/exclude arguments for dumping a ScanResponse. Names in `fields` are
+    top-level response fields or, failing that, signals of the details; details are
+    only included when asked for by name or through one of their signals.
+    """
+    include = None
+    if fields:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = names - _RESPONSE_FIELDS - _SIGNAL_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}.")
+        include = dict.fromkeys(names & _RESPONSE_FIELDS, True)
+        signals = names - _RESPONSE_FIELDS
+        if signals and "details" not in include:
+            include["details"] = signals
+    exclude = {"details": RAW_PAYLOAD_FIELDS} if compact else None
+    return include, exclude
+
+def _dump_scan(response: ScanResponse, include: Optional[dict] = None, exclude: Optional[dict] = None) -> bytes:
+    # orjson takes the datetimes in WHOIS data as they are and beats pydantic's own JSON dump
+    return orjson.dumps(response.model_dump(include=include, exclude=exclude), default=str)
+
 # Instantiate all our services
 http_service = HTTPAnalysisService()
 scoring_service = ScoringService()
-ftp_service = FTPAnalysisService()
-ssh_service = SSHAnalysisService()
+job_service = ScanJobService(http_service, scoring_service)
 
-@router.get("/check", response_model=ScanResponse, summary="Analyze a URL, FTP, SSH, or curl link")
-async def check_link(link: str = Query(..., description="The link to analyze (e.g., http://a.com, ftp://b.com, ssh://c.com, or a 'curl ...' command)")):
-    
+# The FTP and SSH services are created on first use (asyncssh itself is only imported for host key probes)
+_protocol_services = {}
+
+def protocol_service(protocol: str):
+    """The FTP or SSH analysis service, sharing the HTTP service's clients."""
+    service = _protocol_services.get(protocol)
+    if service is None:
+        if protocol == "ftp":
+            from ..services.ftp_service import FTPAnalysisService
+            service = FTPAnalysisService(http_service.clients)
+        else:
+            from ..services.ssh_service import SSHAnalysisService
+            service = SSHAnalysisService(http_service.clients)
+        _protocol_services[protocol] = service
+    return service
+
+async def scan_link(link: str, budget_ms: Optional[int] = None, fresh: bool = False,
+                    defer_slow: bool = False, ssh_host_key: bool = False, on_signal=None,
+                    depth: int = 0, crawl: Optional[Crawl] = None) -> ScanResponse:
+    """
+    Analyzes one link (URL or curl command) with the service for its protocol.
+    defer_slow leaves unfinished slow providers pending for a scan job to poll;
+    ssh_host_key adds the SSH key exchange needed to report the host key;
+    on_signal(signal, fields, outcome) is called as each check finishes.
+    With depth, an HTTP(S) link is also crawled that many links deep, each page
+    scanned within the crawl (crawl), and the pages are returned under "crawl".
+    """
     input_string = link
     
     # 1. Check if the input is a curl command
@@ -31,41 +110,370 @@ async def check_link(link: str = Query(..., description="The link to analyze (e.
     try:
         parsed_url = urlparse(link)
         protocol = parsed_url.scheme
+        started = time.perf_counter()
         
         if protocol in ["http", "https"]:
-            analysis_details = await http_service.analyze_url(link)
-            risk_score, verdict = scoring_service.calculate_risk(analysis_details)
-            return ScanResponse(
-                input_string=input_string,
-                protocol="http",
-                verdict=verdict,
-                risk_score=risk_score,
-                details=analysis_details
-            )
-
+            if depth:
+                crawl = Crawl(link, depth)
+            analysis_details = await http_service.analyze_url(link, budget_ms=budget_ms, fresh=fresh, defer_slow=defer_slow,
+                                                              on_signal=on_signal, crawl=crawl)
         elif protocol == "ftp":
-            analysis_details = await ftp_service.analyze(link)
-            verdict = "⚠️ Suspicious" if analysis_details["anonymous_login_allowed"] else "ℹ️ Informational"
-            return ScanResponse(
-                input_string=input_string,
-                protocol="ftp",
-                verdict=verdict,
-                details=analysis_details
-            )
-
+            analysis_details = await protocol_service("ftp").analyze(link, budget_ms=budget_ms, fresh=fresh, on_signal=on_signal)
         elif protocol == "ssh":
-            analysis_details = await ssh_service.analyze(link)
-            verdict = "ℹ️ Informational"
-            return ScanResponse(
-                input_string=input_string,
-                protocol="ssh",
-                verdict=verdict,
-                details=analysis_details
-            )
+            analysis_details = await protocol_service("ssh").analyze(link, budget_ms=budget_ms, fresh=fresh, host_key=ssh_host_key,
+                                                                     on_signal=on_signal)
 
         else:
             raise HTTPException(status_code=400, detail=f"Unsupported protocol: '{protocol}'. Supported protocols are http, https, ftp, ssh.")
 
+        scan_seconds.observe(time.perf_counter() - started, analysis_details["protocol"])
+
+        # Every protocol is scored by the same rule table
+        risk_score, verdict, breakdown = scoring_service.score(analysis_details)
+        response = ScanResponse(
+            input_string=input_string,
+            protocol=analysis_details["protocol"],
+            verdict=verdict,
+            risk_score=risk_score,
+            risk_breakdown=breakdown,
+            details=analysis_details
+        )
+        if depth and crawl is not None:
+            response.crawl = await crawl.expand(
+                response, lambda url: scan_link(url, budget_ms=budget_ms, fresh=fresh, crawl=crawl))
+        return response
+
+    except HTTPException:
+        raise
     except Exception as e:
         # General error handler
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+@router.get("/check", response_model=ScanResponse, summary="Analyze a URL, FTP, SSH, or curl link")
+async def check_link(
+    link: str = Query(..., description="The link to analyze (e.g., http://a.com, ftp://b.com, ssh://c.com, or a 'curl ...' command)"),
+    budget_ms: Optional[int] = Query(None, gt=0, description="Deadline for the whole scan in milliseconds; checks that miss it are reported as timed out"),
+    fresh: bool = Query(False, description="Bypass the signal cache and recompute every signal"),
+    ssh_host_key: bool = Query(False, description="For ssh:// links, also run the key exchange to report the host key"),
+    depth: int = Query(0, ge=0, le=settings.CRAWL_MAX_DEPTH, description="For http(s) links, also scan the pages linked from the site this many links deep (and the outbound links found on them); budget_ms then applies per page"),
+    fields: Optional[str] = FIELDS_QUERY,
+    compact: bool = COMPACT_QUERY,
+):
+    include, exclude = _projection(fields, compact)
+    response = await scan_link(link, budget_ms=budget_ms, fresh=fresh, ssh_host_key=ssh_host_key, depth=depth)
+    # Already validated; skip FastAPI's second validation and generic encoder
+    return Response(_dump_scan(response, include, exclude), media_type="application/json")
+
+@router.get("/check/stream", summary="Analyze a link, streaming each signal as a Server-Sent Event")
+async def check_link_stream(
+    link: str = Query(..., description="The link to analyze, in any form accepted by /api/check"),
+    budget_ms: Optional[int] = Query(None, gt=0, description="Deadline for the whole scan in milliseconds"),
+    fresh: bool = Query(False, description="Bypass the signal cache and recompute every signal"),
+    ssh_host_key: bool = Query(False, description="For ssh:// links, also run the key exchange to report the host key"),
+    compact: bool = COMPACT_QUERY,
+):
+    """
+    Emits a "signal" event with the analysis fields of each check as it finishes, each
+    followed by a "score" event with the provisional risk score and verdict of what is
+    known so far, then a final "result" event with the full ScanResponse (or "error").
+    Disconnecting cancels the scan.
+    """
+    projection = _projection(None, compact)
+    return StreamingResponse(
+        _stream_scan(link, budget_ms, fresh, ssh_host_key, projection),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _sse(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+def _link_protocol(link: str) -> str:
+    """The protocol scan_link will scan the link with, for provisional scoring."""
+    if link.strip().lower().startswith("curl"):
+        return "http"
+    scheme = urlparse(link).scheme
+    return "http" if scheme == "https" else scheme
+
+async def _stream_scan(link: str, budget_ms: Optional[int], fresh: bool, ssh_host_key: bool, projection: tuple):
+    events: asyncio.Queue = asyncio.Queue()
+    started = time.perf_counter()
+
+    def on_signal(signal: str, fields: dict, outcome: str):
+        events.put_nowait((signal, fields, outcome, time.perf_counter() - started))
+
+    scan = asyncio.ensure_future(scan_link(link, budget_ms=budget_ms, fresh=fresh, ssh_host_key=ssh_host_key,
+                                           on_signal=on_signal))
+    scan.add_done_callback(lambda _: events.put_nowait(None))
+    analysis = {"protocol": _link_protocol(link)}
+    excluded = projection[1]["details"] if projection[1] else ()
+    try:
+        while (event := await events.get()) is not None:
+            signal, fields, outcome, elapsed = event
+            analysis.update(fields)
+            fields = {name: value for name, value in fields.items() if name not in excluded}
+            yield _sse("signal", orjson.dumps({"signal": signal, "outcome": outcome,
+                                               "elapsed_ms": round(elapsed * 1000, 1), "fields": fields}, default=str))
+            risk_score, verdict, breakdown = scoring_service.score(analysis)
+            yield _sse("score", orjson.dumps({"risk_score": risk_score, "verdict": verdict, "risk_breakdown": breakdown}))
+        try:
+            response = scan.result()
+        except HTTPException as e:
+            yield _sse("error", orjson.dumps({"status_code": e.status_code, "detail": e.detail}))
+            return
+        yield _sse("result", _dump_scan(response, *projection))
+    finally:
+        # Runs on completion and when the client disconnects mid-scan
+        scan.cancel()
+
+@router.post("/check/batch", summary="Analyze many links, streaming NDJSON results as each one completes")
+async def check_batch(
+    request: Request,
+    budget_ms: Optional[int] = Query(None, gt=0, description="Deadline for each individual scan in milliseconds"),
+    fresh: bool = Query(False, description="Bypass the signal cache and recompute every signal"),
+    fields: Optional[str] = FIELDS_QUERY,
+    compact: bool = COMPACT_QUERY,
+):
+    """
+    Accepts a JSON array of links or a newline-delimited body (curl commands may span
+    lines with trailing backslashes). Duplicate inputs are scanned once. Each result is
+    written as one JSON line in completion order; failed links produce an "error" line.
+    """
+    projection = _projection(fields, compact)
+    links = _parse_batch_body(await request.body())
+    if not links:
+        raise HTTPException(status_code=400, detail="No links provided.")
+    if len(links) > settings.BATCH_MAX_LINKS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {settings.BATCH_MAX_LINKS} links.")
+    return StreamingResponse(_stream_batch(links, budget_ms, fresh, projection), media_type="application/x-ndjson")
+
+@router.post("/ingest", summary="Extract every link from a large text, CSV, mail or script body and scan them")
+async def ingest_links(
+    request: Request,
+    scan: bool = Query(True, description="Scan the extracted links; when false, only return them"),
+    budget_ms: Optional[int] = Query(None, gt=0, description="Deadline for each individual scan in milliseconds"),
+    fresh: bool = Query(False, description="Bypass the signal cache and recompute every signal"),
+    fields: Optional[str] = FIELDS_QUERY,
+    compact: bool = COMPACT_QUERY,
+):
+    """
+    Reads the raw body (send files with --data-binary; Content-Encoding: gzip is accepted)
+    chunk by chunk and extracts every http(s), ftp and ssh link, normalized and deduplicated.
+    Throughput is reported in the X-Ingest-* headers, or under "stats" when scan is false.
+    Scanning streams NDJSON results like /api/check/batch.
+    """
+    projection = _projection(fields, compact)
+    extractor = LinkExtractor(gzip=request.headers.get("content-encoding", "").lower() == "gzip",
+                              max_bytes=settings.INGEST_MAX_BYTES)
+    max_links = settings.INGEST_MAX_LINKS if not scan else settings.BATCH_MAX_LINKS
+    links: list[str] = []
+    started = time.perf_counter()
+    try:
+        # The whole body is consumed before responding: a streaming response stops reading it
+        async for chunk in request.stream():
+            links += extractor.feed(chunk)
+            if len(links) > max_links:
+                raise HTTPException(status_code=413, detail=f"At most {max_links} unique links can be {'scanned' if scan else 'extracted'} at once.")
+        links += extractor.close()
+    except BodyTooLargeError:
+        raise HTTPException(status_code=413, detail=f"Bodies may be at most {settings.INGEST_MAX_BYTES} bytes.")
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Request body is not valid gzip.")
+    if len(links) > max_links:
+        raise HTTPException(status_code=413, detail=f"At most {max_links} unique links can be {'scanned' if scan else 'extracted'} at once.")
+    seconds = time.perf_counter() - started
+    record_stage("ingest", seconds)
+    stats = extractor.stats(seconds)
+    if not scan:
+        return {"links": links, "stats": stats}
+    if not links:
+        raise HTTPException(status_code=400, detail="No http(s), ftp or ssh links found in the body.")
+    headers = {f"X-Ingest-{name.replace('_', '-').title()}": str(value) for name, value in stats.items()}
+    return StreamingResponse(_stream_batch(links, budget_ms, fresh, projection), media_type="application/x-ndjson", headers=headers)
+
+@router.post("/scans", response_model=ScanJobStatus, status_code=202, summary="Start an asynchronous scan job")
+async def create_scan_job(request: ScanJobRequest):
+    """
+    Returns a job id straight away. Fast signals are available from GET /api/scans/{id}
+    within the scan budget; slow providers are polled in the background and fill in later.
+    """
+    job = job_service.submit(
+        request.link, lambda link: scan_link(link, budget_ms=request.budget_ms, defer_slow=True)
+    )
+    return _job_status(job)
+
+@router.get("/scans/{job_id}", response_model=ScanJobStatus, summary="Current (possibly partial) result of a scan job")
+async def get_scan_job(job_id: str):
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found or expired.")
+    return _job_status(job)
+
+def _job_status(job: ScanJob) -> ScanJobStatus:
+    return ScanJobStatus(
+        job_id=job.id,
+        status=job.status,
+        pending_signals=getattr(job.response.details, "pending_signals", []) if job.response else [],
+        result=job.response,
+        error=job.error,
+    )
+
+def _parse_batch_body(body: bytes) -> list[str]:
+    text = body.decode("utf-8", errors="replace").strip()
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not a valid JSON array.")
+        if not all(isinstance(item, str) for item in items):
+            raise HTTPException(status_code=400, detail="The JSON array must contain only strings.")
+        lines = items
+    else:
+        # Join shell line continuations so multi-line curl commands stay one entry
+        lines = re.sub(r"\\\r?\n", " ", text).splitlines()
+    # dict.fromkeys keeps the first occurrence of each input, in order
+    return list(dict.fromkeys(line.strip() for line in lines if line.strip()))
+
+async def _stream_batch(links: list[str], budget_ms: Optional[int], fresh: bool, projection: tuple = (None, None)):
+    results: asyncio.Queue[bytes] = asyncio.Queue()
+    pending = iter(links)
+
+    async def worker():
+        for link in pending:
+            results.put_nowait(await _scan_batch_item(link, budget_ms, fresh, projection))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(settings.BATCH_CONCURRENCY, len(links)))]
+    try:
+        for _ in range(len(links)):
+            yield await results.get()
+    finally:
+        # Runs on completion and when the client disconnects mid-stream
+        for task in workers:
+            task.cancel()
+
+async def _scan_batch_item(link: str, budget_ms: Optional[int], fresh: bool, projection: tuple) -> bytes:
+    try:
+        response = await scan_link(link, budget_ms=budget_ms, fresh=fresh)
+        return _dump_scan(response, *projection) + b"\n"
+    except HTTPException as e:
+        return orjson.dumps({"input_string": link, "error": e.detail}) + b"\n"
+    except Exception as e:
+        # Anything else would end the worker and leave its remaining links without a line
+        return orjson.dumps({"input_string": link, "error": f"An unexpected error occurred: {e}"}, default=str) + b"\n"
+
+@router.post("/rescore", response_model=list[RescoreResult], summary="Re-score stored analyses in bulk, optionally with a different rule table")
+async def rescore(request: RescoreRequest):
+    """Lets weight and threshold changes be evaluated against past scans without rescanning."""
+    scorer = scoring_service
+    if request.rules is not None:
+        try:
+            scorer = ScoringService(compile_rules(request.rules))
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid scoring rules: {e}")
+    return [
+        RescoreResult(risk_score=risk_score, verdict=verdict, risk_breakdown=breakdown)
+        for risk_score, verdict, breakdown in scorer.score_many(request.analyses)
+    ]
+
+async def _run_history(method: str, *args):
+    if scan_history is None:
+        raise HTTPException(status_code=404, detail="Scan history is disabled (HISTORY_SQLITE_PATH is not set).")
+    try:
+        return await pools["history"].run(getattr(scan_history, method), *args)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=503, detail="Scan history is busy; try again shortly.")
+
+@router.get("/history", summary="Past scans of a URL, host, registered domain or IP")
+async def get_history(
+    url: Optional[str] = Query(None, description="Scans of this URL (normalized before matching)"),
+    host: Optional[str] = Query(None, description="Scans of this exact hostname"),
+    domain: Optional[str] = Query(None, description="Scans of any host under this registered domain"),
+    ip: Optional[str] = Query(None, description="Scans that resolved to this IP address"),
+    hours: float = Query(24, gt=0, description="How far back to look"),
+    limit: int = Query(100, gt=0, le=1000),
+):
+    filters = {name: value for name, value in (("url", url), ("host", host), ("domain", domain), ("ip", ip)) if value}
+    if len(filters) != 1:
+        raise HTTPException(status_code=400, detail="Give exactly one of url, host, domain or ip.")
+    (column, value), = filters.items()
+    return await _run_history("find", column, value, time.time() - hours * 3600, limit)
+
+@router.get("/history/{scan_id}", summary="One recorded scan with its full analysis")
+async def get_history_scan(scan_id: int):
+    scan = await _run_history("get", scan_id)
+    if scan is None:
+        raise HTTPException(status_code=404, detail="Scan not found in history.")
+    return scan
+
+@router.post("/history/rescore", summary="Re-score recorded scans with the current or a trial rule table")
+async def rescore_history(request: HistoryRescoreRequest):
+    """Summarizes how verdicts would change; stored scores are left untouched."""
+    try:
+        rules = compile_rules(request.rules)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scoring rules: {e}")
+    ids, features, protocols, stored_verdicts = await _run_history(
+        "feature_matrix", time.time() - request.hours * 3600
+    )
+    started = time.perf_counter()
+    _, verdict_indexes, _ = rules.score(features, protocols)
+    verdicts = [rules.verdict(v, p) for v, p in zip(verdict_indexes.tolist(), protocols.tolist())]
+    return {
+        "scans": len(ids),
+        "score_seconds": round(time.perf_counter() - started, 4),
+        "verdicts": Counter(verdicts),
+        "changed": [
+            {"scan_id": scan_id, "from": old, "to": new}
+            for scan_id, old, new in zip(ids.tolist(), stored_verdicts, verdicts) if old != new
+        ][:request.max_changes],
+    }
+
+@router.get("/pools", summary="Load of the worker pools for blocking calls")
+async def get_pool_stats():
+    return pool_stats()
+
+@router.get("/cache", summary="Hit rate and memory use of the signal cache")
+async def get_cache_stats():
+    return signal_cache.stats()
+
+@router.get("/dns", summary="Hit rate and size of the DNS answer cache")
+async def get_dns_stats():
+    return dns_resolver.stats()
+
+@router.get("/batchers", summary="Batch size and wait time histograms of the request-coalescing batchers")
+async def get_batcher_stats():
+    return {name: batcher.stats() for name, batcher in batchers.items()}
+
+@router.get("/quotas", summary="Token bucket state of each reputation provider")
+async def get_quota_stats():
+    return {name: limiter.stats() for name, limiter in rate_limiters.items()}
+
+@router.get("/probes", summary="Counters of the SSH/FTP probe engine")
+async def get_probe_stats():
+    return probe_engine.stats()
+
+@router.get("/blocklist", summary="Size and feeds of the local blocklist index")
+async def get_blocklist_stats():
+    return local_blocklist.stats()
+
+@router.post("/blocklist/reload", summary="Rebuild the local blocklist index from its feeds")
+async def reload_blocklist():
+    """Builds the new index off the event loop; scans keep using the old one until it is swapped in."""
+    try:
+        return await pools["blocklist"].run(local_blocklist.reload)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=409, detail="A blocklist reload is already in progress.")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/psl/refresh", summary="Download the current public suffix list into PSL_FILE")
+async def refresh_psl():
+    try:
+        return await pools["psl"].run(refresh_public_suffixes)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=409, detail="A public suffix list refresh is already in progress.")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (httpx.HTTPError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=f"Could not refresh the public suffix list: {e}")
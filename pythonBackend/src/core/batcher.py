@@ -0,0 +1,74 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+from .metrics import Histogram
+
+# Every batcher registers itself here so its histograms can be reported.
+batchers: dict[str, "MicroBatcher"] = {}
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item lookups into one bulk request.
+
+    Callers await submit(item). Items collected within max_wait_ms (or until max_batch
+    items are waiting) are deduplicated and handed to flush() together, which returns a
+    mapping of item -> result that is fanned back out to each waiter. If flush() raises,
+    every waiter in that batch gets the exception.
+    """
+    def __init__(self, name: str, flush: Callable[[list], Awaitable[dict]], max_batch: int, max_wait_ms: float):
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._flush = flush
+        self._waiting: list[tuple[Hashable, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._in_flight: set[asyncio.Task] = set()
+        self.batch_sizes = Histogram((1, 2, 5, 10, 20, 50, 100, 200, 500))
+        self.wait_seconds = Histogram((0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+        batchers[name] = self
+
+    async def submit(self, item: Hashable):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((item, future, loop.time()))
+        if len(self._waiting) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._waiting = self._waiting, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch: list[tuple[Hashable, asyncio.Future, float]]):
+        now = asyncio.get_running_loop().time()
+        for _, _, queued_at in batch:
+            self.wait_seconds.observe(now - queued_at)
+        items = list(dict.fromkeys(item for item, _, _ in batch))
+        self.batch_sizes.observe(len(items))
+
+        try:
+            results = await self._flush(items)
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for item, future, _ in batch:
+            if not future.done():
+                future.set_result(results.get(item))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_seconds": self.wait_seconds.snapshot(),
+        }
@@ -0,0 +1,213 @@
+import csv
+import glob
+import hashlib
+import ipaddress
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from .config import settings
+from ..utils.urls import normalize_url, registered_domain
+
+_MAGIC = b"LGBL"
+_HEADER = struct.Struct("<4sIQ")  # magic, format version, entry count
+_VERSION = 1
+_SINKHOLE_IPS = {"0.0.0.0", "127.0.0.1", "::", "::1"}
+_COMMENT = re.compile(r"\s#")
+
+def _hash(kind: str, value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{kind}:{value}".encode(), digest_size=8).digest(), "little")
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+def _parse_feed_line(line: str):
+    """
+    Yields (kind, value) entries from one feed line. Understands hosts files
+    ("0.0.0.0 evil.com", exact hosts), URLhaus-style CSV rows, and plain lists of URLs,
+    domains or IPs.
+    """
+    line = line.strip()
+    if not line or line.startswith(("#", "!", ";")):
+        return
+    if '"' not in line:
+        # Trailing comments may hold commas of their own ("0.0.0.0 evil.com # ads, trackers")
+        line = _COMMENT.split(line, 1)[0]
+    if "," in line or '"' in line:
+        for field in next(csv.reader([line]), []):
+            field = field.strip()
+            if field.startswith(("http://", "https://", "ftp://", "ssh://")):
+                yield "url", normalize_url(field)
+        return
+
+    tokens = line.split("#", 1)[0].split()
+    if not tokens:
+        return
+    if len(tokens) >= 2 and tokens[0] in _SINKHOLE_IPS:
+        for host in tokens[1:]:
+            if host not in ("localhost", "localhost.localdomain", "broadcasthost"):
+                yield "host", host.lower().rstrip(".")
+        return
+
+    token = tokens[0]
+    if "://" in token:
+        yield "url", normalize_url(token)
+    elif _is_ip(token):
+        yield "ip", token
+    else:
+        # Domain-list entries also cover their subdomains (see LocalBlocklist.lookup)
+        yield "domain", token.lower().rstrip(".")
+
+class _IndexFile:
+    """
+    Immutable, memory-mapped index: a sorted array of 64-bit entry hashes, a parallel
+    array of feed ids, and the feed names. Lookups are a binary search over the mapping.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a LinkGuard blocklist index")
+        view = memoryview(self._mmap)
+        hashes_end = _HEADER.size + 8 * count
+        feeds_end = hashes_end + 2 * count
+        self.hashes = view[_HEADER.size:hashes_end].cast("Q")
+        self.feed_ids = view[hashes_end:feeds_end].cast("H")
+        self.feeds = json.loads(bytes(view[feeds_end:]))
+        self.count = count
+
+    def find(self, key: int) -> str | None:
+        i = bisect_left(self.hashes, key)
+        if i < self.count and self.hashes[i] == key:
+            return self.feeds[self.feed_ids[i]]
+        return None
+
+    @staticmethod
+    def build(feed_paths: list[Path], out_path: str) -> int:
+        """Parses the feeds and writes a new index file atomically; returns the entry count."""
+        entries: dict[int, int] = {}
+        for feed_id, path in enumerate(feed_paths):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    for kind, value in _parse_feed_line(line):
+                        entries.setdefault(_hash(kind, value), feed_id)
+
+        keys = sorted(entries)
+        hashes = array("Q", keys)
+        feed_ids = array("H", (entries[key] for key in keys))
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(keys)))
+            f.write(hashes.tobytes())
+            f.write(feed_ids.tobytes())
+            f.write(json.dumps([path.name for path in feed_paths]).encode())
+        os.replace(tmp_path, out_path)
+        return len(keys)
+
+class LocalBlocklist:
+    """
+    Offline reputation index built from the feed files in BLOCKLIST_FEEDS_DIR.
+    Each reload writes a new generation ("<BLOCKLIST_INDEX_PATH>.<n>") and swaps it in;
+    lookups in progress keep using the old mapping until they finish. A mapped file
+    cannot be replaced or deleted on Windows, so old generations are removed best-effort
+    and whatever is left over goes on a later reload.
+    """
+    def __init__(self, feeds_dir: str | None, index_path: str):
+        self.feeds_dir = feeds_dir
+        self.index_path = index_path
+        self._index: _IndexFile | None = None
+        self._reload_lock = threading.Lock()
+        self.loaded_at: float | None = None
+
+    def open_existing(self) -> bool:
+        """Maps the newest previously built index without re-parsing the feeds."""
+        generations = self._generations()
+        if not generations:
+            return False
+        self._index = _IndexFile(generations[-1][1])
+        self.loaded_at = time.time()
+        return True
+
+    def _generations(self) -> list[tuple[int, str]]:
+        """Built index files as (generation, path), oldest first; a plain index_path counts as generation 0."""
+        index_path = Path(self.index_path)
+        generations = [(0, str(index_path))] if index_path.is_file() else []
+        for path in index_path.parent.glob(f"{glob.escape(index_path.name)}.*"):
+            if path.suffix[1:].isdigit():
+                generations.append((int(path.suffix[1:]), str(path)))
+        return sorted(generations)
+
+    def _remove_old_generations(self, current: str):
+        for _, path in self._generations():
+            if path != current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Still mapped (Windows); removed on a later reload
+                    pass
+
+    def reload(self) -> dict:
+        """Rebuilds the index from the feeds. Blocking; run it off the event loop."""
+        if not self.feeds_dir or not os.path.isdir(self.feeds_dir):
+            raise FileNotFoundError(f"Blocklist feed directory not found: {self.feeds_dir}")
+        with self._reload_lock:
+            started = time.perf_counter()
+            feeds = sorted(p for p in Path(self.feeds_dir).iterdir() if p.is_file() and not p.name.startswith("."))
+            generations = self._generations()
+            path = f"{self.index_path}.{generations[-1][0] + 1 if generations else 1}"
+            _IndexFile.build(feeds, path)
+            self._index = _IndexFile(path)
+            self.loaded_at = time.time()
+            self._remove_old_generations(path)
+            return {**self.stats(), "build_seconds": round(time.perf_counter() - started, 3)}
+
+    def lookup(self, url: str | None = None, host: str | None = None, ips: list[str] | None = None) -> list[dict]:
+        """Exact-match lookups for a URL, its hostname and parent domains, and IPs."""
+        index = self._index
+        if index is None:
+            return []
+        candidates = []
+        if url:
+            candidates.append(("url", normalize_url(url)))
+        if host:
+            host = host.lower().rstrip(".")
+            if _is_ip(host):
+                candidates.append(("ip", host))
+            else:
+                candidates.append(("host", host))
+                # Every parent of the hostname down to its registered domain
+                labels = host.split(".")
+                depth = len((registered_domain(host) or host).split("."))
+                for i in range(len(labels) - depth + 1):
+                    candidates.append(("domain", ".".join(labels[i:])))
+        for ip in ips or []:
+            candidates.append(("ip", ip))
+
+        matches = []
+        for kind, value in candidates:
+            feed = index.find(_hash(kind, value))
+            if feed is not None:
+                matches.append({"kind": kind, "value": value, "feed": feed})
+        return matches
+
+    def stats(self) -> dict:
+        index = self._index
+        return {
+            "entries": index.count if index else 0,
+            "feeds": index.feeds if index else [],
+            "loaded_at": self.loaded_at,
+        }
+
+local_blocklist = LocalBlocklist(settings.BLOCKLIST_FEEDS_DIR, settings.BLOCKLIST_INDEX_PATH)
@@ -0,0 +1,161 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .config import settings
+from .pools import pools, PoolSaturatedError
+from ..utils.urls import normalize_url, registered_domain
+
+# Returned by SignalCache.get when nothing fresh is stored for the key.
+MISS = object()
+
+class _MemoryLRU:
+    """In-process LRU bounded by the approximate pickled size of its values."""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, int, object]] = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISS
+        expires_at, _, value = entry
+        if expires_at <= time.time():
+            self._discard(key)
+            return MISS
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, expires_at: float, size: int):
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (expires_at, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+class _SQLiteTier:
+    """Persistent second tier so cached signals survive restarts. Blocking; runs on the cache pool."""
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signal_cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signal_cache_expiry ON signal_cache (expires_at)")
+        self._writes = 0
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM signal_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row
+
+    def set(self, key: str, blob: bytes, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signal_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, expires_at),
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._conn.execute("DELETE FROM signal_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+class SignalCache:
+    """
+    Two-tier cache for scan signals. Each signal has its own scope (what the key is built
+    from) and TTL in settings.SIGNAL_CACHE_POLICIES; signals without a policy are not cached.
+    """
+    def __init__(self, max_bytes: int, sqlite_path: str | None = None):
+        self._memory = _MemoryLRU(max_bytes)
+        self._persistent = _SQLiteTier(sqlite_path) if sqlite_path else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def policy(signal: str) -> dict | None:
+        return settings.SIGNAL_CACHE_POLICIES.get(signal)
+
+    def key_for(self, signal: str, url: str | None = None, host: str | None = None,
+                port: int | None = None, ip: str | None = None) -> str | None:
+        """Builds the cache key from whatever the signal's scope says it depends on."""
+        policy = self.policy(signal)
+        if policy is None:
+            return None
+        scope = policy["scope"]
+        if scope == "url":
+            return normalize_url(url) if url else None
+        if scope == "domain":
+            return registered_domain(host)
+        if scope == "ip":
+            return ip
+        if scope == "host_port":
+            return f"{host.lower()}:{port}" if host and port else None
+        return None
+
+    async def get(self, signal: str, key: str):
+        cache_key = f"{signal}:{key}"
+        value = self._memory.get(cache_key)
+        if value is MISS and self._persistent is not None:
+            try:
+                row = await pools["cache"].run(self._persistent.get, cache_key)
+            except PoolSaturatedError:
+                row = None
+            if row is not None:
+                blob, expires_at = row
+                value = pickle.loads(blob)
+                self._memory.set(cache_key, value, expires_at, len(blob))
+        if value is MISS:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, signal: str, key: str, value, ttl: float | None = None):
+        policy = self.policy(signal)
+        if policy is None:
+            return
+        ttl = policy["ttl"] if ttl is None else min(ttl, policy["ttl"])
+        if ttl <= 0:
+            return
+        cache_key = f"{signal}:{key}"
+        expires_at = time.time() + ttl
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._memory.set(cache_key, value, expires_at, len(blob))
+        if self._persistent is not None:
+            try:
+                await pools["cache"].run(self._persistent.set, cache_key, blob, expires_at)
+            except PoolSaturatedError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_bytes": self._memory.size,
+            "memory_entries": len(self._memory._entries),
+        }
+
+signal_cache = SignalCache(settings.CACHE_MAX_BYTES, settings.CACHE_SQLITE_PATH)
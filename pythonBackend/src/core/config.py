@@ -1,12 +1,186 @@
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
-    GOOGLE_SAFE_BROWSING_API_KEY: str
-    VIRUSTOTAL_API_KEY: str
-    ABUSEIPDB_API_KEY: str
-    URLSCAN_API_KEY: str
+    # Providers without a key are skipped and reported as "key_missing".
+    GOOGLE_SAFE_BROWSING_API_KEY: str | None = None
+    VIRUSTOTAL_API_KEY: str | None = None
+    ABUSEIPDB_API_KEY: str | None = None
+    URLSCAN_API_KEY: str | None = None
+
+    # Startup: warm_up preloads parsers, pools and clients before traffic is accepted;
+    # FTP/SSH support is otherwise imported on the first link of that protocol.
+    WARM_UP: bool = True
+    PRELOAD_PROTOCOLS: list[str] = []
+    # Public suffix list used for registered domains. Until PSL_FILE exists, tldextract's
+    # bundled snapshot is used; POST /api/psl/refresh downloads PSL_SOURCE_URL into it.
+    PSL_FILE: str | None = "public_suffix_list.dat"
+    PSL_SOURCE_URL: str = "https://publicsuffix.org/list/public_suffix_list.dat"
+
+    # Overall deadline for one scan; checks still running when it passes are reported as timed out.
+    SCAN_BUDGET_MS: int = 8000
+    # Per-check timeouts in seconds, keyed by signal name.
+    CHECK_TIMEOUTS: dict[str, float] = {
+        "reachability": 5.0,
+        "ip_address": 2.0,
+        "whois": 5.0,
+        "ssl": 3.0,
+        "abuseipdb": 4.0,
+        "google_safe_browsing": 4.0,
+        "virustotal": 6.0,
+        "urlscan": 4.0,
+    }
+
+    # Bounded worker pools for blocking lookups, one per kind of call.
+    POOL_WORKERS: dict[str, int] = {"dns": 16, "whois": 8, "cache": 4, "blocklist": 1, "history": 2, "psl": 1}
+    POOL_QUEUE_LIMITS: dict[str, int] = {"dns": 256, "whois": 64, "cache": 256, "blocklist": 0, "history": 512, "psl": 0}
+    # Process pools for CPU-bound analysis (0 workers runs it inline on the event loop).
+    PROCESS_POOL_WORKERS: dict[str, int] = {"html": 2}
+    PROCESS_POOL_QUEUE_LIMITS: dict[str, int] = {"html": 64}
+
+    # Shared HTTP client per reputation provider, plus the untrusted "target" pool for scanned URLs.
+    HTTP_POOLS: dict[str, dict] = {
+        "abuseipdb": {"base_url": "https://api.abuseipdb.com", "max_connections": 20, "max_keepalive": 10, "http2": True},
+        "google_safe_browsing": {"base_url": "https://safebrowsing.googleapis.com", "max_connections": 20, "max_keepalive": 10, "http2": True},
+        "virustotal": {"base_url": "https://www.virustotal.com", "max_connections": 20, "max_keepalive": 10, "http2": True},
+        "urlscan": {"base_url": "https://urlscan.io", "max_connections": 10, "max_keepalive": 5, "http2": True},
+        "target": {"max_connections": 200, "max_keepalive": 20, "keepalive_expiry": 5.0, "http2": False},
+    }
+    # DNS: nameservers as "host[:port]" (empty uses the system's), the most names cached, and
+    # bounds on how long answers are kept (record TTLs are clamped; NXDOMAIN/no-address answers
+    # are kept for DNS_NEGATIVE_TTL). /etc/hosts is honoured when using the system's nameservers.
+    DNS_NAMESERVERS: list[str] = []
+    DNS_CACHE_SIZE: int = 10000
+    DNS_MIN_TTL: float = 30.0
+    DNS_MAX_TTL: float = 3600.0
+    DNS_NEGATIVE_TTL: float = 60.0
+    DNS_HOSTS_FILE: str = "/etc/hosts"
+    # AbuseIPDB is asked about at most this many of a host's addresses (each costs quota).
+    ABUSEIPDB_MAX_IPS: int = 4
+    # Send every WHOIS query to this "host[:port]" (a local mirror or stand-in) instead of the registries.
+    WHOIS_SERVER: str | None = None
+
+    # Signal cache: how each signal is keyed ("url", "domain", "ip" or "host_port") and for how many seconds.
+    SIGNAL_CACHE_POLICIES: dict[str, dict] = {
+        "whois": {"scope": "domain", "ttl": 3 * 24 * 3600},
+        "abuseipdb": {"scope": "ip", "ttl": 6 * 3600},
+        "google_safe_browsing": {"scope": "url", "ttl": 10 * 60},
+        "virustotal": {"scope": "url", "ttl": 10 * 60},
+        # Certificates are additionally capped to expire a day before the certificate does.
+        "ssl": {"scope": "host_port", "ttl": 7 * 24 * 3600},
+        "urlscan": {"scope": "url", "ttl": 10 * 60},
+        # Probe results are keyed by IP:port, so hostnames sharing a server are probed once.
+        "ssh_banner": {"scope": "host_port", "ttl": 3600},
+        "ssh_host_key": {"scope": "host_port", "ttl": 24 * 3600},
+        "ftp_probe": {"scope": "host_port", "ttl": 3600},
+    }
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Set to a file path to keep cached signals across restarts.
+    CACHE_SQLITE_PATH: str | None = None
+
+    # Risk scoring rules. A rule adds its weight when its feature meets every bound given
+    # (gt/ge/lt/le; a rule without bounds fires when the feature is true) and, if
+    # "protocols" is set, the scan used one of them. Missing signals never fire.
+    SCORING_RULES: list[dict] = [
+        {"name": "unreachable", "feature": "unreachable", "weight": 50, "protocols": ["http"]},
+        {"name": "abuseipdb_high", "feature": "abuse_confidence", "gt": 80, "weight": 100},
+        {"name": "abuseipdb_medium", "feature": "abuse_confidence", "gt": 50, "le": 80, "weight": 50},
+        {"name": "local_blocklist", "feature": "blocklisted", "weight": 100},
+        {"name": "domain_age_under_90_days", "feature": "domain_age_days", "lt": 90, "weight": 40},
+        {"name": "domain_age_under_1_year", "feature": "domain_age_days", "ge": 90, "lt": 365, "weight": 20},
+        {"name": "invalid_syntax", "feature": "invalid_syntax", "weight": 70, "protocols": ["http"]},
+        {"name": "safe_browsing_malicious", "feature": "safe_browsing_malicious", "weight": 100, "protocols": ["http"]},
+        {"name": "virustotal_malicious", "feature": "virustotal_malicious", "weight": 100, "protocols": ["http"]},
+        {"name": "virustotal_suspicious", "feature": "virustotal_suspicious", "weight": 40, "protocols": ["http"]},
+        {"name": "urlscan_malicious", "feature": "urlscan_malicious", "weight": 100, "protocols": ["http"]},
+        {"name": "ssl_invalid", "feature": "ssl_invalid", "weight": 30, "protocols": ["http"]},
+        {"name": "iframe", "feature": "has_iframe", "weight": 20, "protocols": ["http"]},
+        {"name": "password_form_over_http", "feature": "password_form_over_http", "weight": 80, "protocols": ["http"]},
+        {"name": "anonymous_ftp", "feature": "anonymous_login_allowed", "weight": 30, "protocols": ["ftp"]},
+    ]
+    # Verdicts by minimum (capped) score; below every threshold the protocol's low-risk
+    # verdict applies. The reported risk score is further capped at 100.
+    SCORING_SCORE_CAP: int = 150
+    SCORING_VERDICTS: list[tuple[int, str]] = [(100, "❌ Malicious"), (70, "🚨 High Risk"), (30, "⚠️ Suspicious")]
+    SCORING_LOW_RISK_VERDICTS: dict[str, str] = {"http": "✅ Safe", "ftp": "ℹ️ Informational", "ssh": "ℹ️ Informational"}
+
+    # Scan history: every scan's signals and analysis, used to reuse signals that are still
+    # within their cache TTL on rescans and for history queries. Off unless a file path is set.
+    HISTORY_SQLITE_PATH: str | None = None
+    HISTORY_RETENTION_DAYS: int = 90
+
+    # Local blocklist: feed files (hosts files, URLhaus-style CSVs, URL/domain/IP lists) are
+    # compiled into a memory-mapped index. On a hit the reputation providers can be skipped.
+    BLOCKLIST_FEEDS_DIR: str | None = None
+    BLOCKLIST_INDEX_PATH: str = "blocklist.idx"
+    BLOCKLIST_SKIP_PROVIDERS_ON_HIT: bool = True
+
+    # Outbound quota per reputation provider. Calls wait up to max_wait_ms for a token,
+    # otherwise the check is skipped and reported as "rate_limited".
+    PROVIDER_RATE_LIMITS: dict[str, dict] = {
+        "virustotal": {"per_minute": 4, "per_day": 500, "max_wait_ms": 2000},
+        "abuseipdb": {"per_minute": 60, "per_day": 1000, "max_wait_ms": 1000},
+        "urlscan": {"per_minute": 60, "per_day": 5000, "max_wait_ms": 1000},
+        "google_safe_browsing": {"per_minute": 600, "max_wait_ms": 500},
+    }
+
+    # Certificates come from the reachability connection when possible; separate TLS probes
+    # are limited to this many at once and resume sessions kept for this many host:ports.
+    TLS_PROBE_CONCURRENCY: int = 64
+    TLS_SESSION_CACHE_SIZE: int = 1024
+
+    # SSH/FTP probes: concurrent probes overall and per target IP, the connect timeout per
+    # host, the limit for a whole probe, and how many listing entries FTP counts at most.
+    PROBE_CONCURRENCY: int = 512
+    PROBE_PER_IP_CONCURRENCY: int = 4
+    PROBE_CONNECT_TIMEOUT: float = 3.0
+    PROBE_TIMEOUT: float = 8.0
+    FTP_LIST_LIMIT: int = 1000
+    # Failed probes are cached for this many seconds instead of the full TTL.
+    PROBE_FAILURE_TTL: float = 60.0
+
+    # The scanned page is fetched once; reading (and HTML analysis) stops after this many bytes.
+    PAGE_MAX_BYTES: int = 512 * 1024
+    # Pages up to this size are analyzed inline; parsing them costs less than the hand-off to the html pool.
+    PAGE_INLINE_MAX_BYTES: int = 64 * 1024
+
+    # Safe Browsing lookups from concurrent scans are coalesced into one request
+    # (the API accepts up to 500 threatEntries per call).
+    SAFE_BROWSING_BATCH_SIZE: int = 200
+    SAFE_BROWSING_BATCH_WAIT_MS: float = 20.0
+
+    # /api/check/batch: links scanned at once per request, and the largest accepted batch.
+    BATCH_CONCURRENCY: int = 32
+    BATCH_MAX_LINKS: int = 50000
+    # /api/ingest: largest body read (after decompression) and most unique links returned
+    # when only extracting; scanning is still capped at BATCH_MAX_LINKS.
+    INGEST_MAX_BYTES: int = 1024 * 1024 * 1024
+    INGEST_MAX_LINKS: int = 1_000_000
+    # Crawl mode (/api/check?depth=N): deepest depth accepted, most links taken from each page,
+    # and budgets for one crawl (pages scanned, bytes fetched, overall deadline). Fetches run at
+    # most CRAWL_CONCURRENCY at once, CRAWL_PER_HOST_CONCURRENCY per host, and requests to one
+    # host start at least CRAWL_HOST_DELAY_MS apart.
+    CRAWL_MAX_DEPTH: int = 3
+    CRAWL_MAX_LINKS_PER_PAGE: int = 100
+    CRAWL_MAX_PAGES: int = 200
+    CRAWL_MAX_BYTES: int = 32 * 1024 * 1024
+    CRAWL_BUDGET_MS: int = 30000
+    CRAWL_CONCURRENCY: int = 16
+    CRAWL_PER_HOST_CONCURRENCY: int = 4
+    CRAWL_HOST_DELAY_MS: float = 10.0
+
+    # Scan jobs: backoff between polls of slow providers (seconds), when to give up,
+    # and how long finished jobs stay retrievable.
+    JOB_POLL_INITIAL_DELAY: float = 2.0
+    JOB_POLL_MAX_DELAY: float = 30.0
+    JOB_POLL_TIMEOUT: float = 300.0
+    JOB_TTL: float = 3600.0
+
+    # Instrumentation: Server-Timing header on every response, and how often (seconds)
+    # event-loop lag is sampled for /metrics (0 disables the sampler).
+    SERVER_TIMING: bool = True
+    EVENT_LOOP_LAG_INTERVAL: float = 0.5
 
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
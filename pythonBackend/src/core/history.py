@@ -0,0 +1,220 @@
+import ipaddress
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .config import settings
+from .scoring import FEATURES, compiled_rules, extract_features, protocol_code
+from ..utils.urls import normalize_url, registered_domain
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    scanned_at REAL NOT NULL,
+    protocol TEXT NOT NULL,
+    url TEXT NOT NULL,
+    final_url TEXT,
+    host TEXT,
+    domain TEXT,
+    ip TEXT,
+    risk_score INTEGER,
+    verdict TEXT,
+    analysis TEXT NOT NULL,
+    features BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_url ON scans (url, scanned_at);
+CREATE INDEX IF NOT EXISTS scans_host ON scans (host, scanned_at);
+CREATE INDEX IF NOT EXISTS scans_domain ON scans (domain, scanned_at);
+CREATE INDEX IF NOT EXISTS scans_time ON scans (scanned_at);
+CREATE TABLE IF NOT EXISTS signals (
+    scan_id INTEGER NOT NULL REFERENCES scans (id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    cache_key TEXT,
+    fetched_at REAL NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (scan_id, signal)
+);
+CREATE INDEX IF NOT EXISTS signals_url ON signals (url, signal, fetched_at);
+-- Every address a scan resolved to; scans.ip only holds the first
+CREATE TABLE IF NOT EXISTS scan_ips (
+    scan_id INTEGER NOT NULL REFERENCES scans (id) ON DELETE CASCADE,
+    ip TEXT NOT NULL,
+    scanned_at REAL NOT NULL,
+    PRIMARY KEY (scan_id, ip)
+);
+CREATE INDEX IF NOT EXISTS scan_ips_ip ON scan_ips (ip, scanned_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Columns returned by the history queries; the full analysis is fetched per scan.
+_SUMMARY_COLUMNS = "id, scanned_at, protocol, url, final_url, host, domain, ip, risk_score, verdict"
+_INDEXED_COLUMNS = {"url", "host", "domain", "ip"}
+
+class ScanHistory:
+    """
+    Persistent record of every scan: its signals with the time each was fetched, the
+    analysis, and its scoring features, indexed by normalized URL, host, registered
+    domain, IP and time. Blocking; callers run it on the history pool.
+    """
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        # Stored feature vectors are only reusable while the feature set is unchanged; after a
+        # change they are emptied, and re-extracted from the analysis when next re-scored
+        feature_set = json.dumps(list(FEATURES))
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'features'").fetchone()
+        if row is not None and row[0] != feature_set:
+            self._conn.execute("UPDATE scans SET features = x''")
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('features', ?)", (feature_set,))
+        # Databases from before scan_ips existed: index the one address they stored
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'scan_ips'").fetchone() is None:
+            self._conn.execute("INSERT OR IGNORE INTO scan_ips (scan_id, ip, scanned_at)"
+                               " SELECT id, ip, scanned_at FROM scans WHERE ip IS NOT NULL")
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('scan_ips', '1')")
+        self._conn.commit()
+        self._writes = 0
+
+    def record(self, analysis: dict, signals: dict[str, tuple[str | None, float, object]]) -> int:
+        """Stores a finished analysis and its signals; returns the scan id."""
+        scanned_at = time.time()
+        url = normalize_url(analysis["url"])
+        host = (urlsplit(url).hostname or "").lower() or None
+        features, protocols = extract_features([analysis])
+        scores, verdicts, _ = compiled_rules.score(features, protocols)
+        verdict = compiled_rules.verdict(int(verdicts[0]), int(protocols[0]))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO scans (scanned_at, protocol, url, final_url, host, domain, ip, risk_score, verdict,"
+                " analysis, features) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scanned_at, analysis["protocol"], url, analysis.get("final_url"), host, registered_domain(host),
+                 analysis.get("ip_address"), int(scores[0]), verdict,
+                 json.dumps(analysis, default=str), features[0].tobytes()),
+            )
+            scan_id = cursor.lastrowid
+            ips = analysis.get("ip_addresses") or [analysis.get("ip_address")]
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO scan_ips (scan_id, ip, scanned_at) VALUES (?, ?, ?)",
+                [(scan_id, ip, scanned_at) for ip in ips if ip],
+            )
+            self._conn.executemany(
+                "INSERT INTO signals (scan_id, url, signal, cache_key, fetched_at, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(scan_id, url, signal, key, fetched_at, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                 for signal, (key, fetched_at, value) in signals.items()],
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._conn.execute("DELETE FROM scans WHERE scanned_at < ?",
+                                   (scanned_at - settings.HISTORY_RETENTION_DAYS * 86400,))
+            self._conn.commit()
+        return scan_id
+
+    def update(self, scan_id: int, analysis: dict, signals: dict[str, tuple[str | None, float, object]]):
+        """Replaces a scan's analysis after slow providers finished, adding their signals."""
+        features, protocols = extract_features([analysis])
+        scores, verdicts, _ = compiled_rules.score(features, protocols)
+        verdict = compiled_rules.verdict(int(verdicts[0]), int(protocols[0]))
+        with self._lock:
+            row = self._conn.execute("SELECT url FROM scans WHERE id = ?", (scan_id,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute(
+                "UPDATE scans SET risk_score = ?, verdict = ?, analysis = ?, features = ? WHERE id = ?",
+                (int(scores[0]), verdict, json.dumps(analysis, default=str), features[0].tobytes(), scan_id),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signals (scan_id, url, signal, cache_key, fetched_at, value)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(scan_id, row[0], signal, key, fetched_at, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                 for signal, (key, fetched_at, value) in signals.items()],
+            )
+            self._conn.commit()
+
+    def latest_signals(self, url: str) -> dict[str, tuple[str | None, float, object]]:
+        """The most recently fetched value of each signal recorded for the URL."""
+        with self._lock:
+            # SQLite takes the bare columns from the row that has the MAX()
+            rows = self._conn.execute(
+                "SELECT signal, cache_key, MAX(fetched_at), value FROM signals WHERE url = ? GROUP BY signal",
+                (normalize_url(url),),
+            ).fetchall()
+        return {signal: (key, fetched_at, pickle.loads(value)) for signal, key, fetched_at, value in rows}
+
+    def find(self, column: str, value: str, since: float, limit: int) -> list[dict]:
+        """
+        Scans whose column (url, host, domain or ip) equals value since a time, newest first.
+        An ip matches any address the scan resolved to, not only the first.
+        """
+        if column not in _INDEXED_COLUMNS:
+            raise ValueError(f"Scan history is not indexed by {column!r}")
+        if column == "url":
+            value = normalize_url(value)
+        elif column in ("host", "domain"):
+            value = value.lower().rstrip(".")
+        elif column == "ip":
+            try:
+                value = str(ipaddress.ip_address(value.strip("[]")))
+            except ValueError:
+                pass
+        if column == "ip":
+            query = (f"SELECT {_SUMMARY_COLUMNS} FROM scans WHERE id IN"
+                     " (SELECT scan_id FROM scan_ips WHERE ip = ? AND scanned_at >= ?)")
+        else:
+            query = f"SELECT {_SUMMARY_COLUMNS} FROM scans WHERE {column} = ? AND scanned_at >= ?"
+        with self._lock:
+            cursor = self._conn.execute(query + " ORDER BY scanned_at DESC LIMIT ?", (value, since, limit))
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def get(self, scan_id: int) -> dict | None:
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {_SUMMARY_COLUMNS}, analysis FROM scans WHERE id = ?", (scan_id,))
+            row = cursor.fetchone()
+            names = [description[0] for description in cursor.description]
+        if row is None:
+            return None
+        scan = dict(zip(names, row))
+        scan["analysis"] = json.loads(scan["analysis"])
+        return scan
+
+    def feature_matrix(self, since: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+        """(scan ids, features, protocol codes, stored verdicts) of every scan since a time, for bulk re-scoring."""
+        with self._lock:
+            # The analysis is only read for scans whose stored vector is out of date
+            rows = self._conn.execute(
+                "SELECT id, protocol, verdict, features,"
+                " CASE WHEN length(features) = ? THEN NULL ELSE analysis END"
+                " FROM scans WHERE scanned_at >= ? ORDER BY id",
+                (len(FEATURES) * 8, since),
+            ).fetchall()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        features = np.empty((len(rows), len(FEATURES)), dtype=np.float64)
+        protocols = np.array([protocol_code(row[1]) for row in rows], dtype=np.int8)
+        stale = [n for n, row in enumerate(rows) if row[4] is not None]
+        current = [n for n, row in enumerate(rows) if row[4] is None]
+        if current:
+            features[current] = np.frombuffer(b"".join(rows[n][3] for n in current), dtype=np.float64).reshape(
+                len(current), len(FEATURES))
+        if stale:
+            features[stale], protocols[stale] = extract_features(json.loads(rows[n][4]) for n in stale)
+            with self._lock:
+                self._conn.executemany("UPDATE scans SET features = ? WHERE id = ?",
+                                       [(features[n].tobytes(), rows[n][0]) for n in stale])
+                self._conn.commit()
+        return ids, features, protocols, [row[2] for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            scans, oldest = self._conn.execute("SELECT COUNT(*), MIN(scanned_at) FROM scans").fetchone()
+        return {"scans": scans, "oldest": oldest}
+
+scan_history = ScanHistory(settings.HISTORY_SQLITE_PATH) if settings.HISTORY_SQLITE_PATH else None
@@ -0,0 +1,66 @@
+import importlib.util
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+from .config import settings
+from .metrics import provider_request_seconds
+
+# HTTP/2 needs the optional 'h2' package (httpx[http2]); fall back to HTTP/1.1 without it.
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class HTTPClientPool:
+    """
+    Application-lifetime httpx clients, one per reputation provider plus a separate,
+    untrusted client for fetching the scanned targets. Clients are created on first
+    use so connections and TLS sessions are reused across scans.
+    """
+    def __init__(self, config: dict[str, dict] | None = None):
+        self._config = config or settings.HTTP_POOLS
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._build(name)
+        return client
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        config = self._config[name]
+        limits = httpx.Limits(
+            max_connections=config.get("max_connections", 20),
+            max_keepalive_connections=config.get("max_keepalive", 10),
+            keepalive_expiry=config.get("keepalive_expiry", 30.0),
+        )
+        kwargs = {
+            "limits": limits,
+            "timeout": config.get("timeout", 10.0),
+            "http2": bool(config.get("http2")) and _HTTP2_AVAILABLE,
+        }
+        if name == "target":
+            # Scanned sites are untrusted: follow their redirects but never keep their cookies.
+            kwargs["follow_redirects"] = True
+            kwargs["cookies"] = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        else:
+            kwargs["base_url"] = config["base_url"]
+        kwargs["event_hooks"] = self._timing_hooks(name)
+        return httpx.AsyncClient(**kwargs)
+
+    @staticmethod
+    def _timing_hooks(name: str) -> dict:
+        """Records each request's time to response headers; redirects count as separate requests."""
+        async def on_request(request: httpx.Request):
+            request.extensions["timing_started"] = time.perf_counter()
+
+        async def on_response(response: httpx.Response):
+            started = response.request.extensions.get("timing_started")
+            if started is not None:
+                provider_request_seconds.observe(time.perf_counter() - started, name, f"{response.status_code // 100}xx")
+
+        return {"request": [on_request], "response": [on_response]}
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -0,0 +1,126 @@
+import bisect
+import math
+from typing import Callable, Iterable
+
+class Histogram:
+    """Cumulative bucketed histogram, in the shape Prometheus expects."""
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result, running = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), self._counts):
+            running += count
+            result.append(("+Inf" if bound == math.inf else str(bound), running))
+        return result
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": dict(self.cumulative())}
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class HistogramFamily:
+    """Histograms keyed by label values; children are created on first use."""
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], labels: tuple[str, ...] = ()):
+        self.name, self.help, self.buckets, self.label_names = name, help, buckets, labels
+        self._children: dict[tuple, Histogram] = {}
+
+    def observe(self, value: float, *label_values):
+        child = self._children.get(label_values)
+        if child is None:
+            child = self._children[label_values] = Histogram(self.buckets)
+        child.observe(value)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for values, child in sorted(self._children.items()):
+            for bound, count in child.cumulative():
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_labels(self.label_names, values, le)} {count}"
+            yield f"{self.name}_sum{_labels(self.label_names, values)} {child.sum}"
+            yield f"{self.name}_count{_labels(self.label_names, values)} {child.count}"
+
+class CounterFamily:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for values, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.label_names, values)} {value}"
+
+class CallbackFamily:
+    """A gauge or counter whose samples are read from existing stats at scrape time."""
+    def __init__(self, name: str, help: str, kind: str, labels: tuple[str, ...], read: Callable[[], dict]):
+        self.name, self.help, self.kind, self.label_names, self.read = name, help, kind, labels, read
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, value in sorted(self.read().items()):
+            yield f"{self.name}{_labels(self.label_names, values)} {value}"
+
+class MetricsRegistry:
+    """Process-wide metric families, rendered in the Prometheus text exposition format."""
+    def __init__(self):
+        self._families = []
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...], labels: tuple[str, ...] = ()) -> HistogramFamily:
+        family = HistogramFamily(name, help, buckets, labels)
+        self._families.append(family)
+        return family
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> CounterFamily:
+        family = CounterFamily(name, help, labels)
+        self._families.append(family)
+        return family
+
+    def callback(self, name: str, help: str, kind: str, labels: tuple[str, ...], read: Callable[[], dict]):
+        """read() returns {label values tuple: value}; kind is "gauge" or "counter"."""
+        self._families.append(CallbackFamily(name, help, kind, labels, read))
+
+    def render(self) -> str:
+        return "\n".join(line for family in self._families for line in family.render()) + "\n"
+
+registry = MetricsRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+stage_seconds = registry.histogram(
+    "linkguard_stage_seconds", "Duration of each scan step, by outcome (ok, timeout, error, failed, rate_limited, ...).",
+    LATENCY_BUCKETS, ("stage", "outcome"),
+)
+scan_seconds = registry.histogram("linkguard_scan_seconds", "Duration of whole scans.", LATENCY_BUCKETS, ("protocol",))
+provider_request_seconds = registry.histogram(
+    "linkguard_provider_request_seconds", "Time to response headers of outbound HTTP requests, by client and status class.",
+    LATENCY_BUCKETS, ("client", "status"),
+)
+signal_cache_lookups = registry.counter(
+    "linkguard_signal_cache_lookups_total", "Signal lookups by where the value came from (cache, history, computed, uncached).",
+    ("signal", "source"),
+)
+event_loop_lag_seconds = registry.histogram(
+    "linkguard_event_loop_lag_seconds", "How late the event loop woke up a periodic timer.",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+from .config import settings
+
+class PoolSaturatedError(Exception):
+    """Raised when a worker pool's backlog is full and a new job would only wait behind it."""
+    pass
+
+class WorkerPool:
+    """
+    A named, bounded thread pool for blocking calls (DNS, WHOIS, SQLite).
+    Each kind of call gets its own pool so a WHOIS backlog cannot starve DNS.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"linkguard-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        """Runs fn(*args) on the pool, or raises PoolSaturatedError if the backlog is full."""
+        if self._pending >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise PoolSaturatedError(f"{self.name} pool is saturated")
+        self._pending += 1
+        try:
+            # Jobs still queued when the caller gives up are cancelled before they start.
+            return await self._submit(asyncio.get_running_loop(), fn, args)
+        finally:
+            self._pending -= 1
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, fn: Callable, args: tuple) -> asyncio.Future:
+        return loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def prestart(self):
+        """Starts every worker thread now instead of on the first jobs."""
+        barrier = threading.Barrier(self.max_workers)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, barrier.wait, 5) for _ in range(self.max_workers)))
+
+    def _call(self, fn: Callable, args: tuple):
+        with self._lock:
+            self._active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    def stats(self) -> dict:
+        active = self._active
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": active,
+            "queued": max(self._pending - active, 0),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "saturation": round(self._pending / (self.max_workers + self.max_queue), 3),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class ProcessPool(WorkerPool):
+    """
+    A named, bounded process pool for CPU-bound work such as HTML analysis, so it neither
+    holds the GIL nor stalls the event loop. fn and its arguments are pickled: pass bytes
+    rather than decoded text. Workers are spawned, not forked, as the app runs threads.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, fn: Callable, args: tuple) -> asyncio.Future:
+        future = loop.run_in_executor(self._executor, fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: asyncio.Future):
+        self._completed += 1
+
+    async def prestart(self):
+        """Spawns every worker process now; each one takes tens of milliseconds to start."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, os.getpid) for _ in range(self.max_workers)))
+
+    @property
+    def _active(self) -> int:
+        # Which jobs a worker process has picked up is not tracked; in-flight jobs fill workers first
+        return min(self._pending, self.max_workers)
+
+pools = {
+    name: WorkerPool(name, settings.POOL_WORKERS[name], settings.POOL_QUEUE_LIMITS[name])
+    for name in settings.POOL_WORKERS
+}
+pools.update({
+    name: ProcessPool(name, workers, settings.PROCESS_POOL_QUEUE_LIMITS[name])
+    for name, workers in settings.PROCESS_POOL_WORKERS.items() if workers > 0
+})
+
+def pool_stats() -> dict:
+    """Current load of every worker pool, used to size POOL_WORKERS and POOL_QUEUE_LIMITS."""
+    return {name: pool.stats() for name, pool in pools.items()}
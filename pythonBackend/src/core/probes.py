@@ -0,0 +1,179 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+
+from .config import settings
+
+# RFC 4253: servers may send other lines before the "SSH-" identification string
+_MAX_PRE_BANNER_LINES = 16
+_MAX_LINE = 1024
+_PASV_REPLY = re.compile(r"(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)")
+_EPSV_REPLY = re.compile(r"\|\|\|(\d+)\|")
+
+class ProbeError(Exception):
+    """A target that connected but did not speak the expected protocol."""
+    pass
+
+class ProbeEngine:
+    """
+    Lightweight SSH and FTP probes for scanning many endpoints: raw-socket protocol
+    exchanges that stop as soon as they have what the scan needs. Concurrency is capped
+    globally and per IP, so a burst of targets on the same host cannot flood it.
+    """
+    def __init__(self, max_concurrency: int, per_ip_concurrency: int):
+        self._global = asyncio.Semaphore(max_concurrency)
+        self.per_ip_concurrency = per_ip_concurrency
+        self._per_ip: dict[str, list] = {}  # ip -> [semaphore, users]
+        self.probes = 0
+        self.failures = 0
+
+    @asynccontextmanager
+    async def _slot(self, ip: str):
+        entry = self._per_ip.setdefault(ip, [asyncio.Semaphore(self.per_ip_concurrency), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._global:
+                self.probes += 1
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._per_ip[ip]
+
+    @staticmethod
+    async def _connect(ip: str, port: int):
+        return await asyncio.wait_for(asyncio.open_connection(ip, port), settings.PROBE_CONNECT_TIMEOUT)
+
+    @staticmethod
+    async def _read_raw_line(reader: asyncio.StreamReader) -> bytes:
+        """The next line, or what is left of the stream at EOF (b"" once it is used up)."""
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError:
+            # readline() would raise ValueError; a line this long is not from a real server
+            raise ProbeError("Line longer than the stream limit")
+
+    async def _readline(self, reader: asyncio.StreamReader) -> str:
+        line = await self._read_raw_line(reader)
+        if not line:
+            raise ProbeError("Connection closed by the server")
+        return line[:_MAX_LINE].decode("utf-8", errors="replace").rstrip("\r\n")
+
+    async def ssh_banner(self, ip: str, port: int) -> dict:
+        """Reads the server's identification string without starting a key exchange."""
+        async with self._slot(ip):
+            try:
+                return await asyncio.wait_for(self._ssh_banner(ip, port), settings.PROBE_TIMEOUT)
+            except (OSError, asyncio.TimeoutError, ProbeError) as e:
+                self.failures += 1
+                return {"is_reachable": isinstance(e, ProbeError), "server_banner": None}
+
+    async def _ssh_banner(self, ip: str, port: int) -> dict:
+        reader, writer = await self._connect(ip, port)
+        try:
+            for _ in range(_MAX_PRE_BANNER_LINES):
+                line = await self._readline(reader)
+                if line.startswith("SSH-"):
+                    return {"is_reachable": True, "server_banner": line}
+            raise ProbeError("No SSH identification string")
+        finally:
+            writer.close()
+
+    async def ssh_host_key(self, ip: str, port: int) -> dict:
+        """Runs just the key exchange to collect the host key; no authentication is attempted."""
+        import asyncssh  # only needed when host keys are asked for
+
+        async with self._slot(ip):
+            try:
+                key = await asyncio.wait_for(asyncssh.get_server_host_key(ip, port), settings.PROBE_TIMEOUT)
+            except (OSError, asyncio.TimeoutError, asyncssh.Error):
+                self.failures += 1
+                return {"host_key_type": None, "host_key_fingerprint": None}
+        return {"host_key_type": key.get_algorithm() if key else None,
+                "host_key_fingerprint": key.get_fingerprint() if key else None}
+
+    async def ftp(self, ip: str, port: int, list_limit: int) -> dict:
+        """
+        Reads the greeting, tries an anonymous login and, if it works, counts at most
+        list_limit entries of the root listing before hanging up.
+        """
+        result = {
+            "is_reachable": False,
+            "anonymous_login_allowed": False,
+            "welcome_message": None,
+            "directory_listing_count": 0,
+            "directory_listing_truncated": False,
+        }
+        async with self._slot(ip):
+            try:
+                await asyncio.wait_for(self._ftp(ip, port, list_limit, result), settings.PROBE_TIMEOUT)
+            except (OSError, asyncio.TimeoutError, ProbeError):
+                self.failures += 1
+        return result
+
+    async def _ftp(self, ip: str, port: int, list_limit: int, result: dict):
+        reader, writer = await self._connect(ip, port)
+        try:
+            code, greeting = await self._ftp_reply(reader)
+            result["is_reachable"] = True
+            result["welcome_message"] = greeting
+            if code != 220:
+                return
+            code, _ = await self._ftp_command(reader, writer, "USER anonymous")
+            if code == 331:
+                code, _ = await self._ftp_command(reader, writer, "PASS anonymous@")
+            if code != 230:
+                return
+            result["anonymous_login_allowed"] = True
+            if list_limit > 0:
+                await self._ftp_count_entries(reader, writer, ip, list_limit, result)
+            writer.write(b"QUIT\r\n")
+        finally:
+            writer.close()
+
+    async def _ftp_count_entries(self, reader, writer, ip: str, list_limit: int, result: dict):
+        ipv6 = ":" in ip
+        code, reply = await self._ftp_command(reader, writer, "EPSV" if ipv6 else "PASV")
+        match = (_EPSV_REPLY if ipv6 else _PASV_REPLY).search(reply)
+        if code not in (227, 229) or not match:
+            return
+        # Connect to the control connection's IP, never to the address the server names
+        data_port = int(match.group(1)) if ipv6 else int(match.group(5)) * 256 + int(match.group(6))
+        data_reader, data_writer = await self._connect(ip, data_port)
+        try:
+            code, _ = await self._ftp_command(reader, writer, "NLST")
+            if code not in (125, 150):
+                return
+            count = 0
+            while count < list_limit and await self._read_raw_line(data_reader):
+                count += 1
+            result["directory_listing_count"] = count
+            result["directory_listing_truncated"] = count >= list_limit and bool(await self._read_raw_line(data_reader))
+        finally:
+            data_writer.close()
+
+    async def _ftp_command(self, reader, writer, command: str) -> tuple[int, str]:
+        writer.write(command.encode() + b"\r\n")
+        await writer.drain()
+        return await self._ftp_reply(reader)
+
+    async def _ftp_reply(self, reader) -> tuple[int, str]:
+        """Reads a (possibly multi-line, "123-...123 ") reply; returns its code and text."""
+        line = await self._readline(reader)
+        if len(line) < 3 or not line[:3].isdigit():
+            raise ProbeError("Not an FTP server")
+        code, lines = line[:3], [line[4:]]
+        if line[3:4] == "-":
+            while True:
+                line = await self._readline(reader)
+                lines.append(line[4:] if line.startswith(code) else line)
+                if line.startswith(code + " "):
+                    break
+        return int(code), "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {"probes": self.probes, "failures": self.failures, "active_ips": len(self._per_ip)}
+
+probe_engine = ProbeEngine(settings.PROBE_CONCURRENCY, settings.PROBE_PER_IP_CONCURRENCY)
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from .config import settings
+
+class TokenBucket:
+    """
+    Per-provider quota guard: a token bucket refilled at per_minute/60 tokens a second,
+    plus an optional daily cap that resets at midnight UTC.
+
+    acquire() reserves a token and waits for it when the wait fits within max_wait;
+    otherwise it returns False straight away so the caller can skip the check.
+    """
+    def __init__(self, per_minute: float, burst: int | None = None, per_day: int | None = None,
+                 max_wait_ms: float = 1000):
+        self.rate = per_minute / 60
+        self.capacity = burst or max(int(per_minute), 1)
+        self.per_day = per_day
+        self.max_wait = max_wait_ms / 1000
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._day = None
+        self._used_today = 0
+        self.granted = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        today = datetime.now(timezone.utc).date()
+        if today != self._day:
+            self._day, self._used_today = today, 0
+
+    async def acquire(self) -> bool:
+        self._refill()
+        if self.per_day is not None and self._used_today >= self.per_day:
+            self.rejected += 1
+            return False
+        wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+        if wait > self.max_wait:
+            self.rejected += 1
+            return False
+
+        # Reserve the token now so later callers queue behind this one
+        self._tokens -= 1
+        self._used_today += 1
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._tokens += 1
+                self._used_today -= 1
+                raise
+        self.granted += 1
+        return True
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "used_today": self._used_today,
+            "per_day": self.per_day,
+            "granted": self.granted,
+            "rejected": self.rejected,
+        }
+
+rate_limiters = {name: TokenBucket(**limits) for name, limits in settings.PROVIDER_RATE_LIMITS.items()}
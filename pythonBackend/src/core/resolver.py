@@ -0,0 +1,170 @@
+import asyncio
+import importlib.util
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+
+from .config import settings
+from .pools import pools, PoolSaturatedError
+from .singleflight import single_flight
+
+# dnspython is optional; without it lookups fall back to getaddrinfo on the dns pool.
+_DNSPYTHON_AVAILABLE = importlib.util.find_spec("dns") is not None
+
+class _LookupFailed(Exception):
+    """A lookup that timed out or hit a failing server; unlike NXDOMAIN it is not cached."""
+    pass
+
+class DNSResolver:
+    """
+    Async A/AAAA lookups, both queried at once, returning every address (IPv4 first).
+    Answers are cached for their record TTL, clamped to DNS_MIN_TTL..DNS_MAX_TTL; names
+    that do not exist or have no address are cached for DNS_NEGATIVE_TTL. The cache holds
+    at most DNS_CACHE_SIZE names, least recently used first out.
+    """
+    def __init__(self, nameservers: list[str] | None = None, max_entries: int | None = None):
+        self.nameservers = settings.DNS_NAMESERVERS if nameservers is None else nameservers
+        self.max_entries = max_entries or settings.DNS_CACHE_SIZE
+        self._entries: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+        self._resolver = None
+        self._hosts: dict[str, list[str]] | None = None
+        self.hits = 0
+        self.misses = 0
+        self.negative = 0
+        self.failures = 0
+
+    async def resolve(self, hostname: str | None) -> list[str]:
+        if not hostname:
+            return []
+        hostname = hostname.rstrip(".").lower()
+        try:
+            return [str(ipaddress.ip_address(hostname.strip("[]")))]
+        except ValueError:
+            pass
+        entry = self._entries.get(hostname)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(hostname)
+                self.hits += 1
+                return entry[1]
+            del self._entries[hostname]
+        self.misses += 1
+        return await single_flight.do(f"dns:{hostname}", lambda: self._lookup(hostname))
+
+    async def _lookup(self, hostname: str) -> list[str]:
+        try:
+            if _DNSPYTHON_AVAILABLE:
+                addresses, ttl = await self._query(hostname)
+            else:
+                addresses, ttl = await self._getaddrinfo(hostname)
+        except _LookupFailed:
+            self.failures += 1
+            return []
+        if not addresses:
+            self.negative += 1
+            ttl = settings.DNS_NEGATIVE_TTL
+        self._store(hostname, addresses, ttl)
+        return addresses
+
+    async def _query(self, hostname: str) -> tuple[list[str], float]:
+        hosts = self._hosts_file().get(hostname)
+        if hosts:
+            return hosts, settings.DNS_MAX_TTL
+        import dns.exception
+        import dns.resolver
+        resolver = self._get_resolver()
+        answers = await asyncio.gather(*(resolver.resolve(hostname, record, search=False) for record in ("A", "AAAA")),
+                                       return_exceptions=True)
+        addresses, ttls = [], []
+        for answer in answers:
+            if isinstance(answer, (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)):
+                continue
+            if isinstance(answer, dns.exception.DNSException):
+                raise _LookupFailed(str(answer))
+            if isinstance(answer, BaseException):
+                raise answer
+            addresses.extend(record.to_text() for record in answer)
+            ttls.append(answer.rrset.ttl)
+        ttl = min(max(min(ttls, default=0), settings.DNS_MIN_TTL), settings.DNS_MAX_TTL)
+        return addresses, ttl
+
+    def prepare(self):
+        """Imports dnspython and reads the resolver configuration ahead of the first lookup."""
+        if _DNSPYTHON_AVAILABLE:
+            import dns.exception
+            import dns.resolver
+            self._get_resolver()
+            self._hosts_file()
+
+    def _get_resolver(self):
+        if self._resolver is None:
+            import dns.asyncresolver
+            import dns.nameserver
+            # Without configured nameservers the system's resolv.conf applies
+            resolver = dns.asyncresolver.Resolver(configure=not self.nameservers)
+            if self.nameservers:
+                servers = []
+                for server in self.nameservers:
+                    # "host[:port]"; a bare IPv6 address has no port
+                    host, _, port = server.rpartition(":") if server.count(":") == 1 else (server, "", "")
+                    servers.append(dns.nameserver.Do53Nameserver(host, int(port or 53)))
+                resolver.nameservers = servers
+            resolver.lifetime = settings.CHECK_TIMEOUTS.get("ip_address", 2.0)
+            self._resolver = resolver
+        return self._resolver
+
+    def _hosts_file(self) -> dict[str, list[str]]:
+        """Static entries from /etc/hosts, which DNS queries bypass; unused with explicit nameservers."""
+        if self._hosts is None:
+            self._hosts = {}
+            if not self.nameservers:
+                try:
+                    with open(settings.DNS_HOSTS_FILE) as f:
+                        for line in f:
+                            address, *names = line.split("#", 1)[0].split() or [None]
+                            for name in names:
+                                self._hosts.setdefault(name.lower(), []).append(address)
+                except OSError:
+                    pass
+        return self._hosts
+
+    async def _getaddrinfo(self, hostname: str) -> tuple[list[str], float]:
+        try:
+            infos = await pools["dns"].run(socket.getaddrinfo, hostname, None, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+                return [], settings.DNS_NEGATIVE_TTL
+            raise _LookupFailed(str(e))
+        except PoolSaturatedError as e:
+            raise _LookupFailed(str(e))
+        # getaddrinfo does not report TTLs
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        return list(dict.fromkeys(info[4][0] for info in infos)), settings.DNS_MIN_TTL
+
+    def _store(self, hostname: str, addresses: list[str], ttl: float):
+        if ttl <= 0:
+            return
+        self._entries[hostname] = (time.monotonic() + ttl, addresses)
+        self._entries.move_to_end(hostname)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "dnspython" if _DNSPYTHON_AVAILABLE else "getaddrinfo",
+            "nameservers": self.nameservers or "system",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "negative_answers": self.negative,
+            "failures": self.failures,
+        }
+
+dns_resolver = DNSResolver()
@@ -0,0 +1,141 @@
+import math
+from datetime import datetime
+from typing import Callable, Iterable
+
+import numpy as np
+
+from .config import settings
+
+PROTOCOLS = ("http", "ftp", "ssh")
+_OTHER_PROTOCOL = len(PROTOCOLS)
+
+def _flag(value) -> float:
+    return 1.0 if value else 0.0
+
+def _domain_age_days(analysis: dict, now: datetime) -> float:
+    whois_info = analysis.get("whois_info") or analysis.get("dns_whois_info")
+    if not isinstance(whois_info, dict) or not whois_info.get("creation_date"):
+        return math.nan
+    creation_date = whois_info["creation_date"]
+    if isinstance(creation_date, list):
+        creation_date = creation_date[0]
+    try:
+        if isinstance(creation_date, str):
+            # Stored analyses carry dates as ISO strings
+            creation_date = datetime.fromisoformat(creation_date)
+        if creation_date.tzinfo is not None:
+            creation_date = creation_date.astimezone().replace(tzinfo=None)
+        return float((now - creation_date).days)
+    except (TypeError, ValueError, AttributeError):
+        return math.nan
+
+def _abuse_confidence(analysis: dict, now: datetime) -> float:
+    abuseipdb_info = analysis.get("abuseipdb")
+    if not isinstance(abuseipdb_info, dict):
+        return math.nan
+    try:
+        return float(abuseipdb_info.get("abuse_confidence_score", 0))
+    except (TypeError, ValueError):
+        return math.nan
+
+def _password_form_over_http(analysis: dict, now: datetime) -> float:
+    content = analysis.get("page_content_analysis") or {}
+    return _flag(content.get("has_form_with_password") and not (analysis.get("final_url") or "").startswith("https://"))
+
+# Numeric features the rules can refer to, extracted from an analysis dict.
+# Booleans are 0/1; NaN means the signal is missing and no rule on it fires.
+FEATURES: dict[str, Callable[[dict, datetime], float]] = {
+    "unreachable": lambda a, now: _flag(a.get("is_reachable") is False),
+    "abuse_confidence": _abuse_confidence,
+    "blocklisted": lambda a, now: _flag(isinstance(a.get("local_blocklist"), dict) and a["local_blocklist"].get("listed")),
+    "domain_age_days": _domain_age_days,
+    "invalid_syntax": lambda a, now: _flag(not a.get("protocol_valid", True) or not a.get("syntax_valid", True)),
+    "safe_browsing_malicious": lambda a, now: _flag(a.get("google_safe_browsing") == "malicious"),
+    "virustotal_malicious": lambda a, now: _flag(a.get("virustotal") == "malicious"),
+    "virustotal_suspicious": lambda a, now: _flag(a.get("virustotal") == "suspicious"),
+    "urlscan_malicious": lambda a, now: _flag(isinstance(a.get("urlscan"), dict) and a["urlscan"].get("malicious")),
+    "ssl_invalid": lambda a, now: _flag(a.get("ssl_valid") is False),
+    "has_iframe": lambda a, now: _flag((a.get("page_content_analysis") or {}).get("has_iframe")),
+    "password_form_over_http": _password_form_over_http,
+    "anonymous_login_allowed": lambda a, now: _flag(a.get("anonymous_login_allowed")),
+}
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+def protocol_code(protocol: str | None) -> int:
+    return PROTOCOLS.index(protocol) if protocol in PROTOCOLS else _OTHER_PROTOCOL
+
+def extract_features(analyses: Iterable[dict], now: datetime | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Turns analysis dicts into a (rows, features) float matrix and a protocol-code column."""
+    now = now or datetime.now()
+    extractors = list(FEATURES.values())
+    rows, protocols = [], []
+    for analysis in analyses:
+        rows.append([extract(analysis, now) for extract in extractors])
+        protocols.append(protocol_code(analysis.get("protocol")))
+    features = np.array(rows, dtype=np.float64).reshape(len(rows), len(extractors))
+    return features, np.array(protocols, dtype=np.int8)
+
+class CompiledRules:
+    """
+    A rule table compiled to columnar form. Each rule becomes one column of lower/upper
+    bounds, a weight and a protocol mask, so scoring N rows is a handful of NumPy
+    operations over an (N, rules) matrix.
+    """
+    def __init__(self, rules: list[dict], score_cap: int, verdicts: list, low_risk_verdicts: dict[str, str]):
+        self.names = []
+        feature_ids, weights = [], []
+        bounds = {op: [] for op in ("gt", "ge", "lt", "le")}
+        allowed = np.zeros((len(PROTOCOLS) + 1, len(rules)), dtype=bool)
+        for i, rule in enumerate(rules):
+            if rule["feature"] not in FEATURE_INDEX:
+                raise ValueError(f"Scoring rule {rule.get('name')!r} uses unknown feature {rule['feature']!r}")
+            self.names.append(rule.get("name") or rule["feature"])
+            feature_ids.append(FEATURE_INDEX[rule["feature"]])
+            weights.append(rule["weight"])
+            has_bounds = any(op in rule for op in bounds)
+            for op, values in bounds.items():
+                default = -np.inf if op in ("gt", "ge") else np.inf
+                # A rule without bounds is a boolean rule: it fires when the feature is true
+                values.append(rule.get(op, 1 if op == "ge" and not has_bounds else default))
+            for protocol in rule.get("protocols") or PROTOCOLS + ("other",):
+                allowed[protocol_code(protocol), i] = True
+
+        self.feature_ids = np.array(feature_ids, dtype=np.intp)
+        self.weights = np.array(weights, dtype=np.float64)
+        self.gt, self.ge, self.lt, self.le = (np.array(bounds[op], dtype=np.float64) for op in ("gt", "ge", "lt", "le"))
+        self.allowed = allowed
+        self.score_cap = score_cap
+        # searchsorted needs ascending thresholds; labels[0] is the low-risk slot
+        ordered = sorted(verdicts, key=lambda verdict: verdict[0])
+        self.thresholds = np.array([threshold for threshold, _ in ordered], dtype=np.float64)
+        self.labels = [None] + [label for _, label in ordered]
+        self.low_risk_verdicts = [low_risk_verdicts.get(p, low_risk_verdicts.get("http")) for p in PROTOCOLS]
+        self.low_risk_verdicts.append(low_risk_verdicts.get("http"))
+
+    def contributions(self, features: np.ndarray, protocols: np.ndarray) -> np.ndarray:
+        """Per-rule points for every row, shape (rows, rules). NaN features never fire."""
+        values = features[:, self.feature_ids]
+        with np.errstate(invalid="ignore"):
+            fired = (values > self.gt) & (values >= self.ge) & (values < self.lt) & (values <= self.le)
+        fired &= self.allowed[protocols]
+        return fired * self.weights
+
+    def score(self, features: np.ndarray, protocols: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (risk scores 0-100, verdict indexes, contributions) for a feature matrix."""
+        contributions = self.contributions(features, protocols)
+        raw = np.minimum(contributions.sum(axis=1), self.score_cap)
+        verdicts = np.searchsorted(self.thresholds, raw, side="right")
+        return np.minimum(raw, 100).astype(np.int64), verdicts, contributions
+
+    def verdict(self, verdict_index: int, protocol: int) -> str:
+        return self.labels[verdict_index] if verdict_index else self.low_risk_verdicts[protocol]
+
+def compile_rules(rules: list[dict] | None = None) -> CompiledRules:
+    return CompiledRules(
+        settings.SCORING_RULES if rules is None else rules,
+        settings.SCORING_SCORE_CAP,
+        settings.SCORING_VERDICTS,
+        settings.SCORING_LOW_RISK_VERDICTS,
+    )
+
+compiled_rules = compile_rules()
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+class SingleFlight:
+    """
+    Deduplicates identical concurrent calls: while a call for a key is in flight, later
+    callers for the same key await its result instead of starting their own.
+    """
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+        # A caller that times out must not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        self._calls.pop(key, None)
+        # Mark the exception as retrieved in case every caller gave up before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+single_flight = SingleFlight()
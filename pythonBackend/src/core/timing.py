@@ -0,0 +1,67 @@
+import asyncio
+import time
+from contextvars import ContextVar
+
+from .metrics import stage_seconds, event_loop_lag_seconds
+
+# Stage timings of the request being served; None outside of a request
+_request_stages: ContextVar[dict | None] = ContextVar("request_stages", default=None)
+
+def record_stage(stage: str, seconds: float, outcome: str = "ok"):
+    """Adds a step's duration to the stage histogram and to the current response's Server-Timing."""
+    stage_seconds.observe(seconds, stage, outcome)
+    stages = _request_stages.get()
+    if stages is not None:
+        total, count, outcomes = stages.get(stage, (0.0, 0, set()))
+        outcomes.add(outcome)
+        stages[stage] = (total + seconds, count + 1, outcomes)
+
+def _server_timing(stages: dict, elapsed: float) -> bytes:
+    entries = []
+    for stage, (total, count, outcomes) in stages.items():
+        entry = f"{stage};dur={total * 1000:.1f}"
+        desc = ([f"{count}x"] if count > 1 else []) + sorted(outcomes - {"ok"})
+        if desc:
+            entry += f';desc="{" ".join(desc)}"'
+        entries.append(entry)
+    entries.append(f"total;dur={elapsed * 1000:.1f}")
+    return ", ".join(entries).encode("latin-1", errors="replace")
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header listing the time spent in each scan step. Steps that ran
+    several times (batches, FTP/SSH fan-out) are summed. Streaming responses only carry
+    the steps finished before their headers went out.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stages: dict = {}
+        token = _request_stages.set(stages)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = (b"server-timing", _server_timing(stages, time.perf_counter() - started))
+                message = {**message, "headers": [*message.get("headers", ()), header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
+
+def detach_request():
+    """Stops recording into the current request's Server-Timing, for work that outlives it."""
+    _request_stages.set(None)
+
+async def monitor_event_loop_lag(interval: float):
+    """Measures how late a sleep of `interval` wakes up; a busy loop delays every request."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag_seconds.observe(max(loop.time() - started - interval, 0.0))
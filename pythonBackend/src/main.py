@@ -1,10 +1,63 @@
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .api.endpoints import router as api_router
+from fastapi.responses import PlainTextResponse
+from .api.endpoints import router as api_router, http_service, job_service, protocol_service
+from .core.config import settings
 from .core.exceptions import ServiceError, service_error_exception_handler
+from .core.http_clients import HTTPClientPool
+from .core.pools import pools
+from .core.blocklist import local_blocklist
+from .core.cache import signal_cache
+from .core.resolver import dns_resolver
+from .core.metrics import registry
+from .core.probes import probe_engine
+from .core.ratelimit import rate_limiters
+from .core.timing import ServerTimingMiddleware, monitor_event_loop_lag
+from .utils.html_features import extract_page_features
+from .utils.urls import load_public_suffixes
 
 
-app = FastAPI(title="LinkGuard API - Deep Analysis")
+async def warm_up(http_clients: HTTPClientPool):
+    """Pays the one-off costs of the first scan before the worker accepts traffic."""
+    await pools["psl"].run(load_public_suffixes)
+    # The WHOIS client is imported lazily on its own pool
+    await pools["whois"].run(importlib.import_module, "whois")
+    dns_resolver.prepare()
+    await asyncio.gather(*(pool.prestart() for pool in pools.values()))
+    for name in settings.HTTP_POOLS:
+        http_clients.get(name)
+    # httpx's first request otherwise makes anyio import its asyncio backend
+    anyio.Event()
+    extract_page_features(b"<html><form><input type='password'></form></html>")
+    for protocol in settings.PRELOAD_PROTOCOLS:
+        protocol_service(protocol)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One set of keep-alive HTTP clients for the lifetime of the app, shared by every service
+    http_clients = HTTPClientPool()
+    http_service.clients = http_clients
+    # Map the last built blocklist index, or build one if only the feeds exist
+    if not await pools["blocklist"].run(local_blocklist.open_existing) and local_blocklist.feeds_dir:
+        await pools["blocklist"].run(local_blocklist.reload)
+    if settings.WARM_UP:
+        await warm_up(http_clients)
+    lag_monitor = None
+    if settings.EVENT_LOOP_LAG_INTERVAL > 0:
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL))
+    yield
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+    await job_service.shutdown()
+    await http_clients.aclose()
+    for pool in pools.values():
+        pool.shutdown()
+
+app = FastAPI(title="LinkGuard API - Deep Analysis", lifespan=lifespan)
 
 # Add middleware
 app.add_middleware(
@@ -15,6 +68,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Add exception handlers
 app.add_exception_handler(ServiceError, service_error_exception_handler)
 
@@ -23,4 +79,25 @@ app.include_router(api_router, prefix="/api")
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to LinkGuard API"}
\ No newline at end of file
+    return {"message": "Welcome to LinkGuard API"}
+
+# The counters behind the /api stats endpoints, read at scrape time
+registry.callback("linkguard_signal_cache_requests_total", "Signal cache lookups by result.", "counter", ("result",),
+                  lambda: {("hit",): signal_cache.hits, ("miss",): signal_cache.misses})
+registry.callback("linkguard_dns_lookups_total", "Hostname lookups by result (hit, miss, negative, failed).", "counter", ("result",),
+                  lambda: {("hit",): dns_resolver.hits, ("miss",): dns_resolver.misses,
+                           ("negative",): dns_resolver.negative, ("failed",): dns_resolver.failures})
+registry.callback("linkguard_pool_active_workers", "Busy threads of each worker pool.", "gauge", ("pool",),
+                  lambda: {(name,): pool.stats()["active"] for name, pool in pools.items()})
+registry.callback("linkguard_pool_queued_calls", "Calls waiting for a worker thread.", "gauge", ("pool",),
+                  lambda: {(name,): pool.stats()["queued"] for name, pool in pools.items()})
+registry.callback("linkguard_pool_rejected_total", "Calls refused because a pool's queue was full.", "counter", ("pool",),
+                  lambda: {(name,): pool.stats()["rejected"] for name, pool in pools.items()})
+registry.callback("linkguard_quota_rejected_total", "Provider calls skipped because the quota was used up.", "counter",
+                  ("provider",), lambda: {(name,): limiter.rejected for name, limiter in rate_limiters.items()})
+registry.callback("linkguard_probe_failures_total", "SSH/FTP probes that failed to connect or to speak the protocol.",
+                  "counter", (), lambda: {(): probe_engine.failures})
+
+@app.get("/metrics", response_class=PlainTextResponse, summary="Prometheus metrics")
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,38 +1,110 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Union, Literal, Annotated
 
 # Rename the old AnalysisResult to be specific to HTTP
+# Signals that missed the scan deadline are None and listed in timed_out_signals;
+# signals whose check raised (e.g. a provider error) are None and listed in failed_signals.
 class HTTPAnalysisResult(BaseModel):
+    protocol: Literal["http"] = "http"
     protocol_valid: bool
     syntax_valid: bool
-    is_reachable: bool
+    is_reachable: Optional[bool] = None
     final_url: str
     redirect_count: int
-    google_safe_browsing: str
-    virustotal: str
-    abuseipdb: Optional[Dict] = None
-    urlscan: Optional[Dict] = None
+    google_safe_browsing: Optional[str] = None
+    virustotal: Optional[str] = None
+    abuseipdb: Optional[Union[Dict, str]] = None
+    urlscan: Optional[Union[Dict, str]] = None
     ip_address: Optional[str] = None
-    dns_whois_valid: bool
+    ip_addresses: List[str] = [] # Every A and AAAA address of the final host
+    dns_whois_valid: Optional[bool] = None
     whois_info: Optional[Dict] = None
-    ssl_valid: bool
+    ssl_valid: Optional[bool] = None
     ssl_info: Optional[Dict] = None
     page_content_analysis: Optional[Dict] = None
     lexical_analysis: Optional[Dict] = None
+    timed_out_signals: List[str] = []
+    cached_signals: List[str] = []
+    rate_limited_signals: List[str] = []
+    pending_signals: List[str] = [] # Slow providers still being polled by a scan job
+    skipped_signals: List[str] = [] # Providers skipped after a local blocklist hit
+    failed_signals: List[str] = []
+    local_blocklist: Optional[Dict] = None
+    scan_id: Optional[int] = None # Id of the scan history record, when history is enabled
 
 class FTPAnalysisResult(BaseModel):
+    protocol: Literal["ftp"] = "ftp"
     is_reachable: bool
     anonymous_login_allowed: bool
     welcome_message: Optional[str] = None
     directory_listing_count: int
-    dns_whois_info: Optional[Dict] = None
+    directory_listing_truncated: bool = False # Counting stopped at FTP_LIST_LIMIT entries
+    ip_address: Optional[str] = None # The address the probes connected to
+    ip_addresses: List[str] = []
+    dns_whois_valid: Optional[bool] = None
+    whois_info: Optional[Dict] = None
+    abuseipdb: Optional[Union[Dict, str]] = None
+    lexical_analysis: Optional[Dict] = None
+    timed_out_signals: List[str] = []
+    cached_signals: List[str] = []
+    rate_limited_signals: List[str] = []
+    skipped_signals: List[str] = []
+    failed_signals: List[str] = []
+    local_blocklist: Optional[Dict] = None
+    scan_id: Optional[int] = None # Id of the scan history record, when history is enabled
 
 class SSHAnalysisResult(BaseModel):
+    protocol: Literal["ssh"] = "ssh"
     is_reachable: bool
     server_banner: Optional[str] = None
     host_key_type: Optional[str] = None
     host_key_fingerprint: Optional[str] = None
-    dns_whois_info: Optional[Dict] = None
+    ip_address: Optional[str] = None # The address the probes connected to
+    ip_addresses: List[str] = []
+    dns_whois_valid: Optional[bool] = None
+    whois_info: Optional[Dict] = None
+    abuseipdb: Optional[Union[Dict, str]] = None
+    lexical_analysis: Optional[Dict] = None
+    timed_out_signals: List[str] = []
+    cached_signals: List[str] = []
+    rate_limited_signals: List[str] = []
+    skipped_signals: List[str] = []
+    failed_signals: List[str] = []
+    local_blocklist: Optional[Dict] = None
+    scan_id: Optional[int] = None # Id of the scan history record, when history is enabled
+
+# Keyed on protocol, so the analysis is validated against its own model only
+AnalysisDetails = Annotated[Union[HTTPAnalysisResult, FTPAnalysisResult, SSHAnalysisResult], Field(discriminator="protocol")]
+
+# Provider responses and other bulky sub-documents left out of compact responses
+RAW_PAYLOAD_FIELDS = frozenset({
+    "abuseipdb", "urlscan", "whois_info", "ssl_info",
+    "page_content_analysis", "lexical_analysis", "local_blocklist", "welcome_message",
+})
+
+class CrawlPage(BaseModel):
+    url: str
+    depth: int
+    parent: Optional[str] = None # The page the link or redirect was found on
+    via: Literal["root", "link", "redirect"]
+    final_url: Optional[str] = None
+    verdict: Optional[str] = None
+    risk_score: Optional[int] = None
+    risk_breakdown: Dict[str, int] = {}
+    error: Optional[str] = None
+
+class CrawlResult(BaseModel):
+    pages: List[CrawlPage]
+    worst_verdict: Optional[str] = None
+    worst_risk_score: Optional[int] = None
+    worst_url: Optional[str] = None
+    pages_scanned: int
+    bytes_fetched: int
+    fetches: int
+    fetches_reused: int # Pages served from an earlier fetch of the same (or redirected-to) URL
+    frontier_left: int # Discovered links that were not scanned
+    stopped_by: Optional[Literal["pages", "bytes", "time"]] = None # The budget that cut the crawl short
+    seconds: float
 
 # The main response can now contain any of our detail models
 class ScanResponse(BaseModel):
@@ -40,4 +112,31 @@ class ScanResponse(BaseModel):
     protocol: str
     verdict: str
     risk_score: Optional[int] = None # Risk score is optional now
-    details: Union[HTTPAnalysisResult, FTPAnalysisResult, SSHAnalysisResult]
\ No newline at end of file
+    risk_breakdown: Dict[str, int] = {} # Points contributed by each scoring rule that fired
+    details: AnalysisDetails
+    crawl: Optional[CrawlResult] = None # Scans with depth > 0: every page of the crawl and the worst verdict
+
+class ScanJobRequest(BaseModel):
+    link: str = Field(..., description="The link to analyze, in any form accepted by /api/check")
+    budget_ms: Optional[int] = Field(None, gt=0, description="Deadline for the fast part of the scan in milliseconds")
+
+class ScanJobStatus(BaseModel):
+    job_id: str
+    status: str
+    pending_signals: List[str] = []
+    result: Optional[ScanResponse] = None # Partial until status is "complete"
+    error: Optional[str] = None
+
+class RescoreRequest(BaseModel):
+    analyses: List[Dict] = Field(..., description="Analysis details (as returned in ScanResponse.details) with their protocol")
+    rules: Optional[List[Dict]] = Field(None, description="Rule table to try instead of the configured SCORING_RULES")
+
+class RescoreResult(BaseModel):
+    risk_score: int
+    verdict: str
+    risk_breakdown: Dict[str, int]
+
+class HistoryRescoreRequest(BaseModel):
+    rules: Optional[List[Dict]] = Field(None, description="Rule table to try instead of the configured SCORING_RULES")
+    hours: float = Field(24 * 30, gt=0, description="Re-score the scans recorded in this many past hours")
+    max_changes: int = Field(1000, ge=0, description="Largest number of changed verdicts to list")
@@ -1,32 +1,352 @@
 # services/base_service.py
 
+import asyncio
 import socket
-import whois
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
 from urllib.parse import urlparse
 import httpx
 
 from ..core.exceptions import ServiceError
 from ..core.config import settings
+from ..core.pools import pools, PoolSaturatedError
+from ..core.http_clients import HTTPClientPool
+from ..core.cache import signal_cache, MISS
+from ..core.ratelimit import rate_limiters
+from ..core.singleflight import single_flight
+from ..core.blocklist import local_blocklist
+from ..core.history import scan_history
+from ..core.metrics import signal_cache_lookups
+from ..core.timing import record_stage
+from ..core.resolver import dns_resolver
+from ..utils.urls import registered_domain
+
+# Marker returned by a check that ran past its own timeout.
+_TIMED_OUT = object()
+# Marker returned by a check that raised; the scan goes on without that signal.
+_FAILED = object()
+# Result of a provider check skipped because its quota is used up.
+RATE_LIMITED = "rate_limited"
+# Result of a slow provider that accepted the URL but has not finished analyzing it.
+PENDING = "pending"
+
+@dataclass
+class ScanContext:
+    """Per-scan state shared by every check: the deadline, cache mode and what each signal ended up as."""
+    deadline: float
+    fresh: bool = False
+    timed_out: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    cached: list[str] = field(default_factory=list)
+    rate_limited: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    blocklist_matches: list[dict] = field(default_factory=list)
+    # signal -> (cache key, fetched_at, value): from the target's last scan, and from this one
+    previous: dict[str, tuple] = field(default_factory=dict)
+    signals: dict[str, tuple] = field(default_factory=dict)
+    # Called with (signal, analysis fields, outcome) as each check finishes, for progressive results
+    on_signal: Callable[[str, dict, str], None] | None = None
+
+    @classmethod
+    def start(cls, budget_ms: int | None = None, fresh: bool = False,
+              on_signal: Callable[[str, dict, str], None] | None = None) -> "ScanContext":
+        budget = (budget_ms or settings.SCAN_BUDGET_MS) / 1000
+        return cls(deadline=asyncio.get_running_loop().time() + budget, fresh=fresh, on_signal=on_signal)
+
+    def remaining(self) -> float:
+        return max(self.deadline - asyncio.get_running_loop().time(), 0.0)
+
+    def report(self, signal: str, value, outcome: str = "ok"):
+        if self.on_signal is not None:
+            self.on_signal(signal, _signal_fields(signal, value), outcome)
+
+def _is_cacheable(value) -> bool:
+    if value is None or value in ("key_missing", RATE_LIMITED, PENDING):
+        return False
+    if isinstance(value, tuple):
+        return bool(value[1])
+    return not (isinstance(value, dict) and "error" in value)
+
+def _query_whois_server(server: str, domain: str, timeout: float) -> str:
+    host, _, port = server.partition(":")
+    with socket.create_connection((host, int(port or 43)), timeout=timeout) as sock:
+        sock.sendall(domain.encode("idna") + b"\r\n")
+        chunks = []
+        while chunk := sock.recv(4096):
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+def _outcome(value) -> str:
+    """Outcome label of a finished check for the stage metrics."""
+    if value is _TIMED_OUT:
+        return "timeout"
+    if value is _FAILED:
+        return "error"
+    if isinstance(value, str) and value in ("key_missing", RATE_LIMITED, PENDING):
+        return value
+    if isinstance(value, dict) and "error" in value:
+        return "failed"
+    return "ok"
+
+@dataclass(frozen=True)
+class Signal:
+    """
+    One check of a scan, declared once per service. run(ctx, values) receives the scan's
+    inputs plus the values of the signals named in depends_on (None when those timed out
+    or did not run). A scoped signal is served through the signal cache and single-flight
+    under the key its cache policy builds from scope(values) (url, host, port or ip), so
+    scans sharing a URL, registered domain, IP or host:port compute it once. A signal
+    whose when(values) is false does not run; one whose skip(values) is true is reported
+    as skipped.
+    """
+    name: str
+    run: Callable[[ScanContext, dict], Awaitable]
+    depends_on: tuple[str, ...] = ()
+    scope: Callable[[dict], dict] | None = None
+    ttl: Callable[[object], float | None] | None = None
+    when: Callable[[dict], bool] | None = None
+    skip: Callable[[dict], bool] | None = None
+
+def _signal_value(task: asyncio.Task):
+    if task.cancelled() or task.exception() or task.result() is _TIMED_OUT or task.result() is _FAILED:
+        return None
+    return task.result()
+
+def _signal_fields(signal: str, value) -> dict:
+    """The analysis fields a finished check fills in."""
+    if signal == "reachability":
+        final_url, redirect_count, is_reachable, page_content_analysis, _ = value or (None, None, None, None, None)
+        return {"final_url": final_url, "redirect_count": redirect_count, "is_reachable": is_reachable,
+                "page_content_analysis": page_content_analysis}
+    if signal in ("whois", "ssl"):
+        info, valid = value or (None, None)
+        return {"whois_info": info, "dns_whois_valid": valid} if signal == "whois" else {"ssl_info": info, "ssl_valid": valid}
+    if signal == "ip_address":
+        return {"ip_address": value[0] if value else None, "ip_addresses": value or []}
+    if signal in ("ftp_probe", "ssh_banner", "ssh_host_key"):
+        return value or {}
+    return {signal: value}
 
 class BaseAnalysisService:
     """
     A base service providing common analysis functionalities for various protocols.
     """
-    def _get_ip_address(self, hostname: str) -> str | None:
-        """Resolves the IP address for a given hostname."""
-        if not hostname:
-            return None
+    def __init__(self, clients: HTTPClientPool | None = None):
+        # The app injects its shared pool at startup; standalone use gets a private one.
+        self.clients = clients or HTTPClientPool()
+
+    async def _run_signals(self, ctx: ScanContext, url: str, signals: list[Signal], inputs: dict) -> dict:
+        """
+        Runs the declared signals, each as soon as the signals it depends on are done, and
+        returns their values by name. Scoped signals first wait for the target's history so
+        still-fresh values are reused. Each check has its own timeout capped by the scan
+        budget; checks that miss it come back as None and are recorded in
+        ctx.timed_out. Checks that raise come back as None too, recorded in ctx.failed, so
+        one failing provider leaves a partial result rather than failing the scan.
+        """
+        history = asyncio.ensure_future(self._load_history(ctx, url))
+        tasks: dict[str, asyncio.Task] = {}
+        for signal in signals:
+            tasks[signal.name] = asyncio.ensure_future(self._run_signal(ctx, signal, inputs, tasks, history))
+        everything = [history, *tasks.values()]
         try:
-            return socket.gethostbyname(hostname)
-        except socket.gaierror:
+            done, pending = await asyncio.wait(everything, timeout=ctx.remaining())
+        except asyncio.CancelledError:
+            # The caller went away (e.g. a streaming client disconnected); stop every check now
+            for task in everything:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if history in done:
+            # A failed history load only means every signal was computed afresh
+            history.exception()
+        results = {}
+        for name, task in tasks.items():
+            if task in pending or (not task.exception() and task.result() is _TIMED_OUT):
+                ctx.timed_out.append(name)
+                results[name] = None
+            elif task.exception() or task.result() is _FAILED:
+                ctx.failed.append(name)
+                results[name] = None
+            else:
+                results[name] = task.result()
+        return results
+
+    async def _run_signal(self, ctx: ScanContext, signal: Signal, inputs: dict, tasks: dict[str, asyncio.Task],
+                          history: asyncio.Task):
+        if signal.depends_on:
+            await asyncio.wait([tasks[name] for name in signal.depends_on])
+        values = {**inputs, **{name: _signal_value(tasks[name]) for name in signal.depends_on}}
+        if signal.when is not None and not signal.when(values):
             return None
+        if signal.skip is not None and signal.skip(values):
+            ctx.skipped.append(signal.name)
+            ctx.report(signal.name, None, "skipped")
+            return None
+        if signal.scope is None:
+            check = signal.run(ctx, values)
+        else:
+            await asyncio.wait([history])
+            key = signal_cache.key_for(signal.name, **signal.scope(values))
+            check = self._cached(ctx, signal.name, key, lambda: signal.run(ctx, values), signal.ttl)
+        # Probes and other checks without their own timeout get what is left of the budget
+        timeout = min(settings.CHECK_TIMEOUTS.get(signal.name, ctx.remaining()), ctx.remaining())
+        return await self._guarded(signal.name, check, timeout, ctx)
+
+    async def _cached(self, ctx: ScanContext, signal: str, key: str | None, check: Callable[[], Awaitable],
+                      ttl: Callable[[object], float | None] | None = None):
+        """
+        Serves a signal from the cache, or from the target's last scan while that value is
+        still within its TTL, unless the scan asked for fresh results; otherwise runs check()
+        and stores what it returns. Identical lookups already in flight for other scans are
+        joined rather than repeated. Failed lookups are never cached.
+        """
+        if key is None:
+            signal_cache_lookups.inc(signal, "uncached")
+            return self._note_rate_limited(ctx, signal, await check())
+        if not ctx.fresh:
+            value = await signal_cache.get(signal, key)
+            if value is not MISS:
+                signal_cache_lookups.inc(signal, "cache")
+                ctx.cached.append(signal)
+                previous_key, fetched_at, _ = ctx.previous.get(signal, (None, None, None))
+                ctx.signals[signal] = (key, fetched_at if previous_key == key else time.time(), value)
+                return value
+            value = await self._reuse_previous(ctx, signal, key, ttl)
+            if value is not MISS:
+                signal_cache_lookups.inc(signal, "history")
+                return value
+        signal_cache_lookups.inc(signal, "computed")
+
+        async def compute():
+            value = await check()
+            if _is_cacheable(value):
+                await signal_cache.set(signal, key, value, ttl(value) if ttl else None)
+            return value
+
+        value = await single_flight.do(f"{signal}:{key}", compute)
+        if _is_cacheable(value):
+            ctx.signals[signal] = (key, time.time(), value)
+        return self._note_rate_limited(ctx, signal, value)
+
+    @staticmethod
+    async def _reuse_previous(ctx: ScanContext, signal: str, key: str,
+                              ttl: Callable[[object], float | None] | None):
+        """The value from the target's last scan if it has the same key and is not stale yet."""
+        previous_key, fetched_at, value = ctx.previous.get(signal, (None, None, None))
+        if previous_key != key:
+            return MISS
+        age = time.time() - fetched_at
+        remaining = signal_cache.policy(signal)["ttl"] - age
+        value_ttl = ttl(value) if ttl else None
+        if value_ttl is not None:
+            remaining = min(remaining, value_ttl - age)
+        if remaining <= 0:
+            return MISS
+        ctx.cached.append(signal)
+        ctx.signals[signal] = (key, fetched_at, value)
+        # Put it back in the cache for the rest of its lifetime
+        await signal_cache.set(signal, key, value, remaining)
+        return value
 
-    def _check_dns_whois(self, hostname: str) -> tuple[dict, bool]:
-        """Performs a WHOIS lookup for the given hostname."""
+    @staticmethod
+    async def _load_history(ctx: ScanContext, url: str):
+        """Loads the target's previously fetched signals so a rescan re-runs only the stale ones."""
+        if scan_history is None or ctx.fresh:
+            return
+        started = time.perf_counter()
+        try:
+            ctx.previous = await pools["history"].run(scan_history.latest_signals, url)
+        except PoolSaturatedError:
+            pass
+        record_stage("history_load", time.perf_counter() - started)
+
+    @staticmethod
+    async def _record_history(ctx: ScanContext, analysis: dict):
+        """Stores the finished analysis and sets its scan_id."""
+        if scan_history is None:
+            return
+        started = time.perf_counter()
+        try:
+            analysis["scan_id"] = await pools["history"].run(scan_history.record, analysis, ctx.signals)
+        except PoolSaturatedError:
+            pass
+        record_stage("history_record", time.perf_counter() - started)
+
+    @staticmethod
+    def _probe_ttl(result: dict) -> float | None:
+        """Unreachable probe results are only cached briefly."""
+        return None if result["is_reachable"] else settings.PROBE_FAILURE_TTL
+
+    @staticmethod
+    def _note_rate_limited(ctx: ScanContext, signal: str, value):
+        if value == RATE_LIMITED:
+            ctx.rate_limited.append(signal)
+        return value
+
+    @staticmethod
+    def _check_blocklist(ctx: ScanContext, url: str | None = None, host: str | None = None,
+                         ips: list[str] | None = None) -> bool:
+        """
+        Looks the target up in the offline blocklist and records any matches. Returns True
+        when the slow reputation providers should be skipped for this scan.
+        """
+        for match in local_blocklist.lookup(url=url, host=host, ips=ips):
+            if match not in ctx.blocklist_matches:
+                ctx.blocklist_matches.append(match)
+        return bool(ctx.blocklist_matches) and settings.BLOCKLIST_SKIP_PROVIDERS_ON_HIT
+
+    @staticmethod
+    def _blocklist_result(ctx: ScanContext) -> dict:
+        return {"listed": bool(ctx.blocklist_matches), "matches": ctx.blocklist_matches}
+
+    @staticmethod
+    async def _acquire_quota(provider: str) -> bool:
+        """Takes a token from the provider's rate limiter; False means skip the call."""
+        limiter = rate_limiters.get(provider)
+        return limiter is None or await limiter.acquire()
+
+    @staticmethod
+    async def _guarded(name: str, check: Awaitable, timeout: float | None, ctx: ScanContext | None = None):
+        """Awaits check under its timeout and records how long it took and how it ended."""
+        started = time.perf_counter()
+        outcome = "error"
+        result = None
+        try:
+            result = await asyncio.wait_for(check, timeout=timeout)
+            outcome = _outcome(result)
+            return result
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            return _TIMED_OUT
+        except asyncio.CancelledError:
+            # Cut off by the scan deadline
+            outcome = "timeout"
+            raise
+        except Exception:
+            # A provider error or bad response costs this signal only
+            result = _FAILED
+            return _FAILED
+        finally:
+            record_stage(name, time.perf_counter() - started, outcome)
+            if ctx is not None:
+                ctx.report(name, None if result is _TIMED_OUT or result is _FAILED else result, outcome)
+
+    async def _resolve_addresses(self, hostname: str) -> list[str]:
+        """Every IPv4 and IPv6 address of the hostname, IPv4 first; empty if it does not resolve."""
+        return await dns_resolver.resolve(hostname)
+
+    async def _check_dns_whois(self, hostname: str) -> tuple[dict, bool]:
+        """Performs a WHOIS lookup for the given hostname on the bounded WHOIS pool."""
         if not hostname:
             return {}, False
         try:
-            w = whois.whois(hostname)
+            w = await pools["whois"].run(self._whois_lookup, hostname)
             if not w.creation_date:
                 return {"error": "WHOIS data not found"}, False
 
@@ -35,9 +355,20 @@ class BaseAnalysisService:
                 "creation_date": w.creation_date,
                 "expiration_date": w.expiration_date,
             }, True
+        except PoolSaturatedError:
+            return {"error": "WHOIS lookup queue is full"}, False
         except Exception:
             return {"error": "WHOIS lookup failed"}, False
 
+    @staticmethod
+    def _whois_lookup(hostname: str):
+        import whois  # deferred to the first lookup (or warm-up); runs on the whois pool
+        timeout = int(settings.CHECK_TIMEOUTS.get("whois", 10))
+        if settings.WHOIS_SERVER:
+            domain = registered_domain(hostname)
+            return whois.WhoisEntry.load(domain, _query_whois_server(settings.WHOIS_SERVER, domain, timeout))
+        return whois.whois(hostname, timeout=timeout)
+
     def _perform_lexical_analysis(self, url: str) -> dict:
         """Analyzes the lexical characteristics of the URL string."""
         parsed_url = urlparse(url)
@@ -50,17 +381,79 @@ class BaseAnalysisService:
             "has_ip_in_hostname": any(char.isdigit() for char in hostname.split('.'))
         }
 
-    async def _check_abuseipdb(self, client: httpx.AsyncClient, ip_address: str) -> dict | str:
+    def _host_signals(self) -> list[Signal]:
+        """The checks FTP and SSH scans share: DNS, WHOIS, the blocklist and AbuseIPDB for the URL's host."""
+        return [
+            Signal("ip_address", lambda ctx, v: self._resolve_addresses(v["hostname"])),
+            Signal("whois", lambda ctx, v: self._check_dns_whois(v["hostname"]), scope=lambda v: {"host": v["hostname"]}),
+            Signal("local_blocklist", self._host_blocklist_signal, ("ip_address",)),
+            Signal("abuseipdb", self._abuseipdb_signal, ("ip_address", "local_blocklist"), skip=self._providers_skipped),
+        ]
+
+    async def _host_blocklist_signal(self, ctx: ScanContext, values: dict) -> dict:
+        self._check_blocklist(ctx, url=values["url"], host=values["hostname"], ips=values["ip_address"] or None)
+        return self._blocklist_result(ctx)
+
+    @staticmethod
+    def _first_address(values: dict) -> str | None:
+        """Probes connect to the first resolved address."""
+        return values["ip_address"][0] if values["ip_address"] else None
+
+    @staticmethod
+    def _providers_skipped(values: dict) -> bool:
+        """Skip condition of the reputation providers: a local blocklist hit already decides the verdict."""
+        blocklist = values["local_blocklist"]
+        return bool(blocklist and blocklist["listed"]) and settings.BLOCKLIST_SKIP_PROVIDERS_ON_HIT
+
+    async def _abuseipdb_signal(self, ctx: ScanContext, values: dict):
+        """AbuseIPDB reports for the resolved addresses, unless one of them is blocklisted."""
+        ip_addresses = values["ip_address"]
+        if not ip_addresses:
+            return None
+        if self._check_blocklist(ctx, ips=ip_addresses):
+            ctx.skipped.append("abuseipdb")
+            return None
+        return await self._check_abuseipdb_ips(ctx, ip_addresses)
+
+    async def _check_abuseipdb_ips(self, ctx: ScanContext, ips: list[str]):
+        """
+        Checks up to ABUSEIPDB_MAX_IPS of the host's addresses, each cached under its own IP,
+        and reports the one with the highest abuse confidence.
+        """
+        ips = ips[:settings.ABUSEIPDB_MAX_IPS] or [None]
+        results = await asyncio.gather(*(
+            self._cached(ctx, "abuseipdb", signal_cache.key_for("abuseipdb", ip=ip), lambda ip=ip: self._check_abuseipdb(ip))
+            for ip in ips
+        ), return_exceptions=True)
+        # One failed address does not lose the reports of the others
+        if all(isinstance(result, Exception) for result in results):
+            raise results[0]
+        # Every address notes the signal; list it once
+        ctx.cached[:] = dict.fromkeys(ctx.cached)
+        ctx.rate_limited[:] = dict.fromkeys(ctx.rate_limited)
+        reports = [(result, ip) for result, ip in zip(results, ips) if isinstance(result, dict) and "error" not in result]
+        if not reports:
+            return next(result for result in results if not isinstance(result, Exception))
+        worst, ip = max(reports, key=lambda report: report[0].get("abuse_confidence_score", 0))
+        if len(ips) == 1:
+            return worst
+        return {**worst, "ip_address": ip, "ips_checked": len(reports)}
+
+    async def _check_abuseipdb(self, ip_address: str) -> dict | str:
         """Checks the IP address against the AbuseIPDB database."""
         if not settings.ABUSEIPDB_API_KEY:
             return "key_missing"
         if not ip_address:
             return {"error": "No IP address provided"}
-            
+        if not await self._acquire_quota("abuseipdb"):
+            return RATE_LIMITED
+
         headers = {'Key': settings.ABUSEIPDB_API_KEY, 'Accept': 'application/json'}
         params = {'ipAddress': ip_address, 'maxAgeInDays': '90'}
         try:
-            response = await client.get('https://api.abuseipdb.com/api/v2/check', headers=headers, params=params)
+            response = await self.clients.get("abuseipdb").get('/api/v2/check', headers=headers, params=params)
+            if response.status_code == 429:
+                return RATE_LIMITED
             response.raise_for_status()
             data = response.json().get('data', {})
             return {
@@ -68,5 +461,5 @@ class BaseAnalysisService:
                 "total_reports": data.get("totalReports", 0),
                 "country_code": data.get("countryCode")
             }
-        except (httpx.RequestError, KeyError):
+        except (httpx.HTTPError, KeyError, ValueError):
             raise ServiceError("AbuseIPDB API request failed")
\ No newline at end of file
@@ -0,0 +1,182 @@
+# services/crawl_service.py
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+from ..core.config import settings
+from ..core.timing import record_stage
+from ..models.scan import ScanResponse, CrawlPage, CrawlResult
+from ..utils.urls import normalize_url, registered_domain
+
+class Crawl:
+    """
+    One bounded crawl from an HTTP(S) link. The links and redirect hops each fetch
+    discovers go into a deduplicated frontier, and every page taken from it is scanned
+    through the normal pipeline. Pages on the root's registered domain are expanded up to
+    max_depth; outbound pages are scanned but not followed. The crawl stops when
+    CRAWL_MAX_PAGES, CRAWL_MAX_BYTES or CRAWL_BUDGET_MS runs out.
+
+    Scans fetch their page through fetch(), which reuses the answer of any earlier fetch
+    that asked for, redirected through or ended at the same URL, and keeps fetches to one
+    host within CRAWL_PER_HOST_CONCURRENCY and CRAWL_HOST_DELAY_MS.
+    """
+    def __init__(self, url: str, max_depth: int):
+        self.url = normalize_url(url)
+        self.site = registered_domain(urlsplit(self.url).hostname)
+        self.max_depth = max_depth
+        self.pages: list[CrawlPage] = []
+        self.fetches = 0
+        self.fetches_reused = 0
+        self.bytes_fetched = 0
+        self.stopped_by: Optional[str] = None
+        # Normalized URL -> (reachability, [(url, "redirect" | "link"), ...])
+        self._pages: dict[str, tuple] = {}
+        self._fetching: dict[str, asyncio.Task] = {}
+        self._seen: set[str] = {self.url}
+        self._scans_started = 1
+        self._skipped = 0
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._host_next: dict[str, float] = {}
+
+    async def fetch(self, url: str, fetch: Callable[[str, list], Awaitable[tuple]]) -> tuple:
+        """The reachability result for the URL; fetch(url, discovered) is only called for pages not fetched yet."""
+        key = normalize_url(url)
+        page = self._pages.get(key)
+        if page is not None:
+            self.fetches_reused += 1
+            return page[0]
+        task = self._fetching.get(key)
+        if task is None:
+            task = self._fetching[key] = asyncio.ensure_future(self._fetch(key, url, fetch))
+        else:
+            self.fetches_reused += 1
+        # A scan that misses its deadline must not cancel the fetch for the rest of the crawl
+        return (await asyncio.shield(task))[0]
+
+    async def _fetch(self, key: str, url: str, fetch) -> tuple:
+        discovered = []
+        try:
+            async with self._politeness(urlsplit(url).hostname or ""):
+                reachability = await fetch(url, discovered)
+        finally:
+            self._fetching.pop(key, None)
+        final_url, redirect_count, is_reachable, page_content, certificate = reachability
+        self.fetches += 1
+        self.bytes_fetched += (page_content or {}).get("bytes_read", 0)
+        self._pages[key] = (reachability, discovered)
+        if is_reachable:
+            # Each hop of the redirect chain, and the page it ended at, lead to the same page
+            hops = [hop for hop, via in discovered if via == "redirect"] + [final_url]
+            for n, hop in enumerate(hops, 1):
+                self._pages.setdefault(normalize_url(hop), (
+                    (final_url, redirect_count - n, is_reachable, page_content, certificate), discovered))
+        return self._pages[key]
+
+    @asynccontextmanager
+    async def _politeness(self, host: str):
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = asyncio.Semaphore(settings.CRAWL_PER_HOST_CONCURRENCY)
+        async with semaphore:
+            now = time.monotonic()
+            start = max(now, self._host_next.get(host, 0.0))
+            self._host_next[host] = start + settings.CRAWL_HOST_DELAY_MS / 1000
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+    async def expand(self, root: ScanResponse, scan: Callable[[str], Awaitable[ScanResponse]]) -> CrawlResult:
+        """Crawls outward from the already scanned root; scan(url) must scan a page within this crawl."""
+        started = time.perf_counter()
+        self._add_page(self.url, 0, None, "root", root)
+        frontier: asyncio.Queue = asyncio.Queue()
+        await self._discover(frontier, self.url, root.details.final_url, 0)
+        workers = [asyncio.create_task(self._worker(frontier, scan)) for _ in range(settings.CRAWL_CONCURRENCY)]
+        try:
+            await asyncio.wait_for(frontier.join(), settings.CRAWL_BUDGET_MS / 1000)
+        except asyncio.TimeoutError:
+            self.stopped_by = "time"
+        finally:
+            for task in workers + list(self._fetching.values()):
+                task.cancel()
+
+        seconds = time.perf_counter() - started
+        record_stage("crawl", seconds, self.stopped_by or "ok")
+        worst = max(self.pages, key=lambda page: -1 if page.risk_score is None else page.risk_score)
+        return CrawlResult(
+            pages=self.pages,
+            worst_verdict=worst.verdict,
+            worst_risk_score=worst.risk_score,
+            worst_url=worst.url,
+            pages_scanned=len(self.pages),
+            bytes_fetched=self.bytes_fetched,
+            fetches=self.fetches,
+            fetches_reused=self.fetches_reused,
+            # Queued, skipped for a budget, or cut off mid-scan by the deadline
+            frontier_left=frontier.qsize() + self._skipped + self._scans_started - len(self.pages),
+            stopped_by=self.stopped_by,
+            seconds=round(seconds, 3),
+        )
+
+    async def _worker(self, frontier: asyncio.Queue, scan):
+        while True:
+            url, depth, parent, via = await frontier.get()
+            try:
+                if self._exhausted():
+                    self._skipped += 1
+                    continue
+                self._scans_started += 1
+                try:
+                    response = await scan(url)
+                except Exception as e:
+                    self._add_page(url, depth, parent, via, error=getattr(e, "detail", str(e)))
+                    continue
+                self._add_page(url, depth, parent, via, response)
+                await self._discover(frontier, url, response.details.final_url, depth)
+            finally:
+                frontier.task_done()
+
+    def _exhausted(self) -> bool:
+        if self._scans_started >= settings.CRAWL_MAX_PAGES:
+            self.stopped_by = self.stopped_by or "pages"
+        elif self.bytes_fetched >= settings.CRAWL_MAX_BYTES:
+            self.stopped_by = self.stopped_by or "bytes"
+        else:
+            return False
+        return True
+
+    async def _discover(self, frontier: asyncio.Queue, url: str, final_url: str, depth: int):
+        """Queues the unseen links and redirect hops of a same-site page above max_depth."""
+        self._seen.add(normalize_url(final_url))
+        if depth >= self.max_depth or registered_domain(urlsplit(final_url).hostname) != self.site:
+            return
+        key = normalize_url(url)
+        task = self._fetching.get(key)
+        if task is not None:
+            # The scan gave up on its fetch before the page arrived
+            await asyncio.wait([task])
+        page = self._pages.get(key)
+        if page is None:
+            return
+        for link, via in page[1]:
+            try:
+                link = normalize_url(link)
+            except ValueError:
+                continue
+            if link in self._seen or not link.startswith(("http://", "https://")):
+                continue
+            self._seen.add(link)
+            frontier.put_nowait((link, depth + 1, url, via))
+
+    def _add_page(self, url: str, depth: int, parent: Optional[str], via: str,
+                  response: Optional[ScanResponse] = None, error: Optional[str] = None):
+        self.pages.append(CrawlPage(
+            url=url, depth=depth, parent=parent, via=via, error=error,
+            final_url=response.details.final_url if response else None,
+            verdict=response.verdict if response else None,
+            risk_score=response.risk_score if response else None,
+            risk_breakdown=response.risk_breakdown if response else {},
+        ))
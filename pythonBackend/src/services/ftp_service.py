@@ -1,78 +1,53 @@
 # services/ftp_analysis_service.py
 
-import aioftp
-import asyncio
 from urllib.parse import urlparse
-import httpx
 
-from .base_service import BaseAnalysisService
+from .base_service import BaseAnalysisService, ScanContext, Signal
+from ..core.config import settings
+from ..core.http_clients import HTTPClientPool
+from ..core.probes import probe_engine
 
 class FTPAnalysisService(BaseAnalysisService):
-    async def analyze(self, url: str) -> dict:
+    def __init__(self, clients: HTTPClientPool | None = None):
+        super().__init__(clients)
+        self.signals = self._host_signals() + [
+            # Keyed by IP:port: every hostname on a shared server reuses the same probe
+            Signal("ftp_probe", lambda ctx, v: probe_engine.ftp(self._first_address(v), v["port"], settings.FTP_LIST_LIMIT),
+                   ("ip_address",), scope=lambda v: {"host": self._first_address(v), "port": v["port"]},
+                   ttl=self._probe_ttl, when=lambda v: bool(v["ip_address"])),
+        ]
+
+    async def analyze(self, url: str, budget_ms: int | None = None, fresh: bool = False, on_signal=None) -> dict:
+        ctx = ScanContext.start(budget_ms, fresh=fresh, on_signal=on_signal)
         parsed_url = urlparse(url)
-        hostname = parsed_url.hostname
-        port = parsed_url.port or 21
-        
-        # Start with common checks
-        ip_address = self._get_ip_address(hostname)
-        whois_info, dns_whois_valid = self._check_dns_whois(hostname)
         lexical_analysis = self._perform_lexical_analysis(url)
-        
-        async with httpx.AsyncClient() as client:
-            abuseipdb_result = await self._check_abuseipdb(client, ip_address)
+        ctx.report("lexical_analysis", lexical_analysis)
+
+        inputs = {"url": url, "hostname": parsed_url.hostname, "port": parsed_url.port or 21}
+        values = await self._run_signals(ctx, url, self.signals, inputs)
 
         results = {
             "protocol": "ftp",
             "url": url,
-            "ip_address": ip_address,
-            "whois_info": whois_info,
-            "dns_whois_valid": dns_whois_valid,
+            "ip_address": self._first_address(values),
+            "ip_addresses": values["ip_address"] or [],
+            "whois_info": (values["whois"] or (None, None))[0],
+            "dns_whois_valid": (values["whois"] or (None, None))[1],
             "lexical_analysis": lexical_analysis,
-            "abuseipdb": abuseipdb_result,
+            "abuseipdb": values["abuseipdb"],
+            "timed_out_signals": ctx.timed_out,
+            "cached_signals": ctx.cached,
+            "rate_limited_signals": ctx.rate_limited,
+            "skipped_signals": ctx.skipped,
+            "failed_signals": ctx.failed,
+            "local_blocklist": self._blocklist_result(ctx),
             "is_reachable": False,
             "anonymous_login_allowed": False,
             "welcome_message": None,
             "directory_listing_count": 0,
+            "directory_listing_truncated": False,
         }
-        
-        ftp_client = None
-        try:
-            async def perform_ftp_scan():
-                nonlocal ftp_client
-                
-                ftp_client = aioftp.Client()
-                await ftp_client.connect(hostname, port)
-                
-                results["is_reachable"] = True
-                results["welcome_message"] = getattr(ftp_client, 'welcome_message', None)
-
-                try:
-                    await ftp_client.login()
-                    results["anonymous_login_allowed"] = True
-                    listing = await ftp_client.list()
-                    results["directory_listing_count"] = len(listing)
-                except aioftp.errors.StatusCodeError:
-                    results["anonymous_login_allowed"] = False
-
-            await asyncio.wait_for(perform_ftp_scan(), timeout=10.0)
-
-        except (ConnectionRefusedError, asyncio.TimeoutError, aioftp.errors.AIOFTPException, OSError):
-            results["is_reachable"] = False
-        
-        finally:
-            # --- THIS BLOCK IS THE FIX ---
-            #
-            # Old incorrect code:
-            # if ftp_client is not None and not ftp_client.is_closing():
-            #
-            # New correct code:
-            # We check if the client exists and use the '.is_connected' property,
-            # which is the correct attribute in the aioftp library.
-            if ftp_client and hasattr(ftp_client, 'is_connected') and ftp_client.is_connected:
-                try:
-                    await ftp_client.quit()
-                except Exception:
-                    # If quit fails, ensure the connection is closed.
-                    await ftp_client.close()
+        results.update(values["ftp_probe"] or {})
 
-        return results
\ No newline at end of file
+        await self._record_history(ctx, results)
+        return results
@@ -1,154 +1,406 @@
 # services/url_analysis_service.py
 
+import asyncio
+import base64
 import httpx
-import tldextract
-import socket
 import ssl
+import time
+from collections import OrderedDict
 from datetime import datetime
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse
 
-from .base_service import BaseAnalysisService
+from .base_service import BaseAnalysisService, ScanContext, Signal, RATE_LIMITED, PENDING
 from ..core.exceptions import ServiceError
 from ..core.config import settings
+from ..core.cache import signal_cache
+from ..core.batcher import MicroBatcher
+from ..core.http_clients import HTTPClientPool
+from ..core.pools import pools, PoolSaturatedError
+from ..core.timing import record_stage
+from ..utils.html_features import PageFeatureExtractor, extract_page_features
+from ..utils.urls import split_domain
+from ..utils.tls import describe_certificate, describe_verify_error, tls_handshake
 
 class URLAnalysisService(BaseAnalysisService):
-    async def analyze_url(self, url: str) -> dict:
-        async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
-            # 1. HTTP-specific check
-            final_url, redirect_count, is_reachable, response = await self._check_reachability(client, url)
-            
-            # 2. Extract components
-            parsed_url = urlparse(final_url)
-            hostname = parsed_url.hostname
-            
-            # 3. Run all checks (common and HTTP-specific)
-            ip_address = self._get_ip_address(hostname)
-            whois_info, dns_whois_valid = self._check_dns_whois(hostname)
-            lexical_analysis = self._perform_lexical_analysis(final_url)
-            abuseipdb_result = await self._check_abuseipdb(client, ip_address) if ip_address else None
-
-            # HTTP-specific checks
-            ssl_info, ssl_valid = self._check_ssl(hostname)
-            page_content_analysis = await self._analyze_page_content(response)
-            safe_browsing_result = await self._check_safe_browsing(client, final_url)
-            virustotal_result = await self._check_virustotal(client, final_url)
-            urlscan_result = await self._submit_urlscan(client, final_url)
-
-            return {
-                "protocol": "http",
-                "url": url,
-                "final_url": final_url,
-                "protocol_valid": final_url.startswith(("http://", "https://")),
-                "syntax_valid": bool(tldextract.extract(final_url).domain),
-                "is_reachable": is_reachable,
-                "redirect_count": redirect_count,
-                "ip_address": ip_address,
-                "ssl_valid": ssl_valid,
-                "ssl_info": ssl_info,
-                "dns_whois_valid": dns_whois_valid,
-                "whois_info": whois_info,
-                "lexical_analysis": lexical_analysis,
-                "page_content_analysis": page_content_analysis,
-                "google_safe_browsing": safe_browsing_result,
-                "virustotal": virustotal_result,
-                "abuseipdb": abuseipdb_result,
-                "urlscan": urlscan_result,
-            }
-
-    async def _check_reachability(self, client, url):
+    def __init__(self, clients: HTTPClientPool | None = None):
+        super().__init__(clients)
+        self._safe_browsing_batcher = MicroBatcher(
+            "google_safe_browsing", self._lookup_safe_browsing,
+            max_batch=settings.SAFE_BROWSING_BATCH_SIZE, max_wait_ms=settings.SAFE_BROWSING_BATCH_WAIT_MS,
+        )
+        # Sessions belong to the context that created them, so probes share one context
+        self._tls_context = ssl.create_default_context()
+        self._tls_sessions: OrderedDict[str, ssl.SSLSession] = OrderedDict()
+        self._tls_probes = asyncio.Semaphore(settings.TLS_PROBE_CONCURRENCY)
+        self.signals = self._declare_signals()
+
+    async def analyze_url(self, url: str, budget_ms: int | None = None, fresh: bool = False,
+                          defer_slow: bool = False, on_signal=None, crawl=None) -> dict:
+        """
+        Runs every HTTP check for the URL. With defer_slow, VirusTotal does not wait for a
+        new submission to be analyzed; unfinished providers are listed in pending_signals
+        for poll_pending_signals to complete later. Within a crawl, the page is fetched
+        through it, so pages fetched before are reused and their links collected.
+        """
+        ctx = ScanContext.start(budget_ms, fresh=fresh, on_signal=on_signal)
+        # Known before any network call; the lexical_analysis signal redoes it for the final URL
+        ctx.report("lexical_analysis", self._perform_lexical_analysis(url))
+        # Resolve the host while the page is fetched; most URLs do not redirect elsewhere,
+        # and the ip_address signal then joins this lookup
+        prefetch = asyncio.ensure_future(self._resolve_addresses(urlparse(url).hostname))
+        results = await self._run_signals(ctx, url, self.signals, {"url": url, "defer_slow": defer_slow, "crawl": crawl})
+        prefetch.cancel()
+
+        final_url, _, _, _ = self._final({**results, "url": url})
+        _, redirect_count, is_reachable, page_content_analysis, _ = results["reachability"] or (url, 0, None, None, None)
+        whois_info, dns_whois_valid = results["whois"] or (None, None)
+        ssl_info, ssl_valid = results["ssl"] or (None, None)
+        pending = [signal for signal in ("virustotal", "urlscan")
+                   if results.get(signal) == PENDING
+                   or (isinstance(results.get(signal), dict) and results[signal].get("status") == PENDING)]
+        analysis = {
+            "protocol": "http",
+            "url": url,
+            "final_url": final_url,
+            "protocol_valid": final_url.startswith(("http://", "https://")),
+            "syntax_valid": bool(split_domain(final_url).domain),
+            "is_reachable": is_reachable,
+            "redirect_count": redirect_count,
+            "ip_address": results["ip_address"][0] if results["ip_address"] else None,
+            "ip_addresses": results["ip_address"] or [],
+            "ssl_valid": ssl_valid,
+            "ssl_info": ssl_info,
+            "dns_whois_valid": dns_whois_valid,
+            "whois_info": whois_info,
+            "lexical_analysis": results["lexical_analysis"] or self._perform_lexical_analysis(final_url),
+            "page_content_analysis": page_content_analysis,
+            "google_safe_browsing": results.get("google_safe_browsing"),
+            "virustotal": results.get("virustotal"),
+            "abuseipdb": results["abuseipdb"],
+            "urlscan": results.get("urlscan"),
+            "local_blocklist": self._blocklist_result(ctx),
+            "timed_out_signals": ctx.timed_out,
+            "cached_signals": ctx.cached,
+            "rate_limited_signals": ctx.rate_limited,
+            "pending_signals": pending,
+            "skipped_signals": ctx.skipped,
+            "failed_signals": ctx.failed,
+        }
+        await self._record_history(ctx, analysis)
+        return analysis
+
+    def _declare_signals(self) -> list[Signal]:
+        """The HTTP checks; all but reachability are about where the redirects end up."""
+        final_url = lambda v: self._final(v)[0]
+        hostname = lambda v: self._final(v)[1]
+        return [
+            Signal("reachability", self._reachability_signal),
+            Signal("lexical_analysis", self._lexical_signal, ("reachability",)),
+            Signal("local_blocklist", self._blocklist_signal, ("reachability",)),
+            Signal("ip_address", lambda ctx, v: self._resolve_addresses(hostname(v)), ("reachability",)),
+            Signal("whois", lambda ctx, v: self._check_dns_whois(hostname(v)), ("reachability",),
+                   scope=lambda v: {"host": hostname(v)}),
+            Signal("ssl", self._ssl_signal, ("reachability",),
+                   scope=lambda v: {"host": hostname(v), "port": self._final(v)[2]}, ttl=self._ssl_cache_ttl),
+            Signal("abuseipdb", self._abuseipdb_signal, ("ip_address",)),
+            Signal("google_safe_browsing", lambda ctx, v: self._check_safe_browsing(final_url(v)),
+                   ("reachability", "local_blocklist"), scope=lambda v: {"url": final_url(v)}, skip=self._providers_skipped),
+            Signal("virustotal", lambda ctx, v: self._check_virustotal(final_url(v), wait_for_analysis=not v["defer_slow"]),
+                   ("reachability", "local_blocklist"), scope=lambda v: {"url": final_url(v)}, skip=self._providers_skipped),
+            Signal("urlscan", lambda ctx, v: self._submit_urlscan(final_url(v)),
+                   ("reachability", "local_blocklist"), scope=lambda v: {"url": final_url(v)}, skip=self._providers_skipped),
+        ]
+
+    @staticmethod
+    def _final(values: dict) -> tuple[str, str | None, int, str]:
+        """The URL the redirects ended at (the scanned URL if unreachable), its hostname, port and scheme."""
+        final_url = values["reachability"][0] if values["reachability"] else values["url"]
+        parsed_url = urlparse(final_url)
+        return final_url, parsed_url.hostname, parsed_url.port or (443 if parsed_url.scheme == "https" else 80), parsed_url.scheme
+
+    async def _reachability_signal(self, ctx: ScanContext, values: dict):
+        if values["crawl"] is None:
+            return await self._check_reachability(values["url"])
+        return await values["crawl"].fetch(values["url"], self._check_reachability)
+
+    async def _lexical_signal(self, ctx: ScanContext, values: dict) -> dict:
+        return self._perform_lexical_analysis(self._final(values)[0])
+
+    async def _blocklist_signal(self, ctx: ScanContext, values: dict) -> dict:
+        """Offline pre-screen of the original and final URL before any external API is called."""
+        final_url, hostname, _, _ = self._final(values)
+        self._check_blocklist(ctx, url=values["url"], host=urlparse(values["url"]).hostname)
+        self._check_blocklist(ctx, url=final_url, host=hostname)
+        return self._blocklist_result(ctx)
+
+    async def _ssl_signal(self, ctx: ScanContext, values: dict):
+        final_url, hostname, port, scheme = self._final(values)
+        certificate = values["reachability"][4] if values["reachability"] else None
+        return await self._check_ssl(scheme, hostname, port, certificate)
+
+    async def _check_reachability(self, url, discovered: list | None = None):
+        """
+        Fetches the URL once with a streaming GET, following redirects. Reading stops at
+        PAGE_MAX_BYTES, so memory per scan stays bounded whatever the page size. The
+        certificate of the final HTTPS connection is captured from that same connection.
+        Given a discovered list, the redirect hops and the page's links (up to
+        CRAWL_MAX_LINKS_PER_PAGE) are appended to it as (url, "redirect" | "link").
+        """
+        client = self.clients.get("target")
+        max_links = settings.CRAWL_MAX_LINKS_PER_PAGE if discovered is not None else 0
         try:
-            head_resp = await client.head(url, timeout=5)
-            # If HEAD is disallowed, try GET
-            if head_resp.status_code >= 400:
-                 response = await client.get(url, timeout=5)
-            else:
-                response = head_resp
-            
-            final_url = str(response.url)
-            redirect_count = len(response.history)
-            return final_url, redirect_count, True, response
+            async with client.stream("GET", url, timeout=5) as response:
+                final_url = str(response.url)
+                redirect_count = len(response.history)
+                certificate = self._connection_certificate(response)
+                page_content_analysis = await self._analyze_page_content(response, max_links)
+            if discovered is not None:
+                # history[0] is the URL asked for
+                discovered.extend((str(hop.url), "redirect") for hop in response.history[1:])
+                links = page_content_analysis.pop("links", []) if page_content_analysis else []
+                discovered.extend((urljoin(final_url, link), "link") for link in links)
+            return final_url, redirect_count, True, page_content_analysis, certificate
         except httpx.RequestError:
-            return url, 0, False, None
+            return url, 0, False, None, None
+
+    @staticmethod
+    def _connection_certificate(response: httpx.Response) -> dict | None:
+        network_stream = response.extensions.get("network_stream")
+        ssl_object = network_stream.get_extra_info("ssl_object") if network_stream else None
+        return describe_certificate(ssl_object, "reachability") if ssl_object else None
 
-    def _check_ssl(self, hostname):
+    async def _check_ssl(self, scheme: str, hostname: str | None, port: int, certificate: dict | None = None):
+        """
+        Certificate of the final URL: taken from the reachability connection when it used
+        TLS, otherwise from a handshake-only probe of the URL's own port. Plain-http URLs
+        have no TLS signal (ssl_valid None), so ssl_invalid does not fire for them.
+        """
         if not hostname: return {}, False
-        try:
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=3) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    cert = ssock.getpeercert()
-                    
-                    cert_expires = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
-                    if cert_expires < datetime.now():
-                        return {"error": "Certificate expired"}, False
-                    
-                    return {
-                        "issuer": dict(x[0] for x in cert.get('issuer', [])),
-                        "subject": dict(x[0] for x in cert.get('subject', [])),
-                        "expires": str(cert_expires)
-                    }, True
-        except Exception:
+        if scheme != "https":
+            return {"error": "Not served over TLS"}, None
+        if certificate:
+            return certificate, True
+        return await self._probe_certificate(hostname, port)
+
+    async def _probe_certificate(self, hostname: str, port: int):
+        """Handshake-only TLS probe that resumes the last session with the same host:port."""
+        target = f"{hostname.lower()}:{port}"
+        async with self._tls_probes:
+            try:
+                ssl_object = await tls_handshake(hostname, port, self._tls_context, self._tls_sessions.get(target))
+            except ssl.SSLCertVerificationError as e:
+                return describe_verify_error(e), False
+            except (OSError, ssl.SSLError):
+                return {"error": "SSL validation failed"}, False
+        if ssl_object.session is not None:
+            self._tls_sessions[target] = ssl_object.session
+            self._tls_sessions.move_to_end(target)
+            if len(self._tls_sessions) > settings.TLS_SESSION_CACHE_SIZE:
+                self._tls_sessions.popitem(last=False)
+        certificate = describe_certificate(ssl_object, "probe")
+        if certificate is None:
             return {"error": "SSL validation failed"}, False
+        certificate["session_reused"] = ssl_object.session_reused
+        return certificate, True
 
-    async def _analyze_page_content(self, response):
-        if not response or not response.text:
+    @staticmethod
+    def _ssl_cache_ttl(result) -> float | None:
+        """Keeps a certificate only until a day before it expires."""
+        ssl_info, _ = result
+        try:
+            expires = datetime.strptime(ssl_info["expires"], "%Y-%m-%d %H:%M:%S")
+        except (KeyError, TypeError, ValueError):
             return None
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        return {
-            "has_iframe": bool(soup.find_all('iframe')),
-            "has_form_with_password": bool(soup.select('form input[type=password]')),
-            "external_links": len([a['href'] for a in soup.find_all('a', href=True) if urlparse(a['href']).hostname]),
-        }
+        return (expires - datetime.now()).total_seconds() - 24 * 3600
 
-    async def _check_safe_browsing(self, client, url):
-        # ... (implementation unchanged)
+    async def _analyze_page_content(self, response: httpx.Response, max_links: int = 0) -> dict | None:
+        """
+        Reads up to PAGE_MAX_BYTES of an HTML body and extracts its page features. Chunks
+        are fed to the extractor as they arrive; only once a page outgrows
+        PAGE_INLINE_MAX_BYTES is the body buffered and handed to the html process pool.
+        With max_links, the features also hold the page's first max_links link targets.
+        """
+        if "html" not in response.headers.get("content-type", "").lower():
+            return None
+
+        encoding = response.charset_encoding or "utf-8"
+        extractor = PageFeatureExtractor(encoding, max_links)
+        # Kept only while the page may still go to the process pool
+        chunks = [] if "html" in pools else None
+        size, truncated, parse_seconds = 0, False, 0.0
+        async for chunk in response.aiter_bytes():
+            if size + len(chunk) > settings.PAGE_MAX_BYTES:
+                # There is more body than is read
+                chunk = chunk[:settings.PAGE_MAX_BYTES - size]
+                truncated = True
+            size += len(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+            if extractor is not None:
+                started = time.perf_counter()
+                extractor.feed_bytes(chunk)
+                parse_seconds += time.perf_counter() - started
+                if chunks is not None and size > settings.PAGE_INLINE_MAX_BYTES:
+                    # Parsing the rest here would cost more than the hand-off
+                    extractor = None
+            if truncated:
+                break
+        if not size:
+            return None
+
+        if extractor is not None:
+            started = time.perf_counter()
+            extractor.feed_bytes(b"", final=True)
+            extractor.close()
+            features = extractor.features(truncated)
+            record_stage("page_analysis", parse_seconds + time.perf_counter() - started, "inline")
+            return features
+        body = b"".join(chunks)
+        started = time.perf_counter()
+        try:
+            features = await pools["html"].run(extract_page_features, body, encoding, truncated, max_links)
+        except PoolSaturatedError:
+            record_stage("page_analysis", time.perf_counter() - started, "rejected")
+            return {"error": "Page analysis queue is full", "bytes_read": len(body), "truncated": truncated}
+        record_stage("page_analysis", time.perf_counter() - started, "process")
+        return features
+
+    async def _check_safe_browsing(self, url):
         if not settings.GOOGLE_SAFE_BROWSING_API_KEY: return "key_missing"
-        api_url = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={settings.GOOGLE_SAFE_BROWSING_API_KEY}"
+        # Concurrent scans share one threatMatches:find request through the batcher
+        return await self._safe_browsing_batcher.submit(url)
+
+    async def _lookup_safe_browsing(self, urls: list[str]) -> dict[str, str]:
+        api_url = f"/v4/threatMatches:find?key={settings.GOOGLE_SAFE_BROWSING_API_KEY}"
         payload = {'client': {'clientId': 'linkguard', 'clientVersion': '1.0'},
                    'threatInfo': {'threatTypes': ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE"],
                                   'platformTypes': ["ANY_PLATFORM"],
                                   'threatEntryTypes': ["URL"],
-                                  'threatEntries': [{'url': url}]}}
+                                  'threatEntries': [{'url': url} for url in urls]}}
+        # One token per outbound request, however many URLs it carries
+        if not await self._acquire_quota("google_safe_browsing"):
+            return dict.fromkeys(urls, RATE_LIMITED)
         try:
-            resp = await client.post(api_url, json=payload)
+            resp = await self.clients.get("google_safe_browsing").post(api_url, json=payload)
+            if resp.status_code == 429:
+                return dict.fromkeys(urls, RATE_LIMITED)
             resp.raise_for_status()
-            return "malicious" if resp.json().get("matches") else "clean"
-        except httpx.RequestError:
+            matched = {match.get("threat", {}).get("url") for match in resp.json().get("matches", [])}
+            return {url: "malicious" if url in matched else "clean" for url in urls}
+        except (httpx.HTTPError, ValueError):
             raise ServiceError("Google Safe Browsing API request failed")
 
-    async def _check_virustotal(self, client, url):
-        # ... (implementation unchanged)
+    async def _check_virustotal(self, url, wait_for_analysis: bool = True):
         if not settings.VIRUSTOTAL_API_KEY: return "key_missing"
+        # Most URLs already have a report, so look it up before spending a submission
+        verdict = await self._lookup_virustotal(url)
+        if verdict is not None:
+            return verdict
+
         headers = {"x-apikey": settings.VIRUSTOTAL_API_KEY}
+        client = self.clients.get("virustotal")
+        if not await self._acquire_quota("virustotal"):
+            return RATE_LIMITED
         try:
-            post_resp = await client.post("https://www.virustotal.com/api/v3/urls", data={"url": url}, headers=headers)
+            post_resp = await client.post("/api/v3/urls", data={"url": url}, headers=headers)
+            if post_resp.status_code == 429:
+                return RATE_LIMITED
             post_resp.raise_for_status()
             analysis_id = post_resp.json()["data"]["id"]
+            if not wait_for_analysis:
+                return PENDING
 
-            report_resp = await client.get(f"https://www.virustotal.com/api/v3/analyses/{analysis_id}", headers=headers)
+            # Every VirusTotal request counts against its quota, the analysis fetch included;
+            # without a token the submission is left for a later lookup to pick up
+            if not await self._acquire_quota("virustotal"):
+                return PENDING
+            report_resp = await client.get(f"/api/v3/analyses/{analysis_id}", headers=headers)
             report_resp.raise_for_status()
             
-            stats = report_resp.json()["data"]["attributes"]["stats"]
+            attributes = report_resp.json()["data"]["attributes"]
+            if attributes.get("status") != "completed":
+                return PENDING
+            return self._virustotal_verdict(attributes["stats"])
 
-            if stats.get("malicious", 0) > 1: return "malicious"
-            if stats.get("malicious", 0) > 0 or stats.get("suspicious", 0) > 0: return "suspicious"
-            return "clean"
-
-        except (httpx.RequestError, KeyError):
+        except (httpx.HTTPError, KeyError, ValueError):
              raise ServiceError("VirusTotal API request failed")
 
-    async def _submit_urlscan(self, client, url):
-        # ... (implementation unchanged)
+    async def _lookup_virustotal(self, url) -> str | None:
+        """Fetches VirusTotal's existing report for the URL; None if it has never been analyzed."""
+        if not await self._acquire_quota("virustotal"):
+            return RATE_LIMITED
+        url_id = base64.urlsafe_b64encode(url.encode()).decode().rstrip("=")
+        try:
+            resp = await self.clients.get("virustotal").get(
+                f"/api/v3/urls/{url_id}", headers={"x-apikey": settings.VIRUSTOTAL_API_KEY})
+            if resp.status_code == 404:
+                return None
+            if resp.status_code == 429:
+                return RATE_LIMITED
+            resp.raise_for_status()
+            return self._virustotal_verdict(resp.json()["data"]["attributes"]["last_analysis_stats"])
+        except (httpx.HTTPError, KeyError, ValueError):
+            raise ServiceError("VirusTotal API request failed")
+
+    @staticmethod
+    def _virustotal_verdict(stats: dict) -> str:
+        if stats.get("malicious", 0) > 1: return "malicious"
+        if stats.get("malicious", 0) > 0 or stats.get("suspicious", 0) > 0: return "suspicious"
+        return "clean"
+
+    async def _submit_urlscan(self, url):
         if not settings.URLSCAN_API_KEY: return "key_missing"
         headers = {"API-Key": settings.URLSCAN_API_KEY, "Content-Type": "application/json"}
         payload = {"url": url, "visibility": "public"}
+        if not await self._acquire_quota("urlscan"):
+            return RATE_LIMITED
         try:
-            resp = await client.post("https://urlscan.io/api/v1/scan/", headers=headers, json=payload)
+            resp = await self.clients.get("urlscan").post("/api/v1/scan/", headers=headers, json=payload)
+            if resp.status_code == 429:
+                return RATE_LIMITED
             if resp.status_code == 200:
-                return {"scan_id": resp.json().get("uuid"), "result_url": resp.json().get("result")}
+                return {"scan_id": resp.json().get("uuid"), "result_url": resp.json().get("result"), "status": PENDING}
             return {"error": f"Submission failed with status {resp.status_code}"}
-        except httpx.RequestError:
-            raise ServiceError("urlscan.io API request failed")
\ No newline at end of file
+        except (httpx.HTTPError, ValueError):
+            raise ServiceError("urlscan.io API request failed")
+
+    async def _fetch_urlscan_result(self, submission: dict) -> dict:
+        """Fetches the finished urlscan.io result; returns the submission unchanged while the scan is still running."""
+        # Result retrieval is not counted against the submission quota
+        try:
+            resp = await self.clients.get("urlscan").get(f"/api/v1/result/{submission['scan_id']}/")
+            if resp.status_code != 200:
+                return submission
+            overall = resp.json().get("verdicts", {}).get("overall", {})
+        except (httpx.HTTPError, ValueError):
+            return submission
+        return {**submission, "status": "done",
+                "malicious": bool(overall.get("malicious")), "score": overall.get("score", 0)}
+
+    async def poll_pending_signals(self, analysis: dict) -> dict:
+        """
+        Re-checks the slow providers listed in analysis["pending_signals"] and returns the
+        fields that changed, including the signals that are still pending. Finished
+        results are written to the signal cache for later scans.
+        """
+        final_url = analysis["final_url"]
+        updates, still_pending = {}, []
+        for signal in analysis.get("pending_signals", []):
+            if signal == "virustotal":
+                try:
+                    verdict = await self._lookup_virustotal(final_url)
+                except ServiceError:
+                    verdict = None
+                if verdict in (None, RATE_LIMITED):
+                    still_pending.append(signal)
+                    continue
+                updates[signal] = verdict
+            elif signal == "urlscan":
+                result = await self._fetch_urlscan_result(analysis["urlscan"])
+                if result.get("status") != "done":
+                    still_pending.append(signal)
+                    continue
+                updates[signal] = result
+            await signal_cache.set(signal, signal_cache.key_for(signal, url=final_url), updates[signal])
+        updates["pending_signals"] = still_pending
+        return updates
@@ -0,0 +1,132 @@
+# services/job_service.py
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from .http_service import URLAnalysisService
+from .scoring_service import ScoringService
+from ..core.cache import signal_cache
+from ..core.config import settings
+from ..core.history import scan_history
+from ..core.pools import pools, PoolSaturatedError
+from ..core.timing import detach_request
+from ..models.scan import ScanResponse
+
+@dataclass
+class ScanJob:
+    id: str
+    link: str
+    # queued -> running -> polling -> complete | failed
+    status: str = "queued"
+    response: Optional[ScanResponse] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+class ScanJobService:
+    """
+    In-process asynchronous scan jobs. A job runs the fast scan right away, then keeps
+    polling slow providers (VirusTotal, urlscan.io) in the background with exponential
+    backoff, re-scoring the result each time one of them finishes.
+    """
+    def __init__(self, http_service: URLAnalysisService, scoring_service: ScoringService):
+        self.http_service = http_service
+        self.scoring_service = scoring_service
+        self._jobs: dict[str, ScanJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, link: str, scan: Callable[[str], Awaitable[ScanResponse]]) -> ScanJob:
+        """Creates a job for the link; scan(link) must run the fast part and return a ScanResponse."""
+        self._expire_old_jobs()
+        job = ScanJob(id=uuid.uuid4().hex, link=link)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, scan))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: ScanJob, scan: Callable[[str], Awaitable[ScanResponse]]):
+        job.status = "running"
+        # The job outlives the request that submitted it
+        detach_request()
+        try:
+            job.response = await scan(job.link)
+        except Exception as e:
+            self._update(job, status="failed", error=getattr(e, "detail", str(e)))
+            return
+
+        details = job.response.details
+        if not getattr(details, "pending_signals", None):
+            self._update(job, status="complete")
+            return
+        self._update(job, status="polling")
+        try:
+            await self._poll(job)
+        except Exception as e:
+            # Keep the partial result; only the background polling failed
+            self._update(job, status="failed", error=str(e))
+
+    async def _poll(self, job: ScanJob):
+        delay = settings.JOB_POLL_INITIAL_DELAY
+        give_up_at = time.monotonic() + settings.JOB_POLL_TIMEOUT
+        finished = {}
+        while job.response.details.pending_signals and time.monotonic() < give_up_at:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.JOB_POLL_MAX_DELAY)
+
+            analysis = {**job.response.details.model_dump(), "protocol": job.response.protocol}
+            updates = await self.http_service.poll_pending_signals(analysis)
+            analysis.update(updates)
+            for signal, value in updates.items():
+                if signal != "pending_signals":
+                    finished[signal] = (signal_cache.key_for(signal, url=analysis["final_url"]), time.time(), value)
+            risk_score, verdict, breakdown = self.scoring_service.score(analysis)
+            job.response = job.response.model_copy(update={
+                "risk_score": risk_score,
+                "verdict": verdict,
+                "risk_breakdown": breakdown,
+                "details": type(job.response.details)(**analysis),
+            })
+            self._update(job)
+
+        details = job.response.details
+        if details.pending_signals:
+            # Whatever never finished is reported the same way as a deadline miss
+            details.timed_out_signals = details.timed_out_signals + details.pending_signals
+            details.pending_signals = []
+        await self._update_history(job, finished)
+        self._update(job, status="complete")
+
+    @staticmethod
+    async def _update_history(job: ScanJob, finished: dict):
+        """Replaces the scan's history record with the completed analysis."""
+        scan_id = getattr(job.response.details, "scan_id", None)
+        if scan_history is None or scan_id is None:
+            return
+        analysis = {**job.response.details.model_dump(), "protocol": job.response.protocol}
+        try:
+            await pools["history"].run(scan_history.update, scan_id, analysis, finished)
+        except PoolSaturatedError:
+            pass
+
+    @staticmethod
+    def _update(job: ScanJob, **changes):
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+
+    def _expire_old_jobs(self):
+        cutoff = time.time() - settings.JOB_TTL
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
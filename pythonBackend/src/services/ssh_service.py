@@ -1,58 +1,63 @@
 # services/ssh_analysis_service.py
 
-import asyncssh
-import asyncio
 from urllib.parse import urlparse
-import httpx
 
-from .base_service import BaseAnalysisService
+from .base_service import BaseAnalysisService, ScanContext, Signal
+from ..core.config import settings
+from ..core.http_clients import HTTPClientPool
+from ..core.probes import probe_engine
 
 class SSHAnalysisService(BaseAnalysisService):
-    async def analyze(self, url: str) -> dict:
+    def __init__(self, clients: HTTPClientPool | None = None):
+        super().__init__(clients)
+        # Probes are keyed by IP:port: every hostname on a shared server reuses the same probe
+        probe_scope = lambda v: {"host": self._first_address(v), "port": v["port"]}
+        self.signals = self._host_signals() + [
+            Signal("ssh_banner", lambda ctx, v: probe_engine.ssh_banner(self._first_address(v), v["port"]),
+                   ("ip_address",), scope=probe_scope, ttl=self._probe_ttl, when=lambda v: bool(v["ip_address"])),
+            Signal("ssh_host_key", lambda ctx, v: probe_engine.ssh_host_key(self._first_address(v), v["port"]),
+                   ("ip_address",), scope=probe_scope,
+                   ttl=lambda key: None if key["host_key_type"] else settings.PROBE_FAILURE_TTL,
+                   when=lambda v: bool(v["ip_address"]) and v["host_key"]),
+        ]
+
+    async def analyze(self, url: str, budget_ms: int | None = None, fresh: bool = False, host_key: bool = False,
+                      on_signal=None) -> dict:
+        """
+        Reads the server banner over a raw connection; the SSH key exchange needed for the
+        host key only runs when host_key is asked for.
+        """
+        ctx = ScanContext.start(budget_ms, fresh=fresh, on_signal=on_signal)
         parsed_url = urlparse(url)
-        hostname = parsed_url.hostname
-        port = parsed_url.port or 22
-
-        # Start with common checks
-        ip_address = self._get_ip_address(hostname)
-        whois_info, dns_whois_valid = self._check_dns_whois(hostname)
         lexical_analysis = self._perform_lexical_analysis(url)
+        ctx.report("lexical_analysis", lexical_analysis)
 
-        async with httpx.AsyncClient() as client:
-            abuseipdb_result = await self._check_abuseipdb(client, ip_address)
+        inputs = {"url": url, "hostname": parsed_url.hostname, "port": parsed_url.port or 22, "host_key": host_key}
+        values = await self._run_signals(ctx, url, self.signals, inputs)
 
         results = {
             "protocol": "ssh",
             "url": url,
-            "ip_address": ip_address,
-            "whois_info": whois_info,
-            "dns_whois_valid": dns_whois_valid,
+            "ip_address": self._first_address(values),
+            "ip_addresses": values["ip_address"] or [],
+            "whois_info": (values["whois"] or (None, None))[0],
+            "dns_whois_valid": (values["whois"] or (None, None))[1],
             "lexical_analysis": lexical_analysis,
-            "abuseipdb": abuseipdb_result,
+            "abuseipdb": values["abuseipdb"],
+            "timed_out_signals": ctx.timed_out,
+            "cached_signals": ctx.cached,
+            "rate_limited_signals": ctx.rate_limited,
+            "skipped_signals": ctx.skipped,
+            "failed_signals": ctx.failed,
+            "local_blocklist": self._blocklist_result(ctx),
             "is_reachable": False,
             "server_banner": None,
             "host_key_type": None,
             "host_key_fingerprint": None,
         }
 
-        try:
-            conn = await asyncio.wait_for(
-                asyncssh.connect(hostname, port, known_hosts=None),
-                timeout=5
-            )
-            results["is_reachable"] = True
-
-            banner = conn.get_extra_info('banner', '')
-            results["server_banner"] = banner.decode() if isinstance(banner, bytes) else banner
-
-            server_host_key = conn.get_extra_info('server_host_key')
-            if server_host_key:
-                results["host_key_type"] = server_host_key.get_name()
-                results["host_key_fingerprint"] = server_host_key.get_fingerprint()
-
-            conn.close()
-
-        except (ConnectionRefusedError, asyncio.TimeoutError, asyncssh.Error):
-            results["is_reachable"] = False
+        for probe in ("ssh_banner", "ssh_host_key"):
+            results.update(values[probe] or {})
 
-        return results
\ No newline at end of file
+        await self._record_history(ctx, results)
+        return results
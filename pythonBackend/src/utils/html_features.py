@@ -0,0 +1,78 @@
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+# Tags whose attribute leads to another page, for crawling
+_LINK_ATTRIBUTES = {"a": "href", "iframe": "src", "frame": "src", "form": "action"}
+
+class PageFeatureExtractor(HTMLParser):
+    """
+    Incremental, single-pass extraction of the page features used for scoring.
+    Feed it chunks as they arrive; no DOM is built, so memory stays bounded by the
+    longest unfinished tag rather than the page size. With max_links, the targets of the
+    first max_links links, frames and form actions are also collected, as written.
+    """
+    def __init__(self, encoding: str = "utf-8", max_links: int = 0):
+        super().__init__(convert_charrefs=False)
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._form_depth = 0
+        self.has_iframe = False
+        self.has_form_with_password = False
+        self.external_links = 0
+        self.bytes_read = 0
+        self.max_links = max_links
+        self.links: list[str] = []
+
+    def feed_bytes(self, chunk: bytes, final: bool = False):
+        self.bytes_read += len(chunk)
+        self.feed(self._decoder.decode(chunk, final))
+
+    def handle_starttag(self, tag, attrs):
+        if self.max_links and tag in _LINK_ATTRIBUTES and len(self.links) < self.max_links:
+            target = next((value for name, value in attrs if name == _LINK_ATTRIBUTES[tag]), None)
+            if target and target.strip():
+                self.links.append(target.strip())
+        if tag == "iframe":
+            self.has_iframe = True
+        elif tag == "form":
+            self._form_depth += 1
+        elif tag == "input" and self._form_depth:
+            if any(name == "type" and (value or "").lower() == "password" for name, value in attrs):
+                self.has_form_with_password = True
+        elif tag == "a":
+            href = next((value for name, value in attrs if name == "href"), None)
+            if href and self._has_hostname(href):
+                self.external_links += 1
+
+    def handle_endtag(self, tag):
+        if tag == "form" and self._form_depth:
+            self._form_depth -= 1
+
+    @staticmethod
+    def _has_hostname(href: str) -> bool:
+        try:
+            return bool(urlparse(href.strip()).hostname)
+        except ValueError:
+            return False
+
+    def features(self, truncated: bool = False) -> dict:
+        features = {
+            "has_iframe": self.has_iframe,
+            "has_form_with_password": self.has_form_with_password,
+            "external_links": self.external_links,
+            "bytes_read": self.bytes_read,
+            "truncated": truncated,
+        }
+        if self.max_links:
+            features["links"] = self.links
+        return features
+
+def extract_page_features(body: bytes, encoding: str = "utf-8", truncated: bool = False, max_links: int = 0) -> dict:
+    """One-shot variant for a body that has already been read."""
+    extractor = PageFeatureExtractor(encoding, max_links)
+    extractor.feed_bytes(body, final=True)
+    extractor.close()
+    return extractor.features(truncated)
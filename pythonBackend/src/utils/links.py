@@ -0,0 +1,162 @@
+import html
+import re
+import zlib
+from urllib.parse import urlsplit
+
+from .urls import normalize_split_url
+
+# Every scheme the scanners support; a link runs until whitespace or a delimiter that
+# cannot appear unescaped in a URL. Commas end links too, as CSV exports are a main source.
+_LINK = re.compile(rb"""(?:https?|ftp|ssh)://[^\s<>"'`,{}|\\^\[\]]+""", re.IGNORECASE)
+_WHITESPACE = (b"\n", b" ", b"\t", b"\r")
+_TRAILING = ".;:!?)*"
+# Quoted-printable mail bodies wrap long lines with "=" + newline, often in the middle of links
+_QP_MARKER = re.compile(rb"content-transfer-encoding:\s*quoted-printable", re.IGNORECASE)
+_QP_SOFT_BREAK = re.compile(rb"=\r?\n")
+# MIME parts start at a "--" line of a boundary declared in a Content-Type header, mbox
+# messages at a "From " line; either one ends the quoted-printable part before it
+_BOUNDARY_PARAM = re.compile(rb"""boundary=(?:"([^"\r\n]{1,70})"|([^\s;"]{1,70}))""", re.IGNORECASE)
+_MESSAGE_START = rb"\nFrom "
+# Bytes kept from the end of one chunk to find headers and boundaries straddling two
+_TAIL_BYTES = 128
+# Longest unfinished token carried from one chunk to the next
+MAX_LINK_BYTES = 8192
+# Gzip input is inflated at most this many bytes at a time
+_INFLATE_BYTES = 1024 * 1024
+
+class BodyTooLargeError(Exception):
+    pass
+
+class LinkExtractor:
+    """
+    Incremental extraction of every http(s), ftp and ssh link from a byte stream: text
+    dumps, CSV exports, shell scripts, mail files and mbox archives, optionally gzipped.
+    feed() returns the links not seen before, normalized, in order of appearance. Only
+    the unfinished token at the end of a chunk and the set of seen links are kept.
+    With max_bytes, more (decompressed) input than that raises BodyTooLargeError.
+    """
+    def __init__(self, gzip: bool = False, max_bytes: int | None = None):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip else None
+        self._max_bytes = max_bytes
+        self._carry = b""
+        self._quoted_printable = False
+        self._marker_window = b""
+        self._tail = b""
+        self._boundaries: set[bytes] = set()
+        self._part_start = re.compile(re.escape(_MESSAGE_START))
+        self._seen: set[str] = set()
+        self._seen_raw: set[bytes] = set()
+        self.bytes_received = 0
+        self.bytes_scanned = 0
+        self.links_found = 0
+
+    def feed(self, chunk: bytes) -> list[str]:
+        self.bytes_received += len(chunk)
+        if self._decompressor is None:
+            return self._feed_text(chunk)
+        links = []
+        # Bounded steps, so a small gzip bomb is caught by max_bytes before it is inflated
+        while chunk:
+            text = self._decompressor.decompress(chunk, _INFLATE_BYTES)
+            chunk = self._decompressor.unconsumed_tail
+            links += self._feed_text(text)
+        return links
+
+    def close(self) -> list[str]:
+        links = self._feed_text(self._decompressor.flush()) if self._decompressor is not None else []
+        return links + self._end_part()
+
+    def _feed_text(self, text: bytes) -> list[str]:
+        self.bytes_scanned += len(text)
+        if self._max_bytes is not None and self.bytes_scanned > self._max_bytes:
+            raise BodyTooLargeError(f"More than {self._max_bytes} bytes of input")
+        window = self._tail + text
+        boundaries = {quoted or bare for quoted, bare in _BOUNDARY_PARAM.findall(window)} - self._boundaries
+        if boundaries:
+            self._boundaries |= boundaries
+            self._part_start = re.compile(b"|".join(
+                [re.escape(_MESSAGE_START)] + [re.escape(b"\n--" + boundary) for boundary in self._boundaries]))
+        # Part starts that end in the tail were already handled with the previous chunk
+        splits = [max(match.start() + 1 - len(self._tail), 0)
+                  for match in self._part_start.finditer(window) if match.end() > len(self._tail)]
+        self._tail = window[-_TAIL_BYTES:]
+        links, start = [], 0
+        for split in splits:
+            links += self._feed_part(text[start:split])
+            links += self._end_part()
+            start = split
+        return links + self._feed_part(text[start:])
+
+    def _feed_part(self, chunk: bytes) -> list[str]:
+        if not self._quoted_printable:
+            # The header may straddle two chunks
+            window = self._marker_window + chunk
+            self._quoted_printable = bool(_QP_MARKER.search(window))
+            self._marker_window = window[-64:]
+        buffer = self._carry + chunk
+        if self._quoted_printable:
+            buffer = _QP_SOFT_BREAK.sub(b"", buffer)
+        limit = len(buffer)
+        if self._quoted_printable and buffer.endswith((b"=", b"=\r")):
+            # The rest of a soft line break is in the next chunk, and so is the rest of its token
+            limit = buffer.rfind(b"=")
+        end = max(buffer.rfind(space, 0, limit) for space in _WHITESPACE) + 1
+        if len(buffer) - end > MAX_LINK_BYTES:
+            end = len(buffer) - MAX_LINK_BYTES
+        self._carry = buffer[end:]
+        return self._extract(buffer, end)
+
+    def _end_part(self) -> list[str]:
+        """Extracts what is left of a MIME part or message; the next one declares its own encoding."""
+        buffer, self._carry = self._carry, b""
+        links = self._extract(buffer, len(buffer))
+        self._quoted_printable = False
+        self._marker_window = b""
+        return links
+
+    def _extract(self, buffer: bytes, end: int) -> list[str]:
+        links = []
+        for match in _LINK.finditer(buffer, 0, end):
+            self.links_found += 1
+            raw = match.group()
+            # Most repeats are byte-for-byte identical; skip them before the costlier normalization
+            if raw in self._seen_raw:
+                continue
+            self._seen_raw.add(raw)
+            link = self._clean(raw.decode("utf-8", errors="replace"))
+            if link and link not in self._seen:
+                self._seen.add(link)
+                links.append(link)
+        return links
+
+    def _clean(self, link: str) -> str | None:
+        if self._quoted_printable:
+            link = link.replace("=3D", "=").replace("=3d", "=")
+        if "&" in link:
+            link = html.unescape(link)
+        while link and link[-1] in _TRAILING:
+            if link[-1] == ")" and link.count("(") >= link.count(")"):
+                break
+            link = link[:-1]
+        try:
+            parts = urlsplit(link)
+            if not parts.hostname:
+                return None
+        except ValueError:
+            return None
+        return normalize_split_url(parts)
+
+    @property
+    def unique_links(self) -> int:
+        return len(self._seen)
+
+    def stats(self, seconds: float) -> dict:
+        return {
+            "bytes_received": self.bytes_received,
+            "bytes_scanned": self.bytes_scanned,
+            "links_found": self.links_found,
+            "unique_links": self.unique_links,
+            "seconds": round(seconds, 3),
+            "mb_per_second": round(self.bytes_scanned / 2**20 / seconds, 1) if seconds else None,
+            "links_per_second": round(self.links_found / seconds, 1) if seconds else None,
+        }
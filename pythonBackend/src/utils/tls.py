@@ -0,0 +1,92 @@
+import asyncio
+import ssl
+from datetime import datetime, timezone
+from typing import Optional
+
+# OpenSSL verify codes for a self-signed leaf or root
+_SELF_SIGNED_CODES = {18, 19}
+_READ_SIZE = 16384
+
+def _name(rdns) -> dict:
+    return dict(pair for rdn in rdns or () for pair in rdn)
+
+def _verified_chain(ssl_object) -> list:
+    # Public from Python 3.13; earlier versions only have it on the underlying _ssl object
+    get_chain = getattr(ssl_object, "get_verified_chain", None) \
+        or getattr(getattr(ssl_object, "_sslobj", None), "get_verified_chain", None)
+    if get_chain is None:
+        return []
+    try:
+        # Resumed sessions carry no verified chain
+        return [cert.get_info() for cert in get_chain() or ()]
+    except (ssl.SSLError, ValueError):
+        return []
+
+def describe_certificate(ssl_object, source: str) -> Optional[dict]:
+    """Certificate details of a verified TLS connection (ssl.SSLObject or SSLSocket)."""
+    cert = ssl_object.getpeercert()
+    if not cert:
+        return None
+    expires = datetime.strptime(cert["notAfter"], "%b %d %H:%M:%S %Y %Z")
+    issuer, subject = _name(cert.get("issuer")), _name(cert.get("subject"))
+    return {
+        "issuer": issuer,
+        "subject": subject,
+        "expires": str(expires),
+        "not_before": str(datetime.strptime(cert["notBefore"], "%b %d %H:%M:%S %Y %Z")),
+        "days_until_expiry": (expires - datetime.now(timezone.utc).replace(tzinfo=None)).days,
+        "sans": [value for kind, value in cert.get("subjectAltName", ()) if kind in ("DNS", "IP Address")],
+        "self_signed": issuer == subject,
+        "chain": [
+            {"subject": _name(info.get("subject")).get("commonName"), "issuer": _name(info.get("issuer")).get("commonName")}
+            for info in _verified_chain(ssl_object)
+        ],
+        "tls_version": ssl_object.version(),
+        "source": source,
+    }
+
+def describe_verify_error(error: ssl.SSLCertVerificationError) -> dict:
+    return {
+        "error": f"Certificate verification failed: {error.verify_message}",
+        "verify_code": error.verify_code,
+        "self_signed": error.verify_code in _SELF_SIGNED_CODES,
+    }
+
+async def tls_handshake(host: str, port: int, context: ssl.SSLContext,
+                        session: Optional[ssl.SSLSession] = None) -> ssl.SSLObject:
+    """
+    Performs only a TLS handshake over an asyncio connection, driving the SSLObject through
+    memory BIOs so a previous session can be resumed (asyncio's own TLS transport cannot).
+    Raises ssl.SSLCertVerificationError for invalid certificates.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    incoming, outgoing = ssl.MemoryBIO(), ssl.MemoryBIO()
+    ssl_object = context.wrap_bio(incoming, outgoing, server_hostname=host, session=session)
+    try:
+        while True:
+            try:
+                ssl_object.do_handshake()
+                break
+            except ssl.SSLWantReadError:
+                await _flush(writer, outgoing)
+                data = await reader.read(_READ_SIZE)
+                if not data:
+                    raise ConnectionResetError("Connection closed during the TLS handshake")
+                incoming.write(data)
+        await _flush(writer, outgoing)
+        if ssl_object.version() == "TLSv1.3" and not ssl_object.session_reused:
+            # TLS 1.3 sends the resumable session ticket just after the handshake
+            try:
+                incoming.write(await asyncio.wait_for(reader.read(_READ_SIZE), 0.05))
+                ssl_object.read(1)
+            except (asyncio.TimeoutError, ssl.SSLError):
+                pass
+        return ssl_object
+    finally:
+        writer.close()
+
+async def _flush(writer: asyncio.StreamWriter, outgoing: ssl.MemoryBIO):
+    data = outgoing.read()
+    if data:
+        writer.write(data)
+        await writer.drain()
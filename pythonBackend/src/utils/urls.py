@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+from typing import Optional
+from urllib.parse import SplitResult, urlsplit, urlunsplit
+
+import httpx
+
+from ..core.config import settings
+
+_DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21, "ssh": 22}
+
+_extractor = None
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache and history keys: lower-case scheme and host,
+    default port and fragment dropped, empty path replaced with '/'.
+    """
+    return normalize_split_url(urlsplit(url.strip()))
+
+def normalize_split_url(parts: SplitResult) -> str:
+    """normalize_url for a URL that has already been split."""
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+def load_public_suffixes():
+    """
+    (Re)builds the public suffix parser from PSL_FILE when it exists, otherwise from the
+    snapshot bundled with tldextract. Never goes to the network.
+    """
+    global _extractor
+    # Deferred so that importing the app does not pay for tldextract and requests
+    import tldextract
+    if settings.PSL_FILE and os.path.exists(settings.PSL_FILE):
+        sources = (Path(settings.PSL_FILE).resolve().as_uri(),)
+    else:
+        sources = ()
+    extractor = tldextract.TLDExtract(suffix_list_urls=sources, cache_dir=None, fallback_to_snapshot=True)
+    # tldextract parses the list on its first lookup; do that before swapping it in
+    extractor("www.example.co.uk")
+    _extractor = extractor
+
+def refresh_public_suffixes() -> dict:
+    """Downloads the current list to PSL_FILE and switches to it. Blocking."""
+    if not settings.PSL_FILE:
+        raise FileNotFoundError("PSL_FILE is not set")
+    response = httpx.get(settings.PSL_SOURCE_URL, timeout=30, follow_redirects=True)
+    response.raise_for_status()
+    if "===BEGIN ICANN DOMAINS===" not in response.text:
+        raise ValueError("Downloaded file is not a public suffix list")
+    tmp_path = f"{settings.PSL_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(response.text)
+    os.replace(tmp_path, settings.PSL_FILE)
+    load_public_suffixes()
+    return {"path": settings.PSL_FILE, "bytes": len(response.content)}
+
+def split_domain(url_or_host: str):
+    """tldextract's (subdomain, domain, suffix) split, using the local suffix list."""
+    if _extractor is None:
+        load_public_suffixes()
+    return _extractor(url_or_host)
+
+def registered_domain(hostname: Optional[str]) -> Optional[str]:
+    """The registrable domain of a hostname (e.g. 'example.co.uk' for 'a.b.example.co.uk')."""
+    if not hostname:
+        return None
+    extracted = split_domain(hostname)
+    if extracted.domain and extracted.suffix:
+        return f"{extracted.domain}.{extracted.suffix}".lower()
+    return hostname.lower()
@@ -0,0 +1,20 @@
+import pytest
+
+from src.core.blocklist import _parse_feed_line
+
+@pytest.mark.parametrize("line, entries", [
+    ("0.0.0.0 evil.com", [("host", "evil.com")]),
+    ("0.0.0.0 evil.com # ads, trackers", [("host", "evil.com")]),
+    ("127.0.0.1 localhost", []),
+    ("evil.org", [("domain", "evil.org")]),
+    ("evil.org  # seen 2024, ref", [("domain", "evil.org")]),
+    ("Evil.Net.", [("domain", "evil.net")]),
+    ("203.0.113.7 # scanner, seen twice", [("ip", "203.0.113.7")]),
+    ("http://bad.example/path # phishing, reported", [("url", "http://bad.example/path")]),
+    ('"1","2024-01-01","http://bad.example/a","online"', [("url", "http://bad.example/a")]),
+    ("1,2024-01-01,https://bad.example/b,online,malware_download", [("url", "https://bad.example/b")]),
+    ("# comment, with a comma", []),
+    ("", []),
+])
+def test_feed_lines(line, entries):
+    assert list(_parse_feed_line(line)) == entries
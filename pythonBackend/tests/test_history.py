@@ -0,0 +1,42 @@
+import time
+
+import numpy as np
+
+from src.core.history import ScanHistory
+from src.core.scoring import FEATURES, extract_features
+
+ANALYSES = [
+    {"protocol": "http", "url": "https://example.com/", "ssl_valid": False, "is_reachable": True},
+    {"protocol": "ftp", "url": "ftp://files.example.org/", "anonymous_login_allowed": True, "is_reachable": True},
+]
+
+def stored_vector_lengths(history: ScanHistory) -> list[int]:
+    return [length for length, in history._conn.execute("SELECT length(features) FROM scans ORDER BY id")]
+
+def test_feature_matrix_uses_stored_vectors(tmp_path):
+    history = ScanHistory(str(tmp_path / "history.db"))
+    scan_ids = [history.record(analysis, {}) for analysis in ANALYSES]
+    ids, features, protocols, verdicts = history.feature_matrix(time.time() - 60)
+    expected_features, expected_protocols = extract_features(ANALYSES)
+    assert ids.tolist() == scan_ids
+    np.testing.assert_array_equal(features, expected_features)
+    np.testing.assert_array_equal(protocols, expected_protocols)
+    assert len(verdicts) == 2
+
+def test_vectors_are_re_extracted_once_after_a_feature_set_change(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = ScanHistory(path)
+    for analysis in ANALYSES:
+        history.record(analysis, {})
+    history._conn.execute("UPDATE meta SET value = '[]' WHERE key = 'features'")
+    history._conn.commit()
+
+    history = ScanHistory(path)
+    assert stored_vector_lengths(history) == [0, 0]
+    _, features, protocols, _ = history.feature_matrix(time.time() - 60)
+    expected_features, expected_protocols = extract_features(ANALYSES)
+    np.testing.assert_array_equal(features, expected_features)
+    np.testing.assert_array_equal(protocols, expected_protocols)
+    assert stored_vector_lengths(history) == [len(FEATURES) * 8] * 2
+    # Reopening with the same feature set keeps the rewritten vectors
+    assert stored_vector_lengths(ScanHistory(path)) == [len(FEATURES) * 8] * 2
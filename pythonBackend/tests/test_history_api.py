@@ -0,0 +1,22 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api import endpoints
+
+@pytest.fixture
+def client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(endpoints, "scan_history", None)
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api")
+    return TestClient(app)
+
+@pytest.mark.parametrize("method, path, body", [
+    ("GET", "/api/history?host=example.com", None),
+    ("GET", "/api/history/1", None),
+    ("POST", "/api/history/rescore", {}),
+])
+def test_disabled_history_is_not_found(client, method, path, body):
+    response = client.request(method, path, json=body)
+    assert response.status_code == 404
+    assert "HISTORY_SQLITE_PATH" in response.json()["detail"]
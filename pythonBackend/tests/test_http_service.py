@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.core.ratelimit import rate_limiters
+from src.services.http_service import URLAnalysisService
+
+@pytest.fixture(scope="module")
+def service() -> URLAnalysisService:
+    return URLAnalysisService()
+
+def test_plain_http_has_no_tls_signal(service):
+    ssl_info, ssl_valid = asyncio.run(service._check_ssl("http", "example.com", 80))
+    assert ssl_valid is None
+    assert ssl_info == {"error": "Not served over TLS"}
+
+def test_tls_certificate_from_the_connection_is_used(service):
+    certificate = {"issuer": "Example CA", "expires": "2030-01-01 00:00:00"}
+    assert asyncio.run(service._check_ssl("https", "example.com", 443, certificate)) == (certificate, True)
+
+class Chunks(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, size: int):
+        self.chunks = [body[i:i + size] for i in range(0, len(body), size)]
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+def page_features(service, body: bytes, chunk_size: int = 1000):
+    response = httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, stream=Chunks(body, chunk_size))
+    return asyncio.run(service._analyze_page_content(response))
+
+@pytest.mark.parametrize("length, truncated", [(4999, False), (5000, False), (5001, True), (20000, True)])
+def test_page_is_truncated_only_past_the_cap(service, monkeypatch, length, truncated):
+    monkeypatch.setattr(settings, "PAGE_MAX_BYTES", 5000)
+    body = b"<html><body>" + b"x" * (length - 12)
+    features = page_features(service, body, chunk_size=999)
+    assert features["bytes_read"] == min(length, 5000)
+    assert features["truncated"] is truncated
+
+def test_features_do_not_depend_on_chunking(service):
+    body = b"<html><body><iframe src='/a'></iframe><form><input type='password'></form></body></html>"
+    expected = page_features(service, body, chunk_size=len(body))
+    assert expected["has_iframe"] and expected["has_form_with_password"]
+    for size in (1, 7, 33):
+        assert page_features(service, body, chunk_size=size) == expected
+
+def test_non_html_bodies_are_not_analyzed(service):
+    response = httpx.Response(200, headers={"content-type": "application/json"}, content=b"{}")
+    assert asyncio.run(service._analyze_page_content(response)) is None
+
+class CountingLimiter:
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.acquired = 0
+
+    async def acquire(self) -> bool:
+        if self.acquired == self.tokens:
+            return False
+        self.acquired += 1
+        return True
+
+class Clients:
+    def __init__(self, handler):
+        self.requests = []
+
+        def record(request):
+            self.requests.append((request.method, request.url.path))
+            return handler(request)
+        self.client = httpx.AsyncClient(base_url="https://vt.example", transport=httpx.MockTransport(record))
+
+    def get(self, name):
+        return self.client
+
+def virustotal_miss(request):
+    if request.method == "POST":
+        return httpx.Response(200, json={"data": {"id": "analysis-1"}})
+    if request.url.path.startswith("/api/v3/analyses/"):
+        return httpx.Response(200, json={"data": {"attributes": {"status": "completed", "stats": {"malicious": 0}}}})
+    return httpx.Response(404)
+
+@pytest.mark.parametrize("tokens, verdict, calls", [(3, "clean", 3), (2, "pending", 2), (1, "rate_limited", 1)])
+def test_every_virustotal_request_takes_a_token(monkeypatch, tokens, verdict, calls):
+    limiter = CountingLimiter(tokens)
+    monkeypatch.setitem(rate_limiters, "virustotal", limiter)
+    monkeypatch.setattr(settings, "VIRUSTOTAL_API_KEY", "key")
+    clients = Clients(virustotal_miss)
+    service = URLAnalysisService(clients)
+    assert asyncio.run(service._check_virustotal("https://example.com/")) == verdict
+    assert len(clients.requests) == limiter.acquired == calls
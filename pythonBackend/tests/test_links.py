@@ -0,0 +1,106 @@
+import gzip
+
+import pytest
+
+from src.utils.links import LinkExtractor, BodyTooLargeError, MAX_LINK_BYTES
+
+def extract(chunks, **kwargs) -> list[str]:
+    extractor = LinkExtractor(**kwargs)
+    links = []
+    for chunk in chunks:
+        links += extractor.feed(chunk)
+    return links + extractor.close()
+
+def split_every(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+TEXT = (
+    b"see HTTPS://Example.COM/a?b=1&amp;c=2). and ftp://files.example.org/pub,\n"
+    b"ssh://git.example.org:22 then (http://example.net/wiki/Foo_(bar)) http://example.net/x.\n"
+)
+LINKS = [
+    "https://example.com/a?b=1&c=2",
+    "ftp://files.example.org/pub",
+    "ssh://git.example.org/",
+    "http://example.net/wiki/Foo_(bar)",
+    "http://example.net/x",
+]
+
+def test_links_are_cleaned_and_normalized():
+    assert extract([TEXT]) == LINKS
+
+def test_chunk_boundaries_do_not_change_the_links():
+    for size in (1, 2, 7, 64):
+        assert extract(split_every(TEXT, size)) == LINKS
+
+def test_repeated_links_are_returned_once():
+    extractor = LinkExtractor()
+    assert extractor.feed(b"http://example.com/ http://EXAMPLE.com/ http://example.com/\n") == ["http://example.com/"]
+    assert extractor.feed(b"http://example.com/\n") == []
+    assert (extractor.links_found, extractor.unique_links) == (4, 1)
+
+def test_hosts_are_required():
+    assert extract([b"http:// http:///path https://a.example/\n"]) == ["https://a.example/"]
+
+def test_quoted_printable_soft_breaks_are_joined():
+    mail = (
+        b"Content-Type: text/plain\r\nContent-Transfer-Encoding: quoted-printable\r\n\r\n"
+        b"Click https://example.com/login?user=3Dbob&next=3D/acc=\r\nount now\r\n"
+    )
+    expected = ["https://example.com/login?user=bob&next=/account"]
+    for size in range(1, len(mail) + 1):
+        assert extract(split_every(mail, size)) == expected
+
+def test_soft_breaks_are_kept_without_the_header():
+    assert extract([b"https://example.com/a=\nb\n"]) == ["https://example.com/a="]
+
+def test_gzip_input():
+    data = gzip.compress(TEXT * 100)
+    extractor = LinkExtractor(gzip=True)
+    links = []
+    for chunk in split_every(data, 5):
+        links += extractor.feed(chunk)
+    assert links + extractor.close() == LINKS
+    assert extractor.bytes_received == len(data)
+    assert extractor.bytes_scanned == len(TEXT) * 100
+
+def test_unfinished_tokens_are_bounded():
+    extractor = LinkExtractor()
+    extractor.feed(b"x" * (MAX_LINK_BYTES * 3))
+    assert len(extractor._carry) == MAX_LINK_BYTES
+
+def test_gzip_bombs_stop_at_the_byte_cap():
+    bomb = gzip.compress(b"\0" * (64 * 2**20))
+    extractor = LinkExtractor(gzip=True, max_bytes=4 * 2**20)
+    with pytest.raises(BodyTooLargeError):
+        extractor.feed(bomb)
+    assert extractor.bytes_scanned <= 5 * 2**20
+
+def test_plain_input_stops_at_the_byte_cap():
+    extractor = LinkExtractor(max_bytes=10)
+    extractor.feed(b"0123456789")
+    with pytest.raises(BodyTooLargeError):
+        extractor.feed(b"a")
+
+MBOX = (
+    b"From alice@example.com Mon Jan  1 00:00:00 2024\n"
+    b"Content-Transfer-Encoding: quoted-printable\n\n"
+    b"https://one.example/?a=3D1&b=3D=\n2\n\n"
+    b"From bob@example.com Mon Jan  1 00:00:01 2024\n"
+    b"Content-Type: multipart/alternative; boundary=\"sep\"\n\n"
+    b"--sep\nContent-Transfer-Encoding: quoted-printable\n\n"
+    b"https://two.example/?c=3D3\n"
+    b"--sep\nContent-Transfer-Encoding: 7bit\n\n"
+    b"https://three.example/?d=3D4 https://four.example/e=\nf\n"
+    b"--sep--\n"
+)
+
+def test_quoted_printable_ends_with_its_part():
+    expected = [
+        "https://one.example/?a=1&b=2",
+        "https://two.example/?c=3",
+        "https://three.example/?d=3D4",
+        "https://four.example/e=",
+    ]
+    for size in [*range(1, 80), len(MBOX)]:
+        assert extract(split_every(MBOX, size)) == expected
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from src.models.scan import ScanResponse, FTPAnalysisResult, SSHAnalysisResult, RAW_PAYLOAD_FIELDS
+
+HOST_SIGNALS = {
+    "ip_address": "192.0.2.10",
+    "ip_addresses": ["192.0.2.10", "2001:db8::10"],
+    "dns_whois_valid": True,
+    "whois_info": {"domain_name": "example.com", "creation_date": datetime(2001, 5, 1)},
+    "abuseipdb": {"abuse_confidence_score": 12},
+    "lexical_analysis": {"length": 22, "has_ip_host": False},
+    "timed_out_signals": ["whois"],
+    "failed_signals": ["abuseipdb"],
+}
+
+def response(details: dict) -> ScanResponse:
+    return ScanResponse(input_string="link", protocol=details["protocol"], verdict="ℹ️ Informational",
+                        risk_score=0, details=details)
+
+def ftp_analysis(**fields) -> dict:
+    return {"protocol": "ftp", "is_reachable": True, "anonymous_login_allowed": False,
+            "directory_listing_count": 0, **HOST_SIGNALS, **fields}
+
+def ssh_analysis(**fields) -> dict:
+    return {"protocol": "ssh", "is_reachable": True, "server_banner": "SSH-2.0-OpenSSH_9.6",
+            **HOST_SIGNALS, **fields}
+
+@pytest.mark.parametrize("analysis, model", [(ftp_analysis(), FTPAnalysisResult), (ssh_analysis(), SSHAnalysisResult)])
+def test_host_signals_are_kept(analysis, model):
+    details = response(analysis).details
+    assert type(details) is model
+    dumped = details.model_dump()
+    for name, value in HOST_SIGNALS.items():
+        assert dumped[name] == value
+
+@pytest.mark.parametrize("analysis", [ftp_analysis(), ssh_analysis()])
+def test_compact_dump_leaves_out_raw_payloads(analysis):
+    dumped = response(analysis).model_dump(exclude={"details": RAW_PAYLOAD_FIELDS})["details"]
+    assert not {"whois_info", "abuseipdb", "lexical_analysis"} & dumped.keys()
+    assert dumped["ip_address"] == "192.0.2.10"
+
+def test_signals_default_when_not_reported():
+    details = response({"protocol": "ssh", "is_reachable": False}).details
+    assert details.ip_address is None and details.ip_addresses == []
+    assert details.whois_info is None and details.abuseipdb is None
+    assert details.failed_signals == [] and details.timed_out_signals == []
+
+def test_details_are_validated_against_their_protocol():
+    # Valid SSH details, but tagged as FTP
+    with pytest.raises(ValidationError) as error:
+        response(ssh_analysis(protocol="ftp"))
+    assert {e["loc"][-1] for e in error.value.errors()} == {"anonymous_login_allowed", "directory_listing_count"}
+    with pytest.raises(ValidationError):
+        response(ftp_analysis(protocol="gopher"))
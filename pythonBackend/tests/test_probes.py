@@ -0,0 +1,41 @@
+import asyncio
+
+from src.core.probes import ProbeEngine
+
+async def probe_server(reply: bytes, probe):
+    """Runs probe(engine, port) against a local server that sends reply and hangs up."""
+    async def handle(reader, writer):
+        writer.write(reply)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    async with server:
+        port = server.sockets[0].getsockname()[1]
+        engine = ProbeEngine(8, 2)
+        return await probe(engine, port), engine
+
+def test_ssh_banner():
+    result, engine = asyncio.run(probe_server(
+        b"hello\r\nSSH-2.0-OpenSSH_9.6\r\n", lambda engine, port: engine.ssh_banner("127.0.0.1", port)))
+    assert result == {"is_reachable": True, "server_banner": "SSH-2.0-OpenSSH_9.6"}
+    assert engine.failures == 0
+
+def test_overlong_ssh_banner_is_a_probe_error():
+    result, engine = asyncio.run(probe_server(
+        b"SSH-2.0-" + b"x" * 200_000 + b"\r\n", lambda engine, port: engine.ssh_banner("127.0.0.1", port)))
+    assert result == {"is_reachable": True, "server_banner": None}
+    assert engine.failures == 1
+
+def test_overlong_ftp_greeting_is_a_probe_error():
+    result, engine = asyncio.run(probe_server(
+        b"220-" + b"x" * 200_000 + b"\r\n", lambda engine, port: engine.ftp("127.0.0.1", port, 10)))
+    assert result["is_reachable"] is False and result["welcome_message"] is None
+    assert engine.failures == 1
+
+def test_ftp_greeting_without_anonymous_login():
+    result, engine = asyncio.run(probe_server(
+        b"220-Welcome\r\n220 ready\r\n", lambda engine, port: engine.ftp("127.0.0.1", port, 10)))
+    assert result["is_reachable"] is True
+    assert result["welcome_message"] == "Welcome\nready"
+    assert result["anonymous_login_allowed"] is False
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from src.core.scoring import compile_rules
+from src.services.scoring_service import ScoringService
+
+def clean_http(**fields) -> dict:
+    analysis = {
+        "protocol": "http", "url": "https://example.com/", "final_url": "https://example.com/",
+        "protocol_valid": True, "syntax_valid": True, "is_reachable": True, "ssl_valid": True,
+        "google_safe_browsing": "clean", "virustotal": "clean", "abuseipdb": {"abuse_confidence_score": 0},
+        "whois_info": {"creation_date": datetime.now() - timedelta(days=3650)},
+        "page_content_analysis": {"has_iframe": False, "has_form_with_password": False},
+        "local_blocklist": {"listed": False, "matches": []},
+    }
+    analysis.update(fields)
+    return analysis
+
+def test_clean_https_scan_is_safe():
+    assert ScoringService().score(clean_http()) == (0, "✅ Safe", {})
+
+def test_plain_http_without_tls_signal_is_not_penalized():
+    analysis = clean_http(url="http://example.com/", final_url="http://example.com/", ssl_valid=None)
+    assert ScoringService().score(analysis) == (0, "✅ Safe", {})
+
+def test_missing_signals_never_fire():
+    analysis = clean_http(abuseipdb=None, whois_info=None, ssl_valid=None, is_reachable=None, virustotal=None)
+    assert ScoringService().score(analysis)[2] == {}
+
+def test_rules_add_up_and_pick_the_verdict():
+    analysis = clean_http(ssl_valid=False, whois_info={"creation_date": datetime.now() - timedelta(days=10)})
+    assert ScoringService().score(analysis) == (70, "🚨 High Risk", {"domain_age_under_90_days": 40, "ssl_invalid": 30})
+
+def test_bounds_select_one_of_adjacent_rules():
+    scorer = ScoringService()
+    assert scorer.score(clean_http(abuseipdb={"abuse_confidence_score": 60}))[2] == {"abuseipdb_medium": 50}
+    assert scorer.score(clean_http(abuseipdb={"abuse_confidence_score": 90}))[2] == {"abuseipdb_high": 100}
+    assert scorer.score(clean_http(abuseipdb={"abuse_confidence_score": 50}))[2] == {}
+
+def test_score_is_capped_at_100():
+    analysis = clean_http(virustotal="malicious", google_safe_browsing="malicious")
+    risk_score, verdict, breakdown = ScoringService().score(analysis)
+    assert (risk_score, verdict) == (100, "❌ Malicious")
+    assert breakdown == {"safe_browsing_malicious": 100, "virustotal_malicious": 100}
+
+def test_protocol_restricted_rules_only_fire_for_their_protocol():
+    ftp = {"protocol": "ftp", "is_reachable": False, "anonymous_login_allowed": True}
+    assert ScoringService().score(ftp) == (30, "⚠️ Suspicious", {"anonymous_ftp": 30})
+
+def test_low_risk_verdict_depends_on_protocol():
+    ssh = {"protocol": "ssh", "is_reachable": True}
+    assert ScoringService().score(ssh) == (0, "ℹ️ Informational", {})
+
+def test_custom_rule_table():
+    scorer = ScoringService(compile_rules([{"name": "iframe", "feature": "has_iframe", "weight": 35}]))
+    analysis = clean_http(page_content_analysis={"has_iframe": True})
+    assert scorer.score(analysis) == (35, "⚠️ Suspicious", {"iframe": 35})
+
+def test_score_many_matches_single_scores():
+    analyses = [clean_http(), clean_http(ssl_valid=False), {"protocol": "ftp", "anonymous_login_allowed": True}]
+    scorer = ScoringService()
+    assert scorer.score_many(analyses) == [scorer.score(analysis) for analysis in analyses]
@@ -0,0 +1,55 @@
+import asyncio
+
+from src.core.exceptions import ServiceError
+from src.services.base_service import BaseAnalysisService, ScanContext, Signal
+
+def run(signals, budget_ms=1000, inputs=None):
+    async def main():
+        ctx = ScanContext.start(budget_ms)
+        values = await BaseAnalysisService()._run_signals(ctx, "http://example.com/", signals, inputs or {})
+        return values, ctx
+    return asyncio.run(main())
+
+async def _value(ctx, values):
+    return "ok"
+
+async def _fail(ctx, values):
+    raise ServiceError("provider returned 503")
+
+async def _slow(ctx, values):
+    await asyncio.sleep(5)
+    return "late"
+
+def test_failed_signal_leaves_a_partial_result():
+    values, ctx = run([Signal("a", _fail), Signal("b", _value)])
+    assert values == {"a": None, "b": "ok"}
+    assert ctx.failed == ["a"]
+    assert ctx.timed_out == []
+
+def test_unexpected_exception_is_a_failed_signal():
+    async def broken(ctx, values):
+        return {}["missing"]
+    values, ctx = run([Signal("a", broken), Signal("b", _value)])
+    assert values == {"a": None, "b": "ok"}
+    assert ctx.failed == ["a"]
+
+def test_dependents_of_a_failed_signal_see_none():
+    async def dependent(ctx, values):
+        return ("saw", values["a"])
+    values, ctx = run([Signal("a", _fail), Signal("b", dependent, ("a",))])
+    assert values["b"] == ("saw", None)
+
+def test_signal_past_the_deadline_times_out():
+    values, ctx = run([Signal("slow", _slow), Signal("fast", _value)], budget_ms=100)
+    assert values == {"slow": None, "fast": "ok"}
+    assert ctx.timed_out == ["slow"]
+    assert ctx.failed == []
+
+def test_when_and_skip_conditions():
+    values, ctx = run([
+        Signal("never", _value, when=lambda v: False),
+        Signal("skipped", _value, skip=lambda v: True),
+        Signal("runs", _value, when=lambda v: v["go"]),
+    ], inputs={"go": True})
+    assert values == {"never": None, "skipped": None, "runs": "ok"}
+    assert ctx.skipped == ["skipped"]